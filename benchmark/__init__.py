@@ -0,0 +1,2 @@
+from .generator import generare_date
+from .masurare import comparare, metrica
@@ -0,0 +1,190 @@
+# python -m benchmark: genereaza datele, ruleaza scenariile si scrie
+# rezultatele in JSON, optional comparate cu o rulare anterioara
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from .masurare import comparare
+
+scale = {
+    "mic": {"clienti": 1000, "produse": 10000, "facturi": 10000},
+    "mediu": {"clienti": 10000, "produse": 100000, "facturi": 100000},
+    "mare": {"clienti": 100000, "produse": 1000000, "facturi": 1000000},
+    "maxima": {"clienti": 1000000, "produse": 1000000, "facturi": 10000000},
+}
+# randurile fisierului CSV din scenariul de import, pe scala
+randuri_import = {"mic": 10000, "mediu": 100000, "mare": 2000000, "maxima": 5000000}
+radacina = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=radacina,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _afisare_rezultate(rezultate, regresii):
+    for scenariu, metrici in rezultate["scenarii"].items():
+        print(f"\n{scenariu}")
+        if "eroare" in metrici:
+            print(f"  EROARE: {metrici['eroare']}")
+            continue
+        for nume, m in metrici.items():
+            print(f"  {nume:<45} {m['valoare']!s:>14} {m['unitate']}")
+    if regresii:
+        print("\nRegresii:")
+        for scenariu, nume, anterior, curent in regresii:
+            print(f"  {scenariu}.{nume}: {anterior} -> {curent}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark-uri pentru programul de facturare"
+    )
+    parser.add_argument("--scala", choices=scale, default="mic")
+    parser.add_argument("--clienti", type=int)
+    parser.add_argument("--produse", type=int)
+    parser.add_argument("--facturi", type=int)
+    parser.add_argument("--linii-pe-factura", type=int, default=5)
+    parser.add_argument(
+        "--randuri-import",
+        type=int,
+        help="randurile importate in scenariul importare (implicit dupa scala)",
+    )
+    parser.add_argument("--samanta", type=int, default=1)
+    parser.add_argument(
+        "--repetari", type=int, default=200, help="apeluri masurate pe operatie"
+    )
+    parser.add_argument(
+        "--scenarii", help="scenariile rulate, separate prin virgula (implicit toate)"
+    )
+    parser.add_argument(
+        "--mysql",
+        action="store_true",
+        help="foloseste baza MySQL configurata prin MYSQL_*; tabelele sunt recreate",
+    )
+    parser.add_argument(
+        "--director", help="directorul bazei SQLite (implicit unul temporar, sters)"
+    )
+    parser.add_argument("--iesire", help="fisierul JSON cu rezultatele")
+    parser.add_argument("--referinta", help="rezultatele unei rulari anterioare")
+    parser.add_argument(
+        "--prag",
+        type=float,
+        default=0.25,
+        help="inrautatirea relativa tolerata fata de referinta (0.25 = 25%%)",
+    )
+    argumente = parser.parse_args()
+
+    scala = dict(scale[argumente.scala])
+    for nume in scala:
+        if getattr(argumente, nume) is not None:
+            scala[nume] = getattr(argumente, nume)
+    iesire = os.path.abspath(argumente.iesire) if argumente.iesire else None
+    referinta = None
+    if argumente.referinta:
+        with open(argumente.referinta, encoding="utf-8") as f:
+            referinta = json.load(f)
+
+    # baza SQLite se creeaza in directorul curent, deci se lucreaza in director
+    if argumente.mysql:
+        os.environ["DB_TYPE"] = "mysql"
+    director = argumente.director or tempfile.mkdtemp(prefix="benchmark_facturare_")
+    os.makedirs(director, exist_ok=True)
+    director_initial = os.getcwd()
+    os.chdir(director)
+    try:
+        if not argumente.mysql:
+            for sufix in ("", "-wal", "-shm"):
+                if os.path.exists("db_program_facturare.db" + sufix):
+                    os.remove("db_program_facturare.db" + sufix)
+
+        from facturare.baza_date import get_engine, init_db
+        from facturare.modele import Base
+
+        from .generator import generare_date
+        from .scenarii import scenarii
+
+        engine = get_engine()
+        if argumente.mysql:
+            Base.metadata.drop_all(engine)
+        init_db()
+
+        print(f"Generare date: {scala}", file=sys.stderr)
+        raport_generare = generare_date(
+            engine,
+            linii_pe_factura=argumente.linii_pe_factura,
+            samanta=argumente.samanta,
+            **scala,
+        )
+        print(f"  {raport_generare['durata_totala']} s", file=sys.stderr)
+
+        alese = argumente.scenarii.split(",") if argumente.scenarii else None
+        context = {
+            "scala": scala,
+            "generare": raport_generare,
+            "repetari": argumente.repetari,
+            "randuri_import": argumente.randuri_import
+            or randuri_import[argumente.scala],
+            "aleator": random.Random(argumente.samanta),
+        }
+        import sqlalchemy
+
+        rezultate = {
+            "meta": {
+                "commit": _commit(),
+                "data": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "sqlalchemy": sqlalchemy.__version__,
+                "platforma": platform.platform(),
+                "baza_date": engine.dialect.name,
+                "scala": scala,
+                "linii_pe_factura": argumente.linii_pe_factura,
+                "repetari": argumente.repetari,
+                "randuri_import": context["randuri_import"],
+            },
+            "generare": raport_generare,
+            "scenarii": {},
+        }
+        for nume, scenariu in scenarii:
+            if alese and nume not in alese:
+                continue
+            inceput = time.perf_counter()
+            try:
+                rezultate["scenarii"][nume] = scenariu(context)
+            except Exception as e:
+                rezultate["scenarii"][nume] = {"eroare": f"{type(e).__name__}: {e}"}
+            print(
+                f"{nume}: {time.perf_counter() - inceput:.1f} s", file=sys.stderr
+            )
+    finally:
+        os.chdir(director_initial)
+        if not argumente.director:
+            shutil.rmtree(director, ignore_errors=True)
+
+    regresii = comparare(rezultate, referinta, argumente.prag)
+    _afisare_rezultate(rezultate, regresii)
+    if iesire:
+        with open(iesire, "w", encoding="utf-8") as f:
+            json.dump(rezultate, f, indent=2, ensure_ascii=False)
+        print(f"\nRezultatele au fost scrise in fisierul: {iesire}")
+    sys.exit(1 if regresii else 0)
+
+
+if __name__ == "__main__":
+    main()
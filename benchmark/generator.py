@@ -0,0 +1,308 @@
+# date sintetice pentru benchmark-uri: clienti, produse si facturi cu linii si
+# totaluri calculate in bani, inserate prin executemany pe loturi mari, fara ORM
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, select, text
+
+from facturare.bani import cota_tva, in_puncte
+from facturare.migrari import _migrare_cautare, indexuri_cautare
+from facturare.modele import Base, Client, Factura, Produs, SerieFactura
+from facturare.servicii import formatare_numar_factura, serie_implicita
+from facturare.totaluri_zilnice import reconstruire_totaluri_zilnice
+
+dimensiune_lot = 50000
+tabele_generate = ("clienti", "produse", "facturi", "linii_factura")
+
+cuvinte_produse = (
+    "Laptop", "Mouse", "Tastatura", "Monitor", "Cablu", "Imprimanta", "Boxa",
+    "Casti", "Router", "Switch", "Camera", "Telefon", "Tableta", "Incarcator",
+    "Baterie", "Hartie", "Toner", "Scaun", "Birou", "Lampa",
+)  # fmt: skip
+atribute_produse = (
+    "Pro", "Ultra", "Mini", "Max", "Lite", "Plus", "Office", "Gaming", "USB", "Eco",
+)  # fmt: skip
+strazi = (
+    "Str. Mihai Viteazu", "Bd. Unirii", "Calea Victoriei", "Str. Avram Iancu",
+    "Bd. Eroilor", "Str. Florilor", "Calea Mosilor", "Str. Lalelelor",
+)  # fmt: skip
+orase = ("Bucuresti", "Cluj-Napoca", "Iasi", "Timisoara", "Brasov", "Constanta")
+
+
+def _inserare(conexiune, tabela, coloane, randuri):
+    # executemany direct pe driver; valorile sunt deja in forma salvata
+    marcaj = "?" if conexiune.dialect.paramstyle == "qmark" else "%s"
+    instructiune = (
+        f"INSERT INTO {tabela} ({', '.join(coloane)}) "
+        f"VALUES ({', '.join([marcaj] * len(coloane))})"
+    )
+    for i in range(0, len(randuri), dimensiune_lot):
+        conexiune.exec_driver_sql(instructiune, randuri[i : i + dimensiune_lot])
+    return len(randuri)
+
+
+def _intre(aleator, minim, maxim):
+    # mai rapid decat randint pentru milioane de valori
+    return minim + int(aleator.random() * (maxim - minim + 1))
+
+
+def _ultimul_id(conexiune, model):
+    return conexiune.execute(select(func.coalesce(func.max(model.id), 0))).scalar()
+
+
+def generare_clienti(conexiune, numar, aleator):
+    inceput = _ultimul_id(conexiune, Client)
+    randuri = [
+        (
+            i,
+            f"Client {i} SRL",
+            f"RO{i:09d}",
+            f"{aleator.choice(strazi)} {_intre(aleator, 1, 200)}, "
+            f"{aleator.choice(orase)}",
+        )
+        for i in range(inceput + 1, inceput + numar + 1)
+    ]
+    _inserare(
+        conexiune, "clienti", ("id", "nume_client", "cui", "adresa_client"), randuri
+    )
+    return inceput + 1, inceput + numar
+
+
+def generare_produse(conexiune, numar, aleator):
+    inceput = _ultimul_id(conexiune, Produs)
+    randuri = []
+    for i in range(inceput + 1, inceput + numar + 1):
+        # majoritatea produselor folosesc cota implicita; stocul ajunge pentru
+        # emiterile scenariilor, ca doar stoc_concurent sa ajunga la lipsa
+        cota = None if aleator.random() < 0.8 else aleator.choice((500, 900))
+        randuri.append(
+            (
+                i,
+                f"{aleator.choice(cuvinte_produse)} "
+                f"{aleator.choice(atribute_produse)} {i}",
+                _intre(aleator, 10000, 100000),
+                _intre(aleator, 100, 500000),
+                cota,
+            )
+        )
+    _inserare(
+        conexiune,
+        "produse",
+        ("id", "denumire_produs", "cantitate", "pret_unitar", "cota_tva"),
+        randuri,
+    )
+    return inceput + 1, inceput + numar, randuri
+
+
+def generare_facturi(
+    conexiune,
+    numar,
+    clienti,
+    furnizori,
+    produse,
+    aleator,
+    linii_pe_factura=5,
+    zile=365,
+):
+    # facturile sunt emise in ordinea id-urilor, repartizate pe ultimele `zile`
+    inceput_id = _ultimul_id(conexiune, Factura)
+    serie = serie_implicita
+    ultimul_numar = (
+        conexiune.execute(
+            select(SerieFactura.ultimul_numar).where(
+                SerieFactura.serie == serie, SerieFactura.an == 0
+            )
+        ).scalar()
+        or 0
+    )
+    cota_implicita = in_puncte(cota_tva)
+    produse = [
+        (produs_id, denumire, pret, cota_implicita if cota is None else cota)
+        for produs_id, denumire, _, pret, cota in produse
+    ]
+    numar_produse = len(produse)
+    sfarsit = datetime.now().replace(microsecond=0)
+    inceput = sfarsit - timedelta(days=zile)
+    pas = zile * 86400 / max(numar, 1)
+    linii_maxime = max(1, 2 * linii_pe_factura - 1)
+    prim_furnizor, numar_furnizori = furnizori[0], furnizori[1] - furnizori[0] + 1
+    prim_client, numar_clienti = clienti[0], clienti[1] - clienti[0] + 1
+    unif = aleator.random
+    numar_linii = 0
+
+    for lot_inceput in range(0, numar, dimensiune_lot):
+        facturi = []
+        linii = []
+        adaugare_linie = linii.append
+        for i in range(lot_inceput, min(numar, lot_inceput + dimensiune_lot)):
+            factura_id = inceput_id + i + 1
+            subtotal = tva_factura = 0
+            # produsele unei facturi sunt distincte
+            alese = {
+                int(unif() * numar_produse)
+                for _ in range(1 + int(unif() * linii_maxime))
+            }
+            for pozitie in alese:
+                produs_id, denumire, pret, cota = produse[pozitie]
+                cantitate = 1 + int(unif() * 10)
+                total = cantitate * pret
+                # aceeasi rotunjire ca tva_bani, pentru valori pozitive
+                tva = (total * cota + 5000) // 10000
+                subtotal += total
+                tva_factura += tva
+                adaugare_linie(
+                    (factura_id, produs_id, denumire, cantitate, pret, cota, total, tva)
+                )
+            data_emitere = inceput + timedelta(seconds=int(i * pas))
+            facturi.append(
+                (
+                    factura_id,
+                    formatare_numar_factura(serie, 0, ultimul_numar + i + 1),
+                    data_emitere.isoformat(sep=" "),
+                    prim_furnizor + int(unif() * numar_furnizori),
+                    prim_client + int(unif() * numar_clienti),
+                    subtotal,
+                    tva_factura,
+                    subtotal + tva_factura,
+                )
+            )
+        _inserare(
+            conexiune,
+            "facturi",
+            (
+                "id",
+                "numar_factura",
+                "data_emitere",
+                "furnizor_id",
+                "client_id",
+                "subtotal",
+                "tva",
+                "total",
+            ),
+            facturi,
+        )
+        numar_linii += _inserare(
+            conexiune,
+            "linii_factura",
+            (
+                "factura_id",
+                "produs_id",
+                "denumire_produs",
+                "cantitate",
+                "pret_unitar",
+                "cota_tva",
+                "total_linie",
+                "tva_linie",
+            ),
+            linii,
+        )
+
+    # contorul seriei continua dupa ultima factura generata
+    conexiune.execute(
+        delete(SerieFactura).where(SerieFactura.serie == serie, SerieFactura.an == 0)
+    )
+    conexiune.execute(
+        insert(SerieFactura).values(
+            serie=serie, an=0, ultimul_numar=ultimul_numar + numar
+        )
+    )
+    return inceput_id + 1, inceput_id + numar, numar_linii
+
+
+def _inainte_de_incarcare(conexiune):
+    # pe SQLite indexurile secundare si triggerele de cautare se refac o
+    # singura data dupa incarcare; pe MySQL se suspenda doar verificarile
+    if conexiune.dialect.name == "mysql":
+        conexiune.exec_driver_sql("SET foreign_key_checks = 0, unique_checks = 0")
+        return
+    conexiune.exec_driver_sql("PRAGMA cache_size = -262144")
+    for tabela in tabele_generate:
+        for index in Base.metadata.tables[tabela].indexes:
+            index.drop(conexiune, checkfirst=True)
+    for nume_index, _ in indexuri_cautare.values():
+        conexiune.execute(text(f"DROP TRIGGER IF EXISTS {nume_index}_ai"))
+
+
+def _dupa_incarcare(conexiune):
+    if conexiune.dialect.name == "mysql":
+        conexiune.exec_driver_sql("SET foreign_key_checks = 1, unique_checks = 1")
+        return
+    for tabela in tabele_generate:
+        for index in Base.metadata.tables[tabela].indexes:
+            index.create(conexiune, checkfirst=True)
+    # recreeaza triggerele lipsa si reconstruieste indexurile de cautare
+    _migrare_cautare(conexiune)
+    # statistici aproximative pentru planificator, fara parcurgerea tabelelor
+    conexiune.exec_driver_sql("PRAGMA analysis_limit = 1000")
+    conexiune.exec_driver_sql("ANALYZE")
+
+
+def generare_date(
+    engine,
+    clienti=1000,
+    produse=10000,
+    facturi=10000,
+    linii_pe_factura=5,
+    zile=365,
+    samanta=1,
+):
+    aleator = random.Random(samanta)
+    raport = {}
+
+    def cronometrat(nume, functie, *args, **kwargs):
+        inceput = time.perf_counter()
+        rezultat = functie(*args, **kwargs)
+        raport[f"durata_{nume}"] = round(time.perf_counter() - inceput, 3)
+        return rezultat
+
+    with engine.begin() as conexiune:
+        _inainte_de_incarcare(conexiune)
+        interval_clienti = cronometrat(
+            "clienti", generare_clienti, conexiune, clienti, aleator
+        )
+        *interval_produse, randuri_produse = cronometrat(
+            "produse", generare_produse, conexiune, produse, aleator
+        )
+        # primul procent din clienti emite facturile
+        furnizori = (
+            interval_clienti[0],
+            interval_clienti[0] + max(1, clienti // 100) - 1,
+        )
+        *interval_facturi, numar_linii = cronometrat(
+            "facturi",
+            generare_facturi,
+            conexiune,
+            facturi,
+            interval_clienti,
+            furnizori,
+            randuri_produse,
+            aleator,
+            linii_pe_factura,
+            zile,
+        )
+        cronometrat("indexuri", _dupa_incarcare, conexiune)
+        cronometrat("totaluri_zilnice", reconstruire_totaluri_zilnice, conexiune)
+    if engine.dialect.name == "sqlite":
+        # incarcarea a trecut prin WAL; datele se muta in fisierul bazei ca
+        # masuratorile sa nu plateasca parcurgerea unui jurnal urias
+        with engine.connect() as conexiune:
+            cronometrat(
+                "checkpoint",
+                conexiune.exec_driver_sql,
+                "PRAGMA wal_checkpoint(TRUNCATE)",
+            )
+
+    raport.update(
+        {
+            "clienti": list(interval_clienti),
+            "furnizori": list(furnizori),
+            "produse": list(interval_produse),
+            "facturi": list(interval_facturi),
+            "linii": numar_linii,
+        }
+    )
+    raport["durata_totala"] = round(
+        sum(v for k, v in raport.items() if k.startswith("durata_")), 3
+    )
+    return raport
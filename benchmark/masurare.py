@@ -0,0 +1,168 @@
+# unelte de masurare pentru benchmark-uri: durate cu percentile, numarul de
+# interogari, memoria maxima si compararea cu o rulare de referinta
+import contextlib
+import io
+import multiprocessing
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+def metrica(valoare, unitate, mai_bine="mic", prag=None):
+    # mai_bine: "mic" pentru durate si memorie, "mare" pentru debite;
+    # valorile booleene sunt verificari de corectitudine
+    rezultat = {"valoare": valoare, "unitate": unitate, "mai_bine": mai_bine}
+    if prag is not None:
+        rezultat["prag"] = prag
+    return rezultat
+
+
+def corect(valoare):
+    return metrica(bool(valoare), "bool", "adevarat")
+
+
+def _percentila(sortate, procent):
+    if len(sortate) == 1:
+        return sortate[0]
+    pozitie = (len(sortate) - 1) * procent / 100
+    jos = int(pozitie)
+    sus = min(jos + 1, len(sortate) - 1)
+    return sortate[jos] + (sortate[sus] - sortate[jos]) * (pozitie - jos)
+
+
+def statistici(durate, prefix):
+    # durate in secunde -> milisecunde cu percentile si operatii pe secunda
+    if not durate:
+        return {}
+    sortate = sorted(durate)
+    rezultat = {
+        f"{prefix}_p50": metrica(round(_percentila(sortate, 50) * 1000, 3), "ms"),
+        f"{prefix}_p95": metrica(round(_percentila(sortate, 95) * 1000, 3), "ms"),
+        f"{prefix}_p99": metrica(
+            round(_percentila(sortate, 99) * 1000, 3), "ms", prag=0.5
+        ),
+    }
+    total = sum(durate)
+    if total:
+        rezultat[f"{prefix}_pe_secunda"] = metrica(
+            round(len(durate) / total, 1), "op/s", "mare"
+        )
+    return rezultat
+
+
+def cronometrare(functie, repetari, *args, **kwargs):
+    durate = []
+    for _ in range(repetari):
+        inceput = time.perf_counter()
+        functie(*args, **kwargs)
+        durate.append(time.perf_counter() - inceput)
+    return durate
+
+
+def debit(functie, numar, unitate, *args, **kwargs):
+    # o singura rulare care proceseaza `numar` elemente
+    inceput = time.perf_counter()
+    rezultat = functie(*args, **kwargs)
+    durata = time.perf_counter() - inceput
+    return rezultat, metrica(round(numar / durata, 1), unitate, "mare"), durata
+
+
+@contextlib.contextmanager
+def numarare_interogari():
+    # numara instructiunile trimise bazei de date, pe toate engine-urile, in
+    # total si dupa primul cuvant (select, insert, begin...)
+    numarator = {"interogari": 0, "tipuri": {}}
+
+    def _la_executie(conexiune, cursor, instructiune, *args):
+        numarator["interogari"] += 1
+        tip = instructiune.lstrip().split(None, 1)[0].lower() if instructiune else ""
+        numarator["tipuri"][tip] = numarator["tipuri"].get(tip, 0) + 1
+
+    event.listen(Engine, "before_cursor_execute", _la_executie)
+    try:
+        yield numarator
+    finally:
+        event.remove(Engine, "before_cursor_execute", _la_executie)
+
+
+@contextlib.contextmanager
+def fara_afisare():
+    # serviciile raporteaza prin print; iesirea lor nu intra in rezultate
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+@contextlib.contextmanager
+def memorie_python():
+    # varful alocarilor Python din bloc, in MB
+    rezultat = {}
+    tracemalloc.start()
+    try:
+        yield rezultat
+    finally:
+        _, varf = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rezultat["varf_mb"] = round(varf / 1024 / 1024, 2)
+
+
+def _varf_rss_mb():
+    # pe Linux ru_maxrss se pastreaza la exec, deci un proces pornit prin spawn
+    # ar raporta varful parintelui; VmHWM porneste de la zero
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for linie in f:
+                if linie.startswith("VmHWM:"):
+                    return int(linie.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _rulare_masurata(functie, args):
+    with fara_afisare():
+        rezultat = functie(*args)
+    return rezultat, _varf_rss_mb()
+
+
+def in_proces_separat(functie, *args):
+    # memoria maxima (RSS) a unei operatii, masurata intr-un proces nou ca sa
+    # nu includa restul benchmark-ului; functia trebuie sa fie importabila
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(1, mp_context=context) as executor:
+        inceput = time.perf_counter()
+        rezultat, rss = executor.submit(_rulare_masurata, functie, args).result()
+        durata = time.perf_counter() - inceput
+    return rezultat, round(rss, 1), durata
+
+
+def comparare(rezultate, referinta, prag):
+    # regresiile fata de referinta: metricile numerice care s-au inrautatit cu
+    # mai mult decat pragul relativ si verificarile de corectitudine picate
+    regresii = []
+    vechi = referinta.get("scenarii", {}) if referinta else {}
+    for scenariu, metrici in rezultate["scenarii"].items():
+        if "eroare" in metrici:
+            regresii.append((scenariu, "eroare", None, metrici["eroare"]))
+            continue
+        for nume, m in metrici.items():
+            if m["mai_bine"] == "adevarat":
+                if not m["valoare"]:
+                    regresii.append((scenariu, nume, True, False))
+                continue
+            anterior = vechi.get(scenariu, {}).get(nume)
+            if not anterior or not anterior["valoare"] or m["valoare"] is None:
+                continue
+            raport = m["valoare"] / anterior["valoare"]
+            limita = m.get("prag", prag)
+            if m["mai_bine"] == "mic":
+                inrautatit = raport > 1 + limita
+            else:
+                inrautatit = raport < 1 / (1 + limita)
+            if inrautatit:
+                regresii.append((scenariu, nume, anterior["valoare"], m["valoare"]))
+    return regresii
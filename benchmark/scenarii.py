@@ -0,0 +1,1247 @@
+# scenariile masurate; fiecare primeste contextul rularii si intoarce un
+# dictionar de metrici construite cu masurare.metrica
+import asyncio
+import csv
+import multiprocessing
+import os
+import re
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date
+from decimal import Decimal
+from itertools import repeat
+
+from sqlalchemy import delete, func, select, update
+
+from facturare import bani, cache, joburi
+from facturare.arhivare import (
+    _get_engine_arhiva,
+    arhivare_facturi,
+    date_factura_arhivata,
+    listare_facturi_arhivate,
+    numar_facturi_arhivate,
+)
+from facturare.baza_date import get_engine, sesiuni, unit_of_work
+from facturare.cache import golire_cache, invalidare_produse, produse_dupa_id
+from facturare.cautare import cautare_clienti, cautare_produse
+from facturare.exportare import exportare_facturi
+from facturare.importare import importare_produse
+from facturare.instrumentare import (
+    activare_instrumentare,
+    cronometru,
+    dezactivare_instrumentare,
+    instrumentare_activa,
+    resetare_metrici,
+)
+from facturare.joburi import adaugare_job, adaugare_joburi, rulare_lucratori, tip_job
+from facturare.modele import Factura, Job, LinieFactura, MiscareStoc, Produs
+from facturare.randare import (
+    genereaza_factura,
+    genereaza_factura_txt,
+    genereaza_facturi_txt_batch,
+    incarcare_date_factura,
+    scriere_atomica,
+)
+from facturare.rapoarte import (
+    venituri_pe_client,
+    venituri_pe_cota_tva,
+    venituri_pe_luna,
+    venituri_pe_produs,
+)
+from facturare.sabloane import formate_document, randare_document
+from facturare.server_http import pornire_server
+from facturare.servicii import (
+    adaugare_client,
+    adaugare_factura,
+    adaugare_facturi_bulk,
+    calcul_linie,
+    cautare_numar_factura,
+    generare_numar_factura,
+    iter_clienti,
+    iter_facturi,
+    listare_facturi,
+    numar_inregistrari,
+    stergere_client,
+    stergere_factura,
+    stergere_produs,
+)
+from facturare.totaluri_zilnice import reconstruire_totaluri_zilnice
+
+from .masurare import (
+    corect,
+    cronometrare,
+    debit,
+    fara_afisare,
+    in_proces_separat,
+    memorie_python,
+    metrica,
+    numarare_interogari,
+    statistici,
+)
+
+radacina = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _specificatie(context, linii=5):
+    # factura aleatoare intre datele generate, cu cantitatea 1 pe fiecare linie
+    aleator = context["aleator"]
+    generare = context["generare"]
+    produse_ids = [aleator.randint(*generare["produse"]) for _ in range(linii)]
+    return {
+        "furnizor_id": aleator.randint(*generare["furnizori"]),
+        "client_id": aleator.randint(*generare["clienti"]),
+        "produse_ids": produse_ids,
+        "cantitati": {produs_id: 1 for produs_id in produse_ids},
+    }
+
+
+def _emitere(spec):
+    return adaugare_factura(
+        spec["furnizor_id"], spec["client_id"], spec["produse_ids"], spec["cantitati"]
+    )
+
+
+def _durate_emitere(specificatii, erori=None):
+    # cu o lista de erori, emiterile esuate se numara in loc sa opreasca
+    # scenariul; duratele raman doar pentru facturile emise
+    durate = []
+    for spec in specificatii:
+        inceput = time.perf_counter()
+        try:
+            _emitere(spec)
+        except Exception as e:
+            if erori is None:
+                raise
+            erori.append(e)
+            continue
+        durate.append(time.perf_counter() - inceput)
+    return durate
+
+
+def _numere_duplicate(numere):
+    return len(numere) - len(set(numere))
+
+
+def _numere_contigue(numere):
+    # in fiecare serie, numerele rezervate formeaza un interval fara goluri
+    pe_serii = {}
+    for numar in numere:
+        prefix, cifre = re.match(r"(.*?)(\d+)$", numar).groups()
+        pe_serii.setdefault(prefix, []).append(int(cifre))
+    return all(max(v) - min(v) + 1 == len(v) for v in pe_serii.values())
+
+
+# bugetul de import al modulelor pachetului (fara dependente), masurat cu
+# python -X importtime; scenariul pica daca este depasit
+buget_import_ms = 100
+
+_program_import = (
+    "import sys, time\n"
+    "inceput = time.perf_counter()\n"
+    "import facturare\n"
+    "durata = time.perf_counter() - inceput\n"
+    "asincron = sys.modules.get('facturare.asincron')\n"
+    "fara_engine = facturare.baza_date._engine is None and (\n"
+    "    asincron is None or asincron._engine_async is None\n"
+    ")\n"
+    "print(durata, fara_engine)\n"
+)
+
+
+def _durata_module_proprii(importtime):
+    # suma timpilor proprii (fara submodulele importate) ai modulelor pachetului
+    total = 0
+    for linie in importtime.splitlines():
+        potrivire = re.match(r"import time:\s+(\d+) \|\s+\d+ \|\s+(\S+)$", linie)
+        if potrivire and potrivire[2].split(".")[0] == "facturare":
+            total += int(potrivire[1])
+    return total / 1000
+
+
+def import_pachet(context):
+    # importul pachetului nu trebuie sa creeze fisiere, engine-uri sau conexiuni
+    durate = []
+    module_proprii = []
+    fara_engine = True
+    with tempfile.TemporaryDirectory() as director:
+        for _ in range(5):
+            rezultat = subprocess.run(
+                [sys.executable, "-X", "importtime", "-c", _program_import],
+                cwd=director,
+                env={**os.environ, "PYTHONPATH": radacina},
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            durata, engine_absent = rezultat.stdout.split()
+            durate.append(float(durata))
+            fara_engine = fara_engine and engine_absent == "True"
+            module_proprii.append(_durata_module_proprii(rezultat.stderr))
+        fisiere = os.listdir(director)
+    return {
+        "durata_import": metrica(round(min(durate) * 1000, 1), "ms"),
+        "durata_import_module_proprii": metrica(round(min(module_proprii), 1), "ms"),
+        "import_in_buget": corect(0 < min(module_proprii) <= buget_import_ms),
+        "fara_fisiere_la_import": corect(not fisiere),
+        "fara_engine_la_import": corect(fara_engine),
+    }
+
+
+def calcule_bani(context):
+    # calculul pe lot trebuie sa dea exact rezultatul Decimal al calcul_linie
+    aleator = context["aleator"]
+    numar = 200000
+    cantitati = [aleator.randint(-5, 1000) for _ in range(numar)]
+    preturi = [aleator.randint(-100000, 10000000) for _ in range(numar)]
+    cote = [aleator.choice((0, 500, 900, 1900, 2100)) for _ in range(numar)]
+
+    rezultat = {}
+    variante = [("python", False)]
+    if bani._incarcare_numpy() is not None:
+        variante.append(("numpy", bani._numpy))
+    numpy_initial = bani._numpy
+    calculate = {}
+    try:
+        for nume, modul in variante:
+            bani._numpy = modul
+            calculate[nume], rezultat[f"linii_lot_{nume}"], _ = debit(
+                bani.calcul_linii_lot, numar, "linii/s", cantitati, preturi, cote
+            )
+    finally:
+        bani._numpy = numpy_initial
+
+    verificate = 20000
+    inceput = time.perf_counter()
+    referinta = []
+    for cantitate, pret, cota in zip(
+        cantitati[:verificate], preturi[:verificate], cote[:verificate]
+    ):
+        linie = calcul_linie(
+            0, "", cantitate, bani.din_bani(pret), bani.din_puncte(cota)
+        )
+        referinta.append(
+            (bani.in_bani(linie["total_linie"]), bani.in_bani(linie["tva_linie"]))
+        )
+    rezultat["linii_decimal"] = metrica(
+        round(verificate / (time.perf_counter() - inceput), 1), "linii/s", "mare"
+    )
+    for nume, (totaluri, tva) in calculate.items():
+        rezultat[f"egal_decimal_{nume}"] = corect(
+            list(zip(totaluri[:verificate], tva[:verificate])) == referinta
+        )
+    return rezultat
+
+
+def _numere_in_proces(numar):
+    return [generare_numar_factura() for _ in range(numar)]
+
+
+def numerotare(context):
+    rezultat = statistici(
+        cronometrare(generare_numar_factura, context["repetari"]),
+        "generare_numar_factura",
+    )
+    # mai multe procese rezerva numere in acelasi timp
+    with ProcessPoolExecutor(
+        4, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        numere = [n for lot in executor.map(_numere_in_proces, [100] * 4) for n in lot]
+    rezultat["numere_unice_intre_procese"] = corect(not _numere_duplicate(numere))
+    rezultat["numere_fara_goluri"] = corect(_numere_contigue(numere))
+    return rezultat
+
+
+def emitere_factura(context):
+    specificatii = [_specificatie(context) for _ in range(context["repetari"])]
+    with fara_afisare(), numarare_interogari() as numarator:
+        durate = _durate_emitere(specificatii)
+    rezultat = statistici(durate, "adaugare_factura")
+    rezultat["interogari_pe_factura"] = metrica(
+        round(numarator["interogari"] / len(specificatii), 2), "interogari"
+    )
+    return rezultat
+
+
+def emitere_lot(context):
+    # emiterea pe loturi fata de apelurile adaugare_factura, la 1k, 10k si 100k
+    # facturi (cat permite scala); fiecare apel individual are tranzactia lui,
+    # deci viteza lui nu depinde de numar si se masoara o singura data
+    rezultat = {}
+    esantion = [
+        _specificatie(context) for _ in range(max(100, context["repetari"] * 5))
+    ]
+    with fara_afisare():
+        _, individual, _ = debit(
+            _durate_emitere, len(esantion), "facturi/s", esantion
+        )
+    rezultat["adaugare_factura_individual"] = individual
+    numere = []
+    emise = True
+    for numar, eticheta in ((1000, "1k"), (10000, "10k"), (100000, "100k")):
+        if numar > max(1000, context["scala"]["facturi"]):
+            break
+        specificatii = [_specificatie(context) for _ in range(numar)]
+        with fara_afisare():
+            raport, viteza, _ = debit(
+                adaugare_facturi_bulk, numar, "facturi/s", specificatii
+            )
+        numere += [r["numar_factura"] for r in raport if r["numar_factura"]]
+        emise = emise and all(r["factura_id"] for r in raport)
+        rezultat[f"adaugare_facturi_bulk_{eticheta}"] = viteza
+        rezultat[f"accelerare_lot_{eticheta}"] = metrica(
+            round(viteza["valoare"] / individual["valoare"], 1), "x", "mare"
+        )
+    rezultat["toate_emise"] = corect(emise)
+    rezultat["numere_unice"] = corect(not _numere_duplicate(numere))
+    return rezultat
+
+
+def _emiteri_fir(specificatii, erori):
+    # dupa fiecare emitere sesiunea firului se inchide: o unitate noua porneste
+    # cu identity map-ul gol, iar la final firul nu mai are nicio sesiune
+    durate = []
+    obiecte = []
+    for spec in specificatii:
+        durate += _durate_emitere([spec], erori)
+        with unit_of_work() as session:
+            obiecte.append(len(session.identity_map))
+    return durate, max(obiecte), sesiuni.registry.has()
+
+
+def concurenta_fire(context):
+    # emitere simultana din mai multe fire, fiecare cu sesiunea lui
+    fire = 8
+    specificatii = [
+        [_specificatie(context) for _ in range(max(5, context["repetari"] // fire))]
+        for _ in range(fire)
+    ]
+    inceput_id = _ultima_factura()
+    erori = []
+    with fara_afisare(), ThreadPoolExecutor(fire) as executor:
+        inceput = time.perf_counter()
+        rezultate = list(executor.map(_emiteri_fir, specificatii, repeat(erori)))
+        durata = time.perf_counter() - inceput
+    durate = [d for durate_fir, _, _ in rezultate for d in durate_fir]
+    with unit_of_work() as session:
+        numere = (
+            session.execute(
+                select(Factura.numar_factura).where(Factura.id > inceput_id)
+            )
+            .scalars()
+            .all()
+        )
+    rezultat = statistici(durate, "adaugare_factura_concurent")
+    rezultat["adaugare_factura_concurent_total"] = metrica(
+        round(len(durate) / durata, 1), "facturi/s", "mare"
+    )
+    rezultat["erori_emitere"] = metrica(len(erori), "erori")
+    rezultat["fara_erori"] = corect(not erori)
+    rezultat["numere_unice"] = corect(
+        len(numere) == len(durate) and not _numere_duplicate(numere)
+    )
+    rezultat["identity_map_gol_intre_unitati"] = corect(
+        all(obiecte == 0 for _, obiecte, _ in rezultate)
+    )
+    rezultat["fara_sesiuni_ramase"] = corect(
+        not any(sesiune_ramasa for _, _, sesiune_ramasa in rezultate)
+    )
+    return rezultat
+
+
+def _emiteri_stoc_in_proces(specificatii, dimensiune_lot):
+    # dimensiune_lot=None: facturi emise una cate una, altfel pe loturi
+    with fara_afisare():
+        if dimensiune_lot is None:
+            durate = []
+            emise = 0
+            for spec in specificatii:
+                inceput = time.perf_counter()
+                emise += _emitere(spec) is not None
+                durate.append(time.perf_counter() - inceput)
+            return emise, durate
+        raport = adaugare_facturi_bulk(specificatii, dimensiune_lot)
+    return sum(1 for r in raport if r["factura_id"]), []
+
+
+def stoc_concurent(context):
+    # procese care emit simultan pe aceleasi produse, cu cerere mai mare decat
+    # stocul: stocul nu trebuie sa scada sub zero si fiecare bucata vanduta
+    # trebuie sa apara pe o factura si in istoricul stocului
+    aleator = context["aleator"]
+    generare = context["generare"]
+    repetari = context["repetari"]
+    # cererea asteptata: 5 procese * repetari facturi * ~2 produse * ~2 bucati,
+    # adica ~repetari bucati pe fiecare din cele 20 de produse; stocul este
+    # jumatate, deci o parte din facturi sunt respinse la orice scala
+    stoc_initial = max(2, repetari // 2)
+    prim, ultim = generare["produse"]
+    produse_ids = aleator.sample(range(prim, ultim + 1), 20)
+    with unit_of_work(scriere=True) as session:
+        stoc_anterior = session.execute(
+            select(Produs.id, Produs.cantitate).where(Produs.id.in_(produse_ids))
+        ).all()
+        session.execute(
+            update(Produs)
+            .where(Produs.id.in_(produse_ids))
+            .values(cantitate=stoc_initial)
+        )
+        miscari_inainte = session.execute(select(func.max(MiscareStoc.id))).scalar()
+    inceput_id = _ultima_factura()
+
+    def specificatie():
+        produse = aleator.sample(produse_ids, aleator.randint(1, 3))
+        return {
+            "furnizor_id": aleator.randint(*generare["furnizori"]),
+            "client_id": aleator.randint(*generare["clienti"]),
+            "produse_ids": produse,
+            "cantitati": {produs_id: aleator.randint(1, 3) for produs_id in produse},
+        }
+
+    # patru procese emit facturi una cate una, unul pe loturi de 50
+    lucrari = [([specificatie() for _ in range(repetari)], None) for _ in range(4)]
+    lucrari.append(([specificatie() for _ in range(repetari)], 50))
+    with ProcessPoolExecutor(
+        len(lucrari), mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        inceput = time.perf_counter()
+        rezultate = list(executor.map(_emiteri_stoc_in_proces, *zip(*lucrari)))
+        durata = time.perf_counter() - inceput
+    emise = sum(numar for numar, _ in rezultate)
+    cerute = len(lucrari) * repetari
+
+    with unit_of_work() as session:
+        stoc = dict(
+            session.execute(
+                select(Produs.id, Produs.cantitate).where(Produs.id.in_(produse_ids))
+            ).all()
+        )
+        vandut = dict(
+            session.execute(
+                select(LinieFactura.produs_id, func.sum(LinieFactura.cantitate))
+                .join(Factura, Factura.id == LinieFactura.factura_id)
+                .where(Factura.id > inceput_id, LinieFactura.produs_id.in_(produse_ids))
+                .group_by(LinieFactura.produs_id)
+            ).all()
+        )
+        miscari = dict(
+            session.execute(
+                select(MiscareStoc.produs_id, func.sum(MiscareStoc.cantitate))
+                .where(
+                    MiscareStoc.id > (miscari_inainte or 0),
+                    MiscareStoc.produs_id.in_(produse_ids),
+                )
+                .group_by(MiscareStoc.produs_id)
+            ).all()
+        )
+        facturi_emise = session.execute(
+            select(func.count(Factura.id)).where(Factura.id > inceput_id)
+        ).scalar()
+    # scenariile urmatoare aleg produse la intamplare, deci stocul se reface
+    with unit_of_work(scriere=True) as session:
+        session.execute(update(Produs), [rand._asdict() for rand in stoc_anterior])
+
+    rezultat = statistici(
+        [d for _, durate in rezultate for d in durate], "adaugare_factura_stoc"
+    )
+    rezultat["emitere_stoc_total"] = metrica(
+        round(cerute / durata, 1), "cereri/s", "mare"
+    )
+    rezultat["respinse_lipsa_stoc"] = corect(emise < cerute)
+    rezultat["fara_stoc_negativ"] = corect(min(stoc.values()) >= 0)
+    rezultat["vandut_egal_scaderea"] = corect(
+        all(stoc_initial - stoc[p] == vandut.get(p, 0) for p in produse_ids)
+    )
+    rezultat["istoric_stoc_consistent"] = corect(
+        all(miscari.get(p, 0) == stoc[p] - stoc_initial for p in produse_ids)
+    )
+    rezultat["facturi_numarate"] = corect(facturi_emise == emise)
+    return rezultat
+
+
+def _ultima_factura():
+    with unit_of_work() as session:
+        return session.execute(select(func.coalesce(func.max(Factura.id), 0))).scalar()
+
+
+def _port_liber():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _server_in_fundal(port):
+    # serverul ruleaza in bucla lui de evenimente, intr-un fir separat
+    bucla = asyncio.new_event_loop()
+    sarcina = bucla.create_task(pornire_server("127.0.0.1", port))
+
+    def rulare():
+        asyncio.set_event_loop(bucla)
+        try:
+            with fara_afisare():
+                bucla.run_until_complete(sarcina)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            bucla.close()
+
+    fir = threading.Thread(target=rulare, daemon=True)
+    fir.start()
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+
+    def oprire():
+        bucla.call_soon_threadsafe(sarcina.cancel)
+        fir.join(10)
+
+    return oprire
+
+
+async def _client_http(port, specificatii, durate, stari):
+    import json
+
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        for spec in specificatii:
+            corp = json.dumps(
+                {**spec, "cantitati": {str(k): v for k, v in spec["cantitati"].items()}}
+            ).encode()
+            inceput = time.perf_counter()
+            writer.write(
+                (
+                    f"POST /facturi HTTP/1.1\r\nHost: 127.0.0.1\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(corp)}\r\n\r\n"
+                ).encode("latin-1")
+                + corp
+            )
+            await writer.drain()
+            stare = int((await reader.readline()).split()[1])
+            lungime = 0
+            while True:
+                linie = await reader.readline()
+                if linie in (b"\r\n", b""):
+                    break
+                nume, valoare = linie.decode("latin-1").split(":", 1)
+                if nume.lower() == "content-length":
+                    lungime = int(valoare)
+            await reader.readexactly(lungime)
+            durate.append(time.perf_counter() - inceput)
+            stari.append(stare)
+    finally:
+        writer.close()
+
+
+async def _incarcare_http(port, loturi):
+    durate, stari = [], []
+    await asyncio.gather(
+        *(_client_http(port, lot, durate, stari) for lot in loturi)
+    )
+    return durate, stari
+
+
+def server_http(context):
+    # clienti keep-alive simultani care emit facturi prin POST /facturi
+    conexiuni = 16
+    loturi = [
+        [_specificatie(context) for _ in range(max(5, context["repetari"] // 4))]
+        for _ in range(conexiuni)
+    ]
+    port = _port_liber()
+    oprire = _server_in_fundal(port)
+    try:
+        inceput = time.perf_counter()
+        durate, stari = asyncio.run(_incarcare_http(port, loturi))
+        durata = time.perf_counter() - inceput
+    finally:
+        oprire()
+    rezultat = statistici(durate, "post_facturi")
+    rezultat["post_facturi_total"] = metrica(
+        round(len(durate) / durata, 1), "cereri/s", "mare"
+    )
+    rezultat["fara_erori_http"] = corect(
+        len(stari) == sum(map(len, loturi)) and all(s == 201 for s in stari)
+    )
+    return rezultat
+
+
+def listari(context):
+    repetari = context["repetari"]
+    ultima = _ultima_factura()
+    rezultat = statistici(
+        cronometrare(listare_facturi, repetari, None, 20), "prima_pagina"
+    )
+    rezultat.update(
+        statistici(
+            cronometrare(listare_facturi, repetari, max(0, ultima - 100), 20),
+            "pagina_adanca",
+        )
+    )
+    rezultat.update(
+        statistici(
+            cronometrare(lambda: next(iter_clienti(), None), repetari), "pagina_clienti"
+        )
+    )
+    # parcurgerea completa pe pagini dupa cheie
+    with numarare_interogari() as numarator:
+        inceput = time.perf_counter()
+        numar = sum(len(pagina) for pagina in iter_facturi(dimensiune=1000))
+        durata = time.perf_counter() - inceput
+    rezultat["parcurgere_facturi"] = metrica(
+        round(numar / durata, 1), "facturi/s", "mare"
+    )
+    rezultat["o_interogare_pe_pagina"] = corect(
+        numarator["tipuri"].get("select", 0) <= numar // 1000 + 2
+    )
+    # memoria nu trebuie sa creasca odata cu tabela
+    with memorie_python() as memorie:
+        for _ in iter_facturi(dimensiune=1000):
+            pass
+    rezultat["parcurgere_varf_memorie"] = metrica(memorie["varf_mb"], "MB", prag=0.5)
+    return rezultat
+
+
+def _foloseste_indexuri(conexiune, interogare):
+    compilat = interogare.compile(conexiune, compile_kwargs={"literal_binds": True})
+    if conexiune.dialect.name == "mysql":
+        plan = conexiune.exec_driver_sql(f"EXPLAIN {compilat}").mappings().all()
+        return all(rand["type"] != "ALL" for rand in plan)
+    plan = conexiune.exec_driver_sql(f"EXPLAIN QUERY PLAN {compilat}").all()
+    return not any(rand[-1].startswith("SCAN") for rand in plan)
+
+
+def garzi_stergere(context):
+    aleator = context["aleator"]
+    repetari = context["repetari"]
+    with unit_of_work() as session:
+        clienti = session.execute(
+            select(Factura.client_id).order_by(func.random()).limit(repetari)
+        ).scalars().all()
+        produse = session.execute(
+            select(LinieFactura.produs_id).order_by(func.random()).limit(repetari)
+        ).scalars().all()
+    rezultat = {}
+    with fara_afisare():
+        # clientii si produsele folosite pe facturi raman; se masoara garda
+        for nume, stergere, ids in (
+            ("stergere_client_garda", stergere_client, clienti),
+            ("stergere_produs_garda", stergere_produs, produse),
+        ):
+            durate = []
+            for id_ in ids:
+                inceput = time.perf_counter()
+                stergere(id_)
+                durate.append(time.perf_counter() - inceput)
+            rezultat.update(statistici(durate, nume))
+        # un client nou trece de ambele verificari si este sters
+        durate = []
+        for _ in range(min(repetari, 50)):
+            client = adaugare_client(
+                "Client de sters", f"BENCH{aleator.getrandbits(48)}", "Adresa"
+            )
+            inceput = time.perf_counter()
+            stergere_client(client.id)
+            durate.append(time.perf_counter() - inceput)
+        rezultat.update(statistici(durate, "stergere_client_complet"))
+    garzi = (
+        select(Factura.numar_factura).where(Factura.furnizor_id == 1).limit(1),
+        select(Factura.numar_factura).where(Factura.client_id == 1).limit(1),
+        select(Factura.numar_factura)
+        .join(LinieFactura, LinieFactura.factura_id == Factura.id)
+        .where(LinieFactura.produs_id == 1)
+        .limit(1),
+        select(MiscareStoc.id).where(MiscareStoc.produs_id == 1).limit(1),
+    )
+    with get_engine().connect() as conexiune:
+        rezultat["garzi_folosesc_indexuri"] = corect(
+            all(_foloseste_indexuri(conexiune, garda) for garda in garzi)
+        )
+    return rezultat
+
+
+def randare(context):
+    repetari = context["repetari"]
+    prima, _ = context["generare"]["facturi"]
+    date = incarcare_date_factura(prima)
+    # o factura tipica de 20 de linii
+    date["produse"] = (date["produse"] * 20)[:20]
+    rezultat = {}
+    for format_document in formate_document:
+        durate = cronometrare(randare_document, repetari * 5, date, format_document)
+        rezultat.update(statistici(durate, f"randare_{format_document}"))
+
+    ids = range(prima, prima + repetari)
+    with tempfile.TemporaryDirectory() as director:
+        director_curent = os.getcwd()
+        # genereaza_factura_txt scrie in directorul curent
+        os.chdir(director)
+        try:
+            with fara_afisare():
+                durate = [0] * len(ids)
+                for i, factura_id in enumerate(ids):
+                    inceput = time.perf_counter()
+                    genereaza_factura_txt(factura_id)
+                    durate[i] = time.perf_counter() - inceput
+        finally:
+            os.chdir(director_curent)
+        rezultat.update(statistici(durate, "genereaza_factura_txt"))
+        numar = max(500, repetari * 10)
+        with fara_afisare():
+            raport = genereaza_facturi_txt_batch(
+                range(prima, prima + numar), director=director
+            )
+    rezultat["generare_lot_txt"] = metrica(
+        raport["facturi_pe_secunda"], "facturi/s", "mare"
+    )
+    rezultat["generare_lot_completa"] = corect(
+        raport["scrise"] + raport["sarite"] == numar
+    )
+    return rezultat
+
+
+def totaluri(context):
+    # rapoartele din totalurile zilnice trebuie sa fie identice cu agregarea
+    # directa, inclusiv dupa facturile emise de scenariile anterioare
+    rezultat = {}
+    for raport in (
+        venituri_pe_client,
+        venituri_pe_produs,
+        venituri_pe_luna,
+        venituri_pe_cota_tva,
+    ):
+        nume = raport.__name__
+        durate = cronometrare(raport, 5, din_totaluri=True)
+        rezultat[f"{nume}_totaluri"] = metrica(
+            round(min(durate) * 1000, 3), "ms"
+        )
+        inceput = time.perf_counter()
+        direct = raport(din_totaluri=False)
+        rezultat[f"{nume}_direct"] = metrica(
+            round((time.perf_counter() - inceput) * 1000, 3), "ms"
+        )
+        rezultat[f"{nume}_egal"] = corect(
+            sorted(map(tuple, raport(din_totaluri=True))) == sorted(map(tuple, direct))
+        )
+    return rezultat
+
+
+def _actualizare_pret(produs_id, pret):
+    with unit_of_work(scriere=True) as session:
+        session.execute(
+            update(Produs).where(Produs.id == produs_id).values(pret_unitar=pret)
+        )
+        invalidare_produse(session, [produs_id])
+
+
+def cache_scenariu(context):
+    specificatii = [_specificatie(context) for _ in range(context["repetari"])]
+    rezultat = {}
+    cache_initial = cache.cache_activ
+    try:
+        for activ in (True, False):
+            cache.cache_activ = activ
+            golire_cache()
+            eticheta = "cu_cache" if activ else "fara_cache"
+            with fara_afisare():
+                # prima trecere incalzeste cache-ul, a doua se masoara
+                _durate_emitere(specificatii)
+                inainte = {
+                    nume: dict(valori)
+                    for nume, valori in cache.statistici_cache().items()
+                }
+                with numarare_interogari() as numarator:
+                    durate = _durate_emitere(specificatii)
+            rezultat.update(statistici(durate, f"adaugare_factura_{eticheta}"))
+            rezultat[f"interogari_pe_factura_{eticheta}"] = metrica(
+                round(numarator["interogari"] / len(specificatii), 2), "interogari"
+            )
+            if activ:
+                dupa = cache.statistici_cache()
+                hit = sum(dupa[n]["hit"] - inainte[n]["hit"] for n in dupa)
+                miss = sum(dupa[n]["miss"] - inainte[n]["miss"] for n in dupa)
+                rezultat["rata_hit"] = metrica(
+                    round(hit / max(hit + miss, 1), 3), "fractie", "mare"
+                )
+    finally:
+        cache.cache_activ = cache_initial
+
+    # cititori si un scriitor simultan; la final cache-ul trebuie sa fie la zi
+    aleator = context["aleator"]
+    produse_ids = [aleator.randint(*context["generare"]["produse"]) for _ in range(50)]
+    oprire = threading.Event()
+
+    def cititor():
+        while not oprire.is_set():
+            with unit_of_work() as session:
+                produse_dupa_id(session, produse_ids)
+
+    cititori = [threading.Thread(target=cititor) for _ in range(4)]
+    for fir in cititori:
+        fir.start()
+    try:
+        for i in range(200):
+            _actualizare_pret(
+                aleator.choice(produse_ids), Decimal(aleator.randint(100, 99999)) / 100
+            )
+    finally:
+        oprire.set()
+        for fir in cititori:
+            fir.join()
+    with unit_of_work() as session:
+        din_cache = {
+            k: tuple(v) for k, v in produse_dupa_id(session, produse_ids).items()
+        }
+        din_baza = {
+            rand[0]: tuple(rand)
+            for rand in session.execute(
+                select(*cache.coloane_produs).where(Produs.id.in_(produse_ids))
+            )
+        }
+    rezultat["cache_consistent"] = corect(din_cache == din_baza)
+    return rezultat
+
+
+def cautare(context):
+    repetari = context["repetari"]
+    rezultat = {}
+    for nume, functie, valoare in (
+        ("produs_prefix", cautare_produse, "lapt"),
+        ("produs_doua_cuvinte", cautare_produse, "laptop pro"),
+        ("produs_aproximativ", cautare_produse, "laptpo"),
+        ("client_nume", cautare_clienti, "client 12"),
+        ("client_cui", cautare_clienti, "RO00000"),
+    ):
+        rezultat.update(
+            statistici(cronometrare(functie, repetari, valoare), f"cautare_{nume}")
+        )
+    gasite = cautare_produse("laptop pro")
+    rezultat["cautare_relevanta"] = corect(
+        gasite
+        and all(
+            "laptop" in r.denumire_produs.lower() and "pro" in r.denumire_produs.lower()
+            for r in gasite
+        )
+    )
+    return rezultat
+
+
+def importare(context):
+    # produse noi dintr-un CSV, importate intr-un proces separat; scala mare
+    # importa 2.000.000 de randuri, iar --randuri-import schimba numarul
+    aleator = context["aleator"]
+    numar = context["randuri_import"]
+    with tempfile.TemporaryDirectory() as director:
+        cale = os.path.join(director, "produse.csv")
+        with open(cale, "w", newline="", encoding="utf-8") as f:
+            scriitor = csv.writer(f)
+            scriitor.writerow(
+                ("denumire_produs", "cantitate", "pret_unitar", "cota_tva")
+            )
+            for i in range(numar):
+                scriitor.writerow(
+                    (
+                        f"Produs importat {i}",
+                        aleator.randint(0, 1000),
+                        f"{aleator.randint(1, 999999) / 100:.2f}",
+                        aleator.choice(("", "0.05", "0.09")),
+                    )
+                )
+        raport, rss, _ = in_proces_separat(importare_produse, cale)
+    return {
+        "importare_produse_csv": metrica(
+            raport["randuri_pe_secunda"], "randuri/s", "mare"
+        ),
+        "importare_varf_rss": metrica(rss, "MB", prag=0.5),
+        "importare_completa": corect(raport["inserate"] == numar),
+    }
+
+
+def exportare(context):
+    rezultat = {}
+    with tempfile.TemporaryDirectory() as director:
+        for format_fisier in ("csv", "jsonl"):
+            cale = os.path.join(director, f"facturi.{format_fisier}")
+            raport, rss, _ = in_proces_separat(exportare_facturi, cale, format_fisier)
+            rezultat[f"exportare_{format_fisier}"] = metrica(
+                raport["randuri_pe_secunda"], "randuri/s", "mare"
+            )
+            rezultat[f"exportare_{format_fisier}_varf_rss"] = metrica(
+                rss, "MB", prag=0.5
+            )
+    return rezultat
+
+
+def instrumentare(context):
+    specificatii = [_specificatie(context) for _ in range(context["repetari"])]
+    activa = instrumentare_activa()
+    functie = cronometru(lambda: None)
+    apeluri = 200000
+    try:
+        dezactivare_instrumentare()
+        inceput = time.perf_counter()
+        for _ in range(apeluri):
+            functie()
+        cost_apel = (time.perf_counter() - inceput) / apeluri
+        with fara_afisare():
+            dezactivata = _durate_emitere(specificatii)
+            activare_instrumentare()
+            activata = _durate_emitere(specificatii)
+    finally:
+        if not activa:
+            dezactivare_instrumentare()
+        resetare_metrici()
+    rezultat = {"cronometru_dezactivat": metrica(round(cost_apel * 1e9, 1), "ns")}
+    rezultat.update(statistici(dezactivata, "adaugare_factura_neinstrumentat"))
+    rezultat.update(statistici(activata, "adaugare_factura_instrumentat"))
+    return rezultat
+
+
+def _cale_fierbinte(context, sufix):
+    # operatiile zilnice care nu ar trebui sa depinda de marimea istoricului
+    repetari = context["repetari"]
+    furnizor_id = context["generare"]["furnizori"][0]
+    rezultat = statistici(
+        cronometrare(listare_facturi, repetari, None, 20), f"prima_pagina_{sufix}"
+    )
+    rezultat.update(
+        statistici(
+            cronometrare(generare_numar_factura, repetari),
+            f"generare_numar_factura_{sufix}",
+        )
+    )
+    specificatii = [_specificatie(context) for _ in range(repetari)]
+    with fara_afisare():
+        rezultat.update(
+            statistici(_durate_emitere(specificatii), f"adaugare_factura_{sufix}")
+        )
+        rezultat.update(
+            statistici(
+                cronometrare(stergere_client, repetari, furnizor_id),
+                f"stergere_client_garda_{sufix}",
+            )
+        )
+    return rezultat
+
+
+@tip_job("benchmark_lent")
+def _job_lent(cheie, director):
+    # fiecare executie se noteaza in executari.log, ca sa se vada joburile
+    # reluate dupa cadere; efectul (un rand in efecte.db) se aplica intr-o
+    # singura tranzactie si doar daca lipseste, deci o reluare nu il dubleaza
+    time.sleep(0.02)
+    with open(os.path.join(director, "executari.log"), "a", encoding="utf-8") as f:
+        f.write(f"{cheie}\n")
+    conexiune = sqlite3.connect(os.path.join(director, "efecte.db"), timeout=30)
+    try:
+        with conexiune:
+            conexiune.execute(
+                "INSERT INTO efecte (cheie) SELECT ? WHERE NOT EXISTS "
+                "(SELECT 1 FROM efecte WHERE cheie = ?)",
+                (cheie, cheie),
+            )
+    finally:
+        conexiune.close()
+    scriere_atomica(os.path.join(director, f"{cheie}.txt"), cheie)
+
+
+@tip_job("benchmark_instabil")
+def _job_instabil(cheie, director, esecuri):
+    # esueaza de `esecuri` ori, apoi reuseste
+    cale = os.path.join(director, f"{cheie}.incercari")
+    incercari = 1
+    if os.path.exists(cale):
+        with open(cale, encoding="utf-8") as f:
+            incercari += int(f.read())
+    scriere_atomica(cale, str(incercari))
+    if incercari <= esecuri:
+        raise RuntimeError(f"esecul {incercari} din {esecuri}")
+
+
+def _lucrator_in_proces(lucratori, durata_blocare):
+    joburi.durata_blocare = durata_blocare
+    joburi.pauza_reincercare = 0.05
+    with fara_afisare():
+        return rulare_lucratori(lucratori, pana_la_golire=True)
+
+
+def _joburi_dupa_cheie(chei):
+    with unit_of_work() as session:
+        return {
+            job.cheie: job
+            for job in session.execute(
+                select(Job.cheie, Job.stare, Job.incercari, Job.eroare).where(
+                    Job.cheie.in_(chei)
+                )
+            )
+        }
+
+
+def joburi_scenariu(context):
+    # documentele facturilor generate de lucratori in loc de emitere, apoi un
+    # lucrator oprit brusc in mijlocul cozii: joburile lui sunt preluate de
+    # altul dupa expirarea blocarii si fiecare efect apare o singura data
+    repetari = context["repetari"]
+    specificatii = [_specificatie(context) for _ in range(repetari * 2)]
+    rezultat = {}
+    with tempfile.TemporaryDirectory() as director:
+        durate = []
+        with fara_afisare():
+            for spec in specificatii[:repetari]:
+                inceput = time.perf_counter()
+                genereaza_factura(_emitere(spec).id, "txt", director)
+                durate.append(time.perf_counter() - inceput)
+        rezultat.update(statistici(durate, "emitere_cu_randare"))
+        formate = joburi.formate_joburi_factura
+        director_anterior = joburi.director_joburi
+        joburi.formate_joburi_factura = ["txt"]
+        joburi.director_joburi = director
+        try:
+            with fara_afisare():
+                durate = _durate_emitere(specificatii[repetari:])
+                raport, rezultat["lucratori_randare"], _ = debit(
+                    rulare_lucratori, repetari, "joburi/s", 4, None, None, True
+                )
+        finally:
+            joburi.formate_joburi_factura = formate
+            joburi.director_joburi = director_anterior
+        rezultat.update(statistici(durate, "emitere_cu_job"))
+        rezultat["documente_generate"] = corect(
+            raport["finalizat"] == repetari
+            and len(os.listdir(director)) == 2 * repetari
+        )
+
+    with tempfile.TemporaryDirectory() as director:
+        numar = max(200, repetari * 2)
+        chei = [f"benchmark_lent:{os.getpid()}:{i}" for i in range(numar)]
+        instabile = {
+            f"benchmark_instabil:{os.getpid()}:{esecuri}": esecuri
+            for esecuri in (2, 10)
+        }
+        conexiune = sqlite3.connect(os.path.join(director, "efecte.db"))
+        with conexiune:
+            conexiune.execute("CREATE TABLE efecte (cheie TEXT NOT NULL)")
+        conexiune.close()
+        with unit_of_work(scriere=True) as session:
+            adaugare_joburi(
+                session,
+                [
+                    ("benchmark_lent", {"cheie": cheie, "director": director}, cheie)
+                    for cheie in chei
+                ]
+                + [
+                    (
+                        "benchmark_instabil",
+                        {"cheie": cheie, "director": director, "esecuri": esecuri},
+                        cheie,
+                    )
+                    for cheie, esecuri in instabile.items()
+                ],
+            )
+        # aceeasi cheie intoarce jobul existent, fara un job nou
+        with fara_afisare():
+            id_job = adaugare_job("benchmark_lent", {}, chei[0])
+        with unit_of_work() as session:
+            rezultat["chei_unice"] = corect(
+                id_job
+                and session.execute(
+                    select(func.count(Job.id)).where(Job.cheie == chei[0])
+                ).scalar()
+                == 1
+            )
+
+        # primul lucrator este oprit cu SIGKILL dupa ce a terminat o treime
+        proces = multiprocessing.get_context("spawn").Process(
+            target=_lucrator_in_proces, args=(4, 1.0)
+        )
+        proces.start()
+        termen = time.monotonic() + 60
+        while time.monotonic() < termen:
+            stari = _joburi_dupa_cheie(chei).values()
+            if sum(job.stare == "finalizat" for job in stari) >= numar // 3:
+                break
+            time.sleep(0.02)
+        proces.kill()
+        proces.join()
+        stari = _joburi_dupa_cheie(chei).values()
+        ramase = sum(job.stare != "finalizat" for job in stari)
+        _, _, durata = in_proces_separat(_lucrator_in_proces, 4, 1.0)
+        rezultat["recuperare_dupa_cadere"] = metrica(
+            round(ramase / durata, 1), "joburi/s", "mare"
+        )
+
+        stari = _joburi_dupa_cheie(chei + list(instabile))
+        rezultat["joburi_finalizate"] = corect(
+            all(stari[cheie].stare == "finalizat" for cheie in chei)
+        )
+        rezultat["joburi_reluate_dupa_cadere"] = corect(
+            any(stari[cheie].incercari >= 2 for cheie in chei)
+        )
+        efecte = []
+        for cheie in chei:
+            cale = os.path.join(director, f"{cheie}.txt")
+            with open(cale, encoding="utf-8") as f:
+                efecte.append(f.read() == cheie)
+        with open(os.path.join(director, "executari.log"), encoding="utf-8") as f:
+            executari = f.read().split()
+        conexiune = sqlite3.connect(os.path.join(director, "efecte.db"))
+        try:
+            aplicate = [r[0] for r in conexiune.execute("SELECT cheie FROM efecte")]
+        finally:
+            conexiune.close()
+        # fiecare job se executa cel putin o data, iar efectul apare exact o data
+        rezultat["efect_o_singura_data"] = corect(
+            all(efecte)
+            and set(executari) == set(chei)
+            and len(executari) >= numar
+            and Counter(aplicate) == Counter(chei)
+            and len([n for n in os.listdir(director) if n.endswith(".txt")]) == numar
+        )
+        reincercat, esuat = (stari[cheie] for cheie in instabile)
+        rezultat["reincercare_cu_succes"] = corect(
+            reincercat.stare == "finalizat" and reincercat.incercari == 3
+        )
+        rezultat["esuat_dupa_max_incercari"] = corect(
+            esuat.stare == "esuat"
+            and esuat.incercari == joburi.max_incercari
+            and "esecul" in esuat.eroare
+        )
+
+    # un job vechi ramas in asteptare (reincercare amanata sau tip fara
+    # lucrator) urmat de multe joburi terminate: coada are un singur job in
+    # asteptare, deci emiterea nu trebuie oprita de limita
+    cheie_blocat = f"benchmark_lent:{os.getpid()}:blocat"
+    chei_terminate = [f"benchmark_lent:{os.getpid()}:terminat:{i}" for i in range(60)]
+    with unit_of_work(scriere=True) as session:
+        adaugare_joburi(
+            session,
+            [
+                ("benchmark_lent", {}, cheie)
+                for cheie in [cheie_blocat] + chei_terminate
+            ],
+        )
+        session.execute(
+            update(Job)
+            .where(Job.cheie == cheie_blocat)
+            .values(disponibil_la=date(9999, 1, 1))
+        )
+        session.execute(
+            update(Job).where(Job.cheie.in_(chei_terminate)).values(stare="finalizat")
+        )
+    limite = (joburi.limita_coada, joburi.asteptare_coada)
+    formate = joburi.formate_joburi_factura
+    joburi.limita_coada, joburi.asteptare_coada = 50, 0
+    joburi.formate_joburi_factura = ["txt"]
+    factura = None
+    try:
+        with fara_afisare():
+            factura = _emitere(_specificatie(context))
+    finally:
+        joburi.limita_coada, joburi.asteptare_coada = limite
+        joburi.formate_joburi_factura = formate
+        with unit_of_work(scriere=True) as session:
+            chei_sterse = [cheie_blocat] + chei_terminate
+            if factura is not None:
+                chei_sterse.append(f"randare_factura:{factura.numar_factura}:txt")
+            session.execute(delete(Job).where(Job.cheie.in_(chei_sterse)))
+    rezultat["emitere_cu_job_vechi_in_asteptare"] = corect(factura is not None)
+    return rezultat
+
+
+def _inceput_luna(luni_in_urma):
+    azi = date.today()
+    luna = azi.year * 12 + azi.month - 1 - luni_in_urma
+    return date(luna // 12, luna % 12 + 1, 1)
+
+
+def arhivare(context):
+    # ruleaza ultimul: muta in arhiva facturile mai vechi de sase luni
+    repetari = context["repetari"]
+    aleator = context["aleator"]
+    rezultat = {}
+    # stergerea logica: facturile dispar din listari si din rapoarte
+    ids = aleator.sample(range(1, _ultima_factura() + 1), repetari)
+    durate = []
+    with fara_afisare():
+        for factura_id in ids:
+            inceput = time.perf_counter()
+            stergere_factura(factura_id)
+            durate.append(time.perf_counter() - inceput)
+    rezultat.update(statistici(durate, "stergere_factura"))
+    rezultat["sterse_ascunse"] = corect(
+        not any(cautare_numar_factura(factura_id) for factura_id in ids)
+    )
+    rezultat["totaluri_dupa_stergere_egale"] = corect(
+        sorted(map(tuple, venituri_pe_client(din_totaluri=True)))
+        == sorted(map(tuple, venituri_pe_client(din_totaluri=False)))
+    )
+
+    rezultat.update(_cale_fierbinte(context, "inainte"))
+    active = numar_inregistrari(Factura)
+    pe_luni = venituri_pe_luna(din_totaluri=True)
+    with tempfile.TemporaryDirectory() as director:
+        cale = os.path.join(director, "arhiva.db")
+        inceput = time.perf_counter()
+        with fara_afisare():
+            raport = arhivare_facturi(_inceput_luna(6), cale)
+        durata = time.perf_counter() - inceput
+        rezultat["arhivare"] = metrica(
+            round(raport["facturi"] / durata, 1), "facturi/s", "mare"
+        )
+        rezultat.update(_cale_fierbinte(context, "dupa"))
+
+        arhivate = numar_facturi_arhivate(cale)
+        # intre timp s-au emis `repetari` facturi noi
+        rezultat["facturi_mutate"] = corect(
+            raport["facturi"]
+            and numar_inregistrari(Factura) + arhivate == active + repetari
+        )
+        prima = listare_facturi_arhivate(limita=1, cale=cale)
+        date_factura = prima and date_factura_arhivata(prima[0].id, cale)
+        rezultat["citire_arhiva"] = corect(date_factura and date_factura["produse"])
+        try:
+            with _get_engine_arhiva(cale, doar_citire=True).begin() as conexiune:
+                conexiune.execute(Factura.__table__.delete())
+            doar_citire = False
+        except Exception:
+            doar_citire = True
+        rezultat["arhiva_doar_citire"] = corect(doar_citire)
+    # totalurile zilelor arhivate raman, inclusiv dupa o reconstruire completa
+    with unit_of_work(scriere=True) as session:
+        reconstruire_totaluri_zilnice(session.connection())
+    rezultat["totaluri_pastrate"] = corect(
+        venituri_pe_luna(din_totaluri=True)[: len(pe_luni) - 1] == pe_luni[:-1]
+    )
+    return rezultat
+
+
+scenarii = [
+    ("import_pachet", import_pachet),
+    ("calcule_bani", calcule_bani),
+    ("numerotare", numerotare),
+    ("emitere_factura", emitere_factura),
+    ("emitere_lot", emitere_lot),
+    ("concurenta_fire", concurenta_fire),
+    ("stoc_concurent", stoc_concurent),
+    ("server_http", server_http),
+    ("listari", listari),
+    ("garzi_stergere", garzi_stergere),
+    ("randare", randare),
+    ("totaluri", totaluri),
+    ("cache", cache_scenariu),
+    ("cautare", cautare),
+    ("importare", importare),
+    ("exportare", exportare),
+    ("instrumentare", instrumentare),
+    ("joburi", joburi_scenariu),
+    ("arhivare", arhivare),
+]
@@ -0,0 +1,83 @@
+from .arhivare import (
+    arhivare_facturi,
+    date_factura_arhivata,
+    listare_facturi_arhivate,
+    numar_facturi_arhivate,
+)
+from .bani import cota_tva, din_bani, in_bani
+from .baza_date import get_database_url, get_engine, init_db, unit_of_work
+from .cache import golire_cache, statistici_cache
+from .cautare import cautare_clienti, cautare_produse
+from .exportare import exportare_facturi
+from .importare import (
+    importare_clienti,
+    importare_produse,
+    validare_client,
+    validare_produs,
+)
+from .instrumentare import (
+    activare_instrumentare,
+    dezactivare_instrumentare,
+    metrici_text,
+    profilare,
+    resetare_metrici,
+    scriere_metrici,
+)
+from .joburi import (
+    adaugare_job,
+    curatare_joburi,
+    randare_in_fundal,
+    rulare_lucratori,
+    stare_coada,
+    tip_job,
+)
+from .modele import (
+    Arhivare,
+    Base,
+    Client,
+    Factura,
+    Job,
+    LinieFactura,
+    MarcajExport,
+    MiscareStoc,
+    Produs,
+    SerieFactura,
+    TotalZilnicClient,
+    TotalZilnicProdus,
+)
+from .rapoarte import (
+    afisare_rapoarte,
+    venituri_pe_client,
+    venituri_pe_cota_tva,
+    venituri_pe_luna,
+    venituri_pe_produs,
+)
+from .randare import (
+    continut_factura_txt,
+    genereaza_factura,
+    genereaza_factura_txt,
+    genereaza_facturi_txt_batch,
+)
+from .sabloane import randare_document, randare_in
+from .servicii import (
+    adaugare_client,
+    adaugare_factura,
+    adaugare_facturi_bulk,
+    adaugare_produs,
+    afisare_client,
+    afisare_produs,
+    exista_inregistrari,
+    generare_numar_factura,
+    intrare_stoc,
+    iter_clienti,
+    iter_facturi,
+    iter_produse,
+    listare_facturi,
+    numar_inregistrari,
+    rezervare_bloc_numere,
+    rezervare_numere_factura,
+    stergere_client,
+    stergere_factura,
+    stergere_produs,
+)
+from .totaluri_zilnice import reconstruire_totaluri_zilnice
@@ -0,0 +1,277 @@
+# arhivarea perioadelor inchise: facturile emise inainte de o data sunt mutate,
+# cu liniile lor, intr-un fisier SQLite separat, care ramane disponibil pentru
+# citire; tabelele active raman mici, indiferent de cati ani de istoric exista
+import argparse
+import os
+import threading
+from datetime import date, datetime, time
+
+from sqlalchemy import (
+    bindparam,
+    create_engine,
+    delete,
+    func,
+    insert,
+    select,
+    update,
+)
+from sqlalchemy.dialects.sqlite import insert as insert_sqlite
+from sqlalchemy.orm import Session as SesiuneOrm
+from sqlalchemy.orm import selectinload
+
+from .baza_date import init_db, randuri_dupa_id, unit_of_work
+from .instrumentare import cronometru
+from .modele import Arhivare, Client, Factura, LinieFactura, Produs
+from .randare import _date_factura, continut_factura_txt
+from .totaluri_zilnice import _brut, _tip_brut
+
+cale_arhiva = os.getenv("ARHIVA_FACTURI", "arhiva_facturi.db")
+dimensiune_lot_arhivare = int(os.getenv("DIMENSIUNE_LOT_ARHIVARE", "1000"))
+# arhiva are aceleasi tabele ca baza activa, pentru facturi si ce se leaga de ele
+tabele_arhiva = [model.__table__ for model in (Client, Produs, Factura, LinieFactura)]
+
+_engine_arhiva = {}
+_blocare_arhiva = threading.Lock()
+
+
+def _get_engine_arhiva(cale, doar_citire=False):
+    cale = os.path.abspath(cale)
+    with _blocare_arhiva:
+        if (cale, doar_citire) not in _engine_arhiva:
+            if doar_citire:
+                # mode=ro: orice scriere esueaza, chiar si din greseala
+                url = f"sqlite:///file:{cale}?mode=ro&uri=true"
+            else:
+                url = f"sqlite:///{cale}"
+            _engine_arhiva[(cale, doar_citire)] = create_engine(url)
+    return _engine_arhiva[(cale, doar_citire)]
+
+
+def _selectie_bruta(tabela):
+    # sumele se copiaza ca numere intregi, fara conversie prin Decimal
+    return select(*(_brut(c, c).label(c.name) for c in tabela.c))
+
+
+def _valori_brute(tabela):
+    return {
+        coloana.name: bindparam(coloana.name, type_=_tip_brut(coloana))
+        for coloana in tabela.c
+    }
+
+
+def _copiere(conexiune_arhiva, tabela, randuri):
+    # clientii si produsele raman si in baza activa; in arhiva ramane prima copie
+    if not randuri:
+        return
+    conexiune_arhiva.execute(
+        insert_sqlite(tabela).values(_valori_brute(tabela)).on_conflict_do_nothing(),
+        [rand._asdict() for rand in randuri],
+    )
+
+
+def _mutare(conexiune_arhiva, tabela, randuri):
+    # facturile si liniile se sterg din baza activa, deci fiecare rand trebuie sa
+    # fie in arhiva; un rand copiat de o rulare intrerupta se accepta doar daca
+    # este identic. Intoarce id-urile care pot fi sterse.
+    existente = {
+        rand.id: rand
+        for rand in randuri_dupa_id(
+            conexiune_arhiva,
+            _selectie_bruta(tabela),
+            tabela.c.id,
+            [rand.id for rand in randuri],
+        )
+    }
+    for rand in randuri:
+        if rand.id in existente and tuple(existente[rand.id]) != tuple(rand):
+            raise ValueError(
+                f"Randul cu id-ul {rand.id} din {tabela.name} exista deja in "
+                f"arhiva, cu alt continut"
+            )
+    noi = [rand._asdict() for rand in randuri if rand.id not in existente]
+    if noi:
+        conexiune_arhiva.execute(insert(tabela).values(_valori_brute(tabela)), noi)
+    return [rand.id for rand in randuri]
+
+
+@cronometru
+def arhivare_facturi(pana_la=None, cale=None, dimensiune_lot=None):
+    # se arhiveaza doar lunile incheiate; implicit, anii fiscali anteriori
+    azi = date.today()
+    pana_la = pana_la or date(azi.year, 1, 1)
+    if isinstance(pana_la, datetime):
+        pana_la = pana_la.date()
+    if pana_la > azi.replace(day=1):
+        print(
+            f"Pot fi arhivate doar lunile incheiate; data {pana_la} este dupa "
+            f"{azi.replace(day=1)}!"
+        )
+        return None
+    cale = cale or cale_arhiva
+    dimensiune_lot = dimensiune_lot or dimensiune_lot_arhivare
+    engine_arhiva = _get_engine_arhiva(cale)
+    for tabela in tabele_arhiva:
+        tabela.create(engine_arhiva, checkfirst=True)
+
+    # arhivarea se inregistreaza inainte de mutare, ca reconstruirea totalurilor
+    # zilnice sa pastreze zilele mutate chiar daca rularea se intrerupe
+    with unit_of_work(scriere=True) as session:
+        arhivare = Arhivare(pana_la=pana_la, cale=os.path.abspath(cale))
+        session.add(arhivare)
+    limita = datetime.combine(pana_la, time())
+    facturi = Factura.__table__
+    linii = LinieFactura.__table__
+    clienti = Client.__table__
+    produse = Produs.__table__
+    mutate = linii_mutate = 0
+    dupa_id = 0
+    while True:
+        with unit_of_work(scriere=True) as session:
+            # include si facturile sterse logic
+            lot = session.execute(
+                _selectie_bruta(facturi)
+                .where(facturi.c.data_emitere < limita, facturi.c.id > dupa_id)
+                .order_by(facturi.c.id)
+                .limit(dimensiune_lot)
+            ).all()
+            if not lot:
+                break
+            ids = [rand.id for rand in lot]
+            randuri_linii = randuri_dupa_id(
+                session, _selectie_bruta(linii), linii.c.factura_id, ids
+            )
+            clienti_ids = {rand.furnizor_id for rand in lot} | {
+                rand.client_id for rand in lot
+            }
+            produse_ids = {rand.produs_id for rand in randuri_linii}
+            randuri_clienti = randuri_dupa_id(
+                session, _selectie_bruta(clienti), clienti.c.id, clienti_ids
+            )
+            randuri_produse = randuri_dupa_id(
+                session, _selectie_bruta(produse), produse.c.id, produse_ids
+            )
+            # arhiva se salveaza prima; daca stergerea de mai jos esueaza, lotul
+            # ramane in baza activa si se copiaza din nou (fara dubluri)
+            try:
+                with engine_arhiva.begin() as conexiune_arhiva:
+                    _copiere(conexiune_arhiva, clienti, randuri_clienti)
+                    _copiere(conexiune_arhiva, produse, randuri_produse)
+                    ids = _mutare(conexiune_arhiva, facturi, lot)
+                    ids_linii = _mutare(conexiune_arhiva, linii, randuri_linii)
+            except ValueError as e:
+                print(f"Arhivarea s-a oprit, lotul ramane in baza activa: {e}")
+                return None
+            for j in range(0, len(ids_linii), 900):
+                session.execute(
+                    delete(linii).where(linii.c.id.in_(ids_linii[j : j + 900]))
+                )
+            session.execute(delete(facturi).where(facturi.c.id.in_(ids)))
+        mutate += len(lot)
+        linii_mutate += len(randuri_linii)
+        dupa_id = ids[-1]
+
+    with unit_of_work(scriere=True) as session:
+        session.execute(
+            update(Arhivare)
+            .where(Arhivare.id == arhivare.id)
+            .values(numar_facturi=mutate)
+        )
+    print(
+        f"Au fost arhivate {mutate} facturi ({linii_mutate} linii) emise inainte de "
+        f"{pana_la}, in fisierul {cale}"
+    )
+    return {"facturi": mutate, "linii": linii_mutate, "pana_la": pana_la}
+
+
+def _sesiune_arhiva(cale):
+    cale = cale or cale_arhiva
+    if not os.path.exists(cale):
+        print(f"Arhiva {cale} nu exista!")
+        return None
+    return SesiuneOrm(bind=_get_engine_arhiva(cale, doar_citire=True))
+
+
+def listare_facturi_arhivate(dupa_id=None, limita=None, cale=None):
+    sesiune = _sesiune_arhiva(cale)
+    if sesiune is None:
+        return []
+    interogare = select(
+        Factura.id,
+        Factura.numar_factura,
+        Factura.data_emitere,
+        Factura.subtotal,
+        Factura.tva,
+        Factura.total,
+    ).order_by(Factura.id)
+    if dupa_id is not None:
+        interogare = interogare.where(Factura.id > dupa_id)
+    if limita is not None:
+        interogare = interogare.limit(limita)
+    with sesiune:
+        return sesiune.execute(interogare).all()
+
+
+def date_factura_arhivata(factura_id, cale=None):
+    sesiune = _sesiune_arhiva(cale)
+    if sesiune is None:
+        return None
+    with sesiune:
+        factura = sesiune.execute(
+            select(Factura)
+            .where(Factura.id == factura_id)
+            .options(
+                selectinload(Factura.linii),
+                selectinload(Factura.client),
+                selectinload(Factura.furnizor),
+            )
+        ).scalar()
+        return _date_factura(factura) if factura else None
+
+
+def numar_facturi_arhivate(cale=None):
+    sesiune = _sesiune_arhiva(cale)
+    if sesiune is None:
+        return 0
+    with sesiune:
+        return sesiune.execute(select(func.count(Factura.id))).scalar()
+
+
+def _data(text):
+    return date.fromisoformat(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Arhivarea facturilor din perioadele inchise"
+    )
+    parser.add_argument(
+        "--pana-la",
+        type=_data,
+        help="arhiveaza facturile emise inainte de aceasta data (implicit 1 ianuarie)",
+    )
+    parser.add_argument("--arhiva", help=f"fisierul arhivei (implicit {cale_arhiva})")
+    parser.add_argument("--dimensiune-lot", type=int)
+    parser.add_argument(
+        "--listare", action="store_true", help="afiseaza facturile din arhiva"
+    )
+    parser.add_argument("--afisare", type=int, metavar="ID", help="afiseaza o factura")
+    argumente = parser.parse_args()
+    if argumente.listare:
+        for factura in listare_facturi_arhivate(cale=argumente.arhiva):
+            print(
+                f"{factura.id}: {factura.numar_factura}, "
+                f"{factura.data_emitere:%Y-%m-%d}, total {factura.total} RON"
+            )
+    elif argumente.afisare is not None:
+        date_factura = date_factura_arhivata(argumente.afisare, argumente.arhiva)
+        if date_factura is None:
+            print(f"Factura cu id-ul {argumente.afisare} nu se afla in arhiva!")
+        else:
+            print(continut_factura_txt(date_factura))
+    else:
+        init_db()
+        arhivare_facturi(argumente.pana_la, argumente.arhiva, argumente.dimensiune_lot)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import asyncio
+import os
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from .baza_date import (
+    configurare_sqlite,
+    get_database_url,
+    legare_sesiune,
+    optiuni_pool,
+)
+from .joburi import adaugare_job, randare_in_fundal
+from .randare import continut_factura_txt, incarcare_date_factura, scriere_atomica
+from .servicii import (
+    adaugare_client,
+    adaugare_factura,
+    adaugare_facturi_bulk,
+    adaugare_produs,
+    listare_facturi,
+)
+
+# necesita driverul aiosqlite (SQLite) sau aiomysql (MySQL)
+_engine_async = None
+# SQLite accepta un singur scriitor; scrierile asteapta in bucla de evenimente,
+# nu in busy_timeout, unde ar putea esua cu "database is locked"
+_blocare_scriere = None
+SessionAsync = async_sessionmaker(expire_on_commit=False)
+
+
+def get_async_database_url():
+    url = get_database_url()
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    return url.replace("mysql+mysqlconnector:", "mysql+aiomysql:", 1)
+
+
+def get_async_engine():
+    global _engine_async, _blocare_scriere
+    if _engine_async is None:
+        url = get_async_database_url()
+        if url.startswith("sqlite"):
+            _engine_async = create_async_engine(url)
+            configurare_sqlite(_engine_async.sync_engine)
+            _blocare_scriere = asyncio.Lock()
+        else:
+            _engine_async = create_async_engine(url, **optiuni_pool())
+        SessionAsync.configure(bind=_engine_async)
+    return _engine_async
+
+
+async def _rulare(serviciu, *args, scriere=False, **kwargs):
+    # serviciile sincrone ruleaza prin AsyncSession.run_sync, deci asteptarea
+    # dupa baza de date nu blocheaza bucla de evenimente
+    get_async_engine()
+    if scriere and _blocare_scriere is not None:
+        async with _blocare_scriere:
+            return await _rulare_sesiune(serviciu, args, kwargs, scriere)
+    return await _rulare_sesiune(serviciu, args, kwargs, scriere)
+
+
+async def _rulare_sesiune(serviciu, args, kwargs, scriere):
+    async with SessionAsync() as sesiune:
+        if scriere:
+            await sesiune.connection(execution_options={"scriere": True})
+
+        def apel(sesiune_sincrona):
+            with legare_sesiune(sesiune_sincrona):
+                return serviciu(*args, **kwargs)
+
+        rezultat = await sesiune.run_sync(apel)
+        await sesiune.commit()
+    return rezultat
+
+
+async def adaugare_client_async(nume_client, cui, adresa_client):
+    return await _rulare(
+        adaugare_client, nume_client, cui, adresa_client, scriere=True
+    )
+
+
+async def adaugare_produs_async(denumire_produs, cantitate, pret_unitar):
+    return await _rulare(
+        adaugare_produs, denumire_produs, cantitate, pret_unitar, scriere=True
+    )
+
+
+async def adaugare_factura_async(furnizor_id, client_id, produse_ids, cantitati=None):
+    return await _rulare(
+        adaugare_factura, furnizor_id, client_id, produse_ids, cantitati, scriere=True
+    )
+
+
+async def adaugare_facturi_bulk_async(specificatii, dimensiune_lot=1000):
+    # emiterea pe loturi confirma fiecare lot separat, deci ruleaza pe un fir
+    # separat, cu sesiunile sincrone, in loc sa fie o singura tranzactie
+    return await asyncio.to_thread(adaugare_facturi_bulk, specificatii, dimensiune_lot)
+
+
+async def adaugare_job_async(tip, parametri=None, cheie=None):
+    return await _rulare(adaugare_job, tip, parametri, cheie, scriere=True)
+
+
+async def randare_in_fundal_async(factura_id, format_document="txt", director=None):
+    return await _rulare(
+        randare_in_fundal, factura_id, format_document, director, scriere=True
+    )
+
+
+async def listare_facturi_async(dupa_id=None, limita=None):
+    return await _rulare(listare_facturi, dupa_id, limita)
+
+
+async def genereaza_factura_txt_async(factura_id, director="."):
+    date = await _rulare(incarcare_date_factura, factura_id)
+    if not date:
+        return None
+    cale = os.path.join(director, f"Factura_{date['numar_factura']}.txt")
+    await asyncio.to_thread(scriere_atomica, cale, continut_factura_txt(date))
+    return cale
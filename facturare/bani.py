@@ -0,0 +1,109 @@
+# calcule monetare: sumele se pastreaza in bani (numere intregi), cotele de TVA
+# in puncte de baza (0.19 = 1900), iar rotunjirea se face doar aici
+import os
+from decimal import ROUND_HALF_UP, Decimal
+
+from sqlalchemy import BigInteger, Integer, TypeDecorator
+
+cota_tva = Decimal(os.getenv("COTA_TVA", "0.19"))
+
+_numpy = None
+
+
+def _incarcare_numpy():
+    # numpy este optional si se importa doar la primul calcul pe lot
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+
+            _numpy = numpy
+        except ImportError:
+            _numpy = False
+    return _numpy or None
+
+
+def in_bani(valoare):
+    return int(
+        Decimal(str(valoare)).scaleb(2).quantize(Decimal(1), rounding=ROUND_HALF_UP)
+    )
+
+
+def din_bani(bani):
+    return Decimal(int(bani)).scaleb(-2)
+
+
+def in_puncte(cota):
+    return int(
+        Decimal(str(cota)).scaleb(4).quantize(Decimal(1), rounding=ROUND_HALF_UP)
+    )
+
+
+def din_puncte(puncte):
+    return Decimal(int(puncte)).scaleb(-4).normalize()
+
+
+def tva_bani(baza_bani, cota_puncte):
+    # rotunjire la jumatate, departe de zero
+    valoare = baza_bani * cota_puncte
+    tva = (abs(valoare) + 5000) // 10000
+    return tva if valoare >= 0 else -tva
+
+
+def calcul_linii_lot(cantitati, preturi_bani, cote_puncte):
+    # aceleasi formule ca tva_bani, aplicate pe toate liniile deodata
+    numpy = _incarcare_numpy()
+    if numpy is not None:
+        totaluri = numpy.asarray(cantitati, dtype=numpy.int64) * numpy.asarray(
+            preturi_bani, dtype=numpy.int64
+        )
+        valori = totaluri * numpy.asarray(cote_puncte, dtype=numpy.int64)
+        tva = numpy.sign(valori) * ((numpy.abs(valori) + 5000) // 10000)
+        return totaluri.tolist(), tva.tolist()
+    totaluri = [cantitate * pret for cantitate, pret in zip(cantitati, preturi_bani)]
+    tva = [tva_bani(total, cota) for total, cota in zip(totaluri, cote_puncte)]
+    return totaluri, tva
+
+
+def calcul_facturi_lot(facturi_index, totaluri_bani, tva_bani_linii, numar_facturi):
+    # subtotal si TVA pe factura, pentru liniile grupate dupa facturi_index
+    numpy = _incarcare_numpy()
+    if numpy is not None:
+        index = numpy.asarray(facturi_index, dtype=numpy.int64)
+        subtotaluri = numpy.zeros(numar_facturi, dtype=numpy.int64)
+        tva = numpy.zeros(numar_facturi, dtype=numpy.int64)
+        numpy.add.at(
+            subtotaluri, index, numpy.asarray(totaluri_bani, dtype=numpy.int64)
+        )
+        numpy.add.at(tva, index, numpy.asarray(tva_bani_linii, dtype=numpy.int64))
+        return subtotaluri.tolist(), tva.tolist()
+    subtotaluri = [0] * numar_facturi
+    tva = [0] * numar_facturi
+    for index, total, valoare_tva in zip(facturi_index, totaluri_bani, tva_bani_linii):
+        subtotaluri[index] += total
+        tva[index] += valoare_tva
+    return subtotaluri, tva
+
+
+class Bani(TypeDecorator):
+    # suma in lei (Decimal) salvata ca numar intreg de bani
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else in_bani(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else din_bani(value)
+
+
+class CotaTva(TypeDecorator):
+    # cota de TVA (Decimal) salvata in puncte de baza
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else in_puncte(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else din_puncte(value)
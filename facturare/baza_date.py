@@ -0,0 +1,178 @@
+import os
+import threading
+from contextlib import contextmanager
+
+from greenlet import getcurrent
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session as SesiuneOrm
+from sqlalchemy.orm import scoped_session, sessionmaker, with_loader_criteria
+
+from .migrari import aplicare_migrari
+from .modele import Base, Factura
+
+# engine-ul se creeaza la prima utilizare, nu la import
+_engine = None
+_blocare_engine = threading.Lock()
+# obiectele raman utilizabile dupa commit, cand sesiunea este deja inchisa
+Session = sessionmaker(expire_on_commit=False)
+# cate o sesiune pentru fiecare fir de executie; greenlet-ul curent deosebeste
+# si apelurile concurente din stratul asincron, care ruleaza pe acelasi fir
+sesiuni = scoped_session(Session, scopefunc=getcurrent)
+
+
+@event.listens_for(SesiuneOrm, "do_orm_execute")
+def ascundere_facturi_sterse(stare):
+    # toate interogarile ORM, inclusiv join-urile si relatiile incarcate ulterior,
+    # ignora facturile sterse; optiunea cu_sterse=True le include (de exemplu
+    # verificarile inainte de stergerea unui client sau produs)
+    if (
+        stare.is_select
+        and not stare.is_column_load
+        and not stare.is_relationship_load
+        and not stare.execution_options.get("cu_sterse", False)
+    ):
+        stare.statement = stare.statement.options(
+            with_loader_criteria(
+                Factura, Factura.sters_la.is_(None), include_aliases=True
+            )
+        )
+
+
+def get_database_url():
+    # programul poate fi utilizat cu 'mysql' sau 'sqlite'
+    db_type = os.getenv("DB_TYPE", "sqlite")
+    if db_type == "mysql":
+        user = os.getenv("MYSQL_USER", "root")
+        password = os.getenv("MYSQL_PASSWORD", "password")
+        host = os.getenv("MYSQL_HOST", "localhost")
+        port = os.getenv("MYSQL_PORT", "3306")
+        database = os.getenv("MYSQL_DATABASE", "db_program_facturare")
+        return f"mysql+mysqlconnector://{user}:{password}@{host}:{port}/{database}"
+    else:
+        return "sqlite:///db_program_facturare.db"
+
+
+def configurare_sqlite(engine):
+    @event.listens_for(engine, "connect")
+    def la_conectare(conexiune_dbapi, _):
+        # tranzactiile sunt pornite explicit mai jos, nu de driverul sqlite3
+        conexiune_dbapi.isolation_level = None
+        cursor = conexiune_dbapi.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(
+            f"PRAGMA busy_timeout={int(os.getenv('SQLITE_BUSY_TIMEOUT', '5000'))}"
+        )
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def la_inceput(conexiune):
+        # tranzactiile de scriere iau blocarea de scriere de la inceput, ca sa nu
+        # esueze cu "database is locked" cand trec de la citire la scriere
+        if conexiune.get_execution_options().get("scriere"):
+            conexiune.exec_driver_sql("BEGIN IMMEDIATE")
+        else:
+            conexiune.exec_driver_sql("BEGIN")
+
+
+def optiuni_pool():
+    return {
+        "pool_size": int(os.getenv("POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("POOL_MAX_OVERFLOW", "20")),
+        "pool_timeout": int(os.getenv("POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("POOL_RECYCLE", "1800")),
+        "pool_pre_ping": True,
+    }
+
+
+def creare_engine(url=None):
+    url = url or get_database_url()
+    if url.startswith("sqlite"):
+        engine = create_engine(url)
+        configurare_sqlite(engine)
+    else:
+        engine = create_engine(url, **optiuni_pool())
+    return engine
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        with _blocare_engine:
+            if _engine is None:
+                engine = creare_engine()
+                Session.configure(bind=engine)
+                _engine = engine
+    return _engine
+
+
+def sesiune_noua():
+    get_engine()
+    return Session()
+
+
+def pornire_scriere(sesiune):
+    sesiune.connection(execution_options={"scriere": True})
+
+
+@contextmanager
+def unit_of_work(scriere=False):
+    # o unitate de lucru apelata din alta unitate a aceluiasi fir de executie
+    # foloseste aceeasi sesiune si aceeasi tranzactie
+    if not sesiuni.registry.has():
+        get_engine()
+    sesiune = sesiuni()
+    if sesiune.info.get("adancime"):
+        sesiune.info["adancime"] += 1
+        try:
+            yield sesiune
+            # id-urile si valorile implicite sunt disponibile la iesirea din unitate
+            sesiune.flush()
+        finally:
+            sesiune.info["adancime"] -= 1
+        return
+    sesiune.info["adancime"] = 1
+    try:
+        if scriere:
+            pornire_scriere(sesiune)
+        yield sesiune
+        sesiune.commit()
+    except BaseException:
+        sesiune.rollback()
+        raise
+    finally:
+        sesiune.info["adancime"] = 0
+        # sesiunea se inchide, deci identity map-ul nu creste intre unitati
+        sesiuni.remove()
+
+
+@contextmanager
+def legare_sesiune(sesiune):
+    # serviciile apelate in interior folosesc sesiunea primita, iar commit-ul
+    # ramane in grija apelantului (de exemplu AsyncSession.run_sync)
+    sesiuni.registry.set(sesiune)
+    sesiune.info["adancime"] = 1
+    try:
+        yield sesiune
+    finally:
+        sesiune.info["adancime"] = 0
+        sesiuni.registry.clear()
+
+
+def randuri_dupa_id(conexiune, interogare, coloana, ids, dimensiune=900):
+    # interogari pe bucati ca sa nu depasim limita de parametri a SQLite;
+    # merge cu o sesiune sau cu o conexiune (de exemplu cea a arhivei)
+    ids = list(ids)
+    randuri = []
+    for i in range(0, len(ids), dimensiune):
+        randuri += conexiune.execute(
+            interogare.where(coloana.in_(ids[i : i + dimensiune]))
+        ).all()
+    return randuri
+
+
+def init_db():
+    engine = get_engine()
+    Base.metadata.create_all(engine)
+    aplicare_migrari(engine)
+    return engine
@@ -0,0 +1,242 @@
+# cache in proces pentru clienti si produse: se pastreaza copii ale randurilor,
+# nu obiecte ORM, deci pot fi folosite din orice sesiune si fir de executie
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .modele import Client, Produs, VersiuneCache
+
+cache_activ = os.getenv("CACHE_ACTIV", "1") == "1"
+dimensiune_cache = int(os.getenv("CACHE_DIMENSIUNE", "10000"))
+durata_cache = float(os.getenv("CACHE_TTL", "300"))
+# cu mai multe procese pe aceeasi baza de date, modificarile unui proces golesc
+# cache-ul celorlalte prin tabela versiuni_cache, verificata periodic
+invalidare_partajata = os.getenv("CACHE_INVALIDARE_PARTAJATA", "0") == "1"
+interval_verificare = float(os.getenv("CACHE_INTERVAL_VERIFICARE", "1"))
+
+coloane_client = (Client.id, Client.nume_client, Client.cui, Client.adresa_client)
+# stocul se schimba la fiecare factura si se verifica in baza de date, deci nu
+# se pastreaza in cache
+coloane_produs = (
+    Produs.id,
+    Produs.denumire_produs,
+    Produs.pret_unitar,
+    Produs.cota_tva,
+)
+
+
+class CacheLRU:
+    def __init__(self, nume, dimensiune, durata):
+        self.nume = nume
+        self.dimensiune = dimensiune
+        self.durata = durata
+        # creste la fiecare invalidare; o citire din baza de date inceputa
+        # inainte de invalidare nu mai este pusa in cache
+        self.generatie = 0
+        self.versiune_partajata = None
+        self.statistici = {
+            "hit": 0,
+            "miss": 0,
+            "evacuari": 0,
+            "expirari": 0,
+            "invalidari": 0,
+        }
+        self._intrari = OrderedDict()
+        self._blocare = threading.Lock()
+
+    def citire(self, cheie):
+        with self._blocare:
+            intrare = self._intrari.get(cheie)
+            if intrare is None:
+                self.statistici["miss"] += 1
+                return None
+            valoare, expira_la = intrare
+            if expira_la < time.monotonic():
+                del self._intrari[cheie]
+                self.statistici["expirari"] += 1
+                self.statistici["miss"] += 1
+                return None
+            self._intrari.move_to_end(cheie)
+            self.statistici["hit"] += 1
+            return valoare
+
+    def scriere(self, intrari, generatie):
+        with self._blocare:
+            if generatie != self.generatie:
+                return
+            expira_la = time.monotonic() + self.durata
+            for cheie, valoare in intrari:
+                self._intrari[cheie] = (valoare, expira_la)
+                self._intrari.move_to_end(cheie)
+            while len(self._intrari) > self.dimensiune:
+                self._intrari.popitem(last=False)
+                self.statistici["evacuari"] += 1
+
+    def invalidare(self, chei):
+        with self._blocare:
+            self.generatie += 1
+            for cheie in chei:
+                if self._intrari.pop(cheie, None) is not None:
+                    self.statistici["invalidari"] += 1
+
+    def golire(self):
+        with self._blocare:
+            self.generatie += 1
+            self.statistici["invalidari"] += len(self._intrari)
+            self._intrari.clear()
+
+    def __len__(self):
+        return len(self._intrari)
+
+
+cache_clienti = CacheLRU("clienti", dimensiune_cache, durata_cache)
+cache_produse = CacheLRU("produse", dimensiune_cache, durata_cache)
+_ultima_verificare = 0.0
+
+
+def _verificare_versiuni(sesiune):
+    global _ultima_verificare
+    acum = time.monotonic()
+    if not invalidare_partajata or acum - _ultima_verificare < interval_verificare:
+        return
+    _ultima_verificare = acum
+    versiuni = dict(
+        sesiune.execute(select(VersiuneCache.nume, VersiuneCache.versiune)).all()
+    )
+    for cache in (cache_clienti, cache_produse):
+        versiune = versiuni.get(cache.nume, 0)
+        if cache.versiune_partajata not in (None, versiune):
+            cache.golire()
+        cache.versiune_partajata = versiune
+
+
+def _citire_dupa_cheie(sesiune, cache, coloana, tip_cheie, valori, coloane, chei_rand):
+    valori = list(dict.fromkeys(valori))
+    gasite = {}
+    lipsa = valori
+    if cache_activ:
+        _verificare_versiuni(sesiune)
+        lipsa = []
+        for valoare in valori:
+            rand = cache.citire((tip_cheie, valoare))
+            if rand is None:
+                lipsa.append(valoare)
+            else:
+                gasite[valoare] = rand
+    if not lipsa:
+        return gasite
+    generatie = cache.generatie
+    randuri = []
+    for i in range(0, len(lipsa), 900):
+        randuri += sesiune.execute(
+            select(*coloane).where(coloana.in_(lipsa[i : i + 900]))
+        ).all()
+    for rand in randuri:
+        gasite[getattr(rand, coloana.key)] = rand
+    if cache_activ:
+        cache.scriere(
+            [(cheie, rand) for rand in randuri for cheie in chei_rand(rand)], generatie
+        )
+    return gasite
+
+
+def _chei_client(rand):
+    return [("id", rand.id), ("cui", rand.cui)]
+
+
+def clienti_dupa_id(sesiune, clienti_ids):
+    return _citire_dupa_cheie(
+        sesiune,
+        cache_clienti,
+        Client.id,
+        "id",
+        clienti_ids,
+        coloane_client,
+        _chei_client,
+    )
+
+
+def client_dupa_id(sesiune, client_id):
+    return clienti_dupa_id(sesiune, [client_id]).get(client_id)
+
+
+def client_dupa_cui(sesiune, cui):
+    return _citire_dupa_cheie(
+        sesiune, cache_clienti, Client.cui, "cui", [cui], coloane_client, _chei_client
+    ).get(cui)
+
+
+def produse_dupa_id(sesiune, produse_ids):
+    return _citire_dupa_cheie(
+        sesiune,
+        cache_produse,
+        Produs.id,
+        "id",
+        produse_ids,
+        coloane_produs,
+        lambda rand: [("id", rand.id)],
+    )
+
+
+def _programare_invalidare(sesiune, cache, chei):
+    # cheile se sterg din cache dupa commit, cand noile valori sunt vizibile
+    sesiune.info.setdefault("invalidari_cache", []).append((cache, list(chei)))
+    if invalidare_partajata:
+        conditie = VersiuneCache.nume == cache.nume
+        actualizat = sesiune.execute(
+            update(VersiuneCache)
+            .where(conditie)
+            .values(versiune=VersiuneCache.versiune + 1)
+        ).rowcount
+        if not actualizat:
+            try:
+                with sesiune.begin_nested():
+                    sesiune.add(VersiuneCache(nume=cache.nume, versiune=1))
+            except IntegrityError:
+                sesiune.execute(
+                    update(VersiuneCache)
+                    .where(conditie)
+                    .values(versiune=VersiuneCache.versiune + 1)
+                )
+
+
+def invalidare_clienti(sesiune, clienti):
+    # clienti: perechi (id, cui); oricare poate lipsi
+    chei = []
+    for client_id, cui in clienti:
+        if client_id is not None:
+            chei.append(("id", client_id))
+        if cui is not None:
+            chei.append(("cui", cui))
+    _programare_invalidare(sesiune, cache_clienti, chei)
+
+
+def invalidare_produse(sesiune, produse_ids):
+    _programare_invalidare(
+        sesiune, cache_produse, [("id", produs_id) for produs_id in produse_ids]
+    )
+
+
+@event.listens_for(Session, "after_commit")
+def _dupa_commit(sesiune):
+    # dupa un rollback invalidarile raman programate; o invalidare in plus
+    # doar forteaza o recitire
+    for cache, chei in sesiune.info.pop("invalidari_cache", []):
+        cache.invalidare(chei)
+
+
+def golire_cache():
+    cache_clienti.golire()
+    cache_produse.golire()
+
+
+def statistici_cache():
+    return {
+        cache.nume: {**cache.statistici, "dimensiune": len(cache)}
+        for cache in (cache_clienti, cache_produse)
+    }
@@ -0,0 +1,130 @@
+# cautare dupa text in clienti si produse, fara parcurgerea tabelelor: SQLite
+# foloseste tabele FTS5 sincronizate prin triggere, MySQL indexuri FULLTEXT
+import difflib
+import os
+import re
+import unicodedata
+
+from sqlalchemy import column, select, table
+from sqlalchemy.dialects.mysql import match
+
+from .baza_date import unit_of_work
+from .cache import coloane_client, coloane_produs
+from .instrumentare import cronometru
+from .migrari import indexuri_cautare
+from .modele import Client, Produs
+
+limita_cautare = int(os.getenv("LIMITA_CAUTARE", "10"))
+# cate rezultate aproximative se compara cu textul cautat cand potrivirile
+# exacte nu ajung
+candidati_aproximativi = int(os.getenv("CANDIDATI_CAUTARE", "200"))
+
+
+def _fara_diacritice(valoare):
+    return "".join(
+        c
+        for c in unicodedata.normalize("NFKD", valoare.lower())
+        if not unicodedata.combining(c)
+    )
+
+
+def _cuvinte(valoare):
+    return re.findall(r"\w+", _fara_diacritice(valoare))
+
+
+def _conditie(sesiune, model, coloane_index, cuvinte):
+    # toate cuvintele trebuie sa apara, oricare ca prefix
+    nume_index, _ = indexuri_cautare[model.__tablename__]
+    if sesiune.get_bind().dialect.name == "mysql":
+        expresie = " ".join(f"+{cuvant}*" for cuvant in cuvinte)
+        potrivire = match(*coloane_index, against=expresie).in_boolean_mode()
+        return None, potrivire, potrivire.desc()
+    fts = table(nume_index, column("rowid"), column(nume_index), column("rank"))
+    expresie = " ".join(f'"{cuvant}"*' for cuvant in cuvinte)
+    return (
+        (fts, fts.c.rowid == model.id),
+        fts.c[nume_index].op("MATCH")(expresie),
+        fts.c.rank,
+    )
+
+
+def _cautare(sesiune, model, coloane, coloane_index, cuvinte, limita, ordonat=True):
+    legatura, potrivire, ordine = _conditie(sesiune, model, coloane_index, cuvinte)
+    interogare = select(*coloane).where(potrivire).limit(limita)
+    if ordonat:
+        # ordonarea dupa relevanta calculeaza scorul tuturor potrivirilor
+        interogare = interogare.order_by(ordine)
+    if legatura is not None:
+        interogare = interogare.select_from(legatura[0]).join(model, legatura[1])
+    return sesiune.execute(interogare).all()
+
+
+def _scor(cuvinte, valoare):
+    # fiecare cuvant cautat se compara cu cel mai apropiat cuvant din rezultat
+    cuvinte_rezultat = _cuvinte(valoare)
+    if not cuvinte_rezultat:
+        return 0
+    return sum(
+        max(
+            difflib.SequenceMatcher(None, cuvant, candidat).ratio()
+            for candidat in cuvinte_rezultat
+        )
+        for cuvant in cuvinte
+    ) / len(cuvinte)
+
+
+def _cautare_text(model, coloane, coloane_index, valoare, limita, prag=0.6):
+    cuvinte = _cuvinte(valoare)
+    if not cuvinte:
+        return []
+    limita = limita or limita_cautare
+    with unit_of_work() as session:
+        # intai potrivirile dupa prefix pentru toate cuvintele
+        rezultate = _cautare(session, model, coloane, coloane_index, cuvinte, limita)
+        if len(rezultate) >= limita:
+            return rezultate
+        # apoi potrivirile aproximative: candidatii incep fiecare cuvant cu
+        # aceleasi trei litere si se ordoneaza dupa asemanarea cu textul cautat
+        gasite = {rand.id for rand in rezultate}
+        candidati = _cautare(
+            session,
+            model,
+            coloane,
+            coloane_index,
+            [cuvant[:3] for cuvant in cuvinte],
+            candidati_aproximativi,
+            ordonat=False,
+        )
+    scoruri = []
+    for rand in candidati:
+        if rand.id in gasite:
+            continue
+        valoare_rand = " ".join(str(getattr(rand, c.key)) for c in coloane_index)
+        scor = _scor(cuvinte, valoare_rand)
+        if scor >= prag:
+            scoruri.append((scor, rand))
+    scoruri.sort(key=lambda pereche: -pereche[0])
+    return rezultate + [rand for _, rand in scoruri[: limita - len(rezultate)]]
+
+
+@cronometru
+def cautare_clienti(valoare, limita=None):
+    return _cautare_text(
+        Client,
+        coloane_client,
+        (Client.nume_client, Client.cui, Client.adresa_client),
+        valoare,
+        limita,
+    )
+
+
+@cronometru
+def cautare_produse(valoare, limita=None):
+    # rezultatele arata si stocul, care nu face parte din cache
+    return _cautare_text(
+        Produs,
+        coloane_produs + (Produs.cantitate,),
+        (Produs.denumire_produs,),
+        valoare,
+        limita,
+    )
@@ -0,0 +1,284 @@
+import argparse
+import csv
+import json
+import os
+import time
+from contextlib import nullcontext
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import aliased
+
+from .baza_date import init_db, unit_of_work
+from .instrumentare import cronometru, profilare
+from .modele import Client, Factura, LinieFactura, MarcajExport
+from .randare import fisier_temporar
+
+dimensiune_lot_export = int(os.getenv("DIMENSIUNE_LOT_EXPORT", "10000"))
+
+_pyarrow = None
+
+
+def _incarcare_pyarrow():
+    # pyarrow este optional si este necesar doar pentru formatul parquet
+    global _pyarrow
+    if _pyarrow is None:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+
+            _pyarrow = pyarrow
+        except ImportError:
+            _pyarrow = False
+    return _pyarrow or None
+
+
+def _coloane_export():
+    furnizor = aliased(Client, name="furnizor")
+    client = aliased(Client, name="client")
+    # cate un rand pentru fiecare linie de factura, cu datele facturii,
+    # ale furnizorului si ale clientului alaturi
+    coloane = [
+        ("factura_id", Factura.id, "intreg"),
+        ("numar_factura", Factura.numar_factura, "text"),
+        ("data_emitere", Factura.data_emitere, "data"),
+        ("furnizor_id", Factura.furnizor_id, "intreg"),
+        ("furnizor_nume", furnizor.nume_client, "text"),
+        ("furnizor_cui", furnizor.cui, "text"),
+        ("client_id", Factura.client_id, "intreg"),
+        ("client_nume", client.nume_client, "text"),
+        ("client_cui", client.cui, "text"),
+        ("subtotal", Factura.subtotal, "bani"),
+        ("tva", Factura.tva, "bani"),
+        ("total", Factura.total, "bani"),
+        ("linie_id", LinieFactura.id, "intreg"),
+        ("produs_id", LinieFactura.produs_id, "intreg"),
+        ("denumire_produs", LinieFactura.denumire_produs, "text"),
+        ("cantitate", LinieFactura.cantitate, "intreg"),
+        ("pret_unitar", LinieFactura.pret_unitar, "bani"),
+        ("cota_tva", LinieFactura.cota_tva, "cota"),
+        ("total_linie", LinieFactura.total_linie, "bani"),
+        ("tva_linie", LinieFactura.tva_linie, "bani"),
+    ]
+    interogare = (
+        select(*(expresie for _, expresie, _ in coloane))
+        .join(furnizor, furnizor.id == Factura.furnizor_id)
+        .join(client, client.id == Factura.client_id)
+        .outerjoin(LinieFactura, LinieFactura.factura_id == Factura.id)
+        .order_by(Factura.id, LinieFactura.id)
+    )
+    return coloane, interogare
+
+
+def _valoare_text(valoare):
+    if isinstance(valoare, datetime):
+        return valoare.isoformat(sep=" ")
+    return valoare
+
+
+def _scriere_csv(f, nume_coloane, loturi):
+    scriitor = csv.writer(f)
+    scriitor.writerow(nume_coloane)
+    for lot in loturi:
+        scriitor.writerows(
+            [_valoare_text(valoare) for valoare in rand] for rand in lot
+        )
+
+
+def _json_implicit(valoare):
+    if isinstance(valoare, Decimal):
+        return str(valoare)
+    if isinstance(valoare, datetime):
+        return valoare.isoformat()
+    raise TypeError(f"Valoarea {valoare!r} nu poate fi convertita in JSON")
+
+
+def _scriere_jsonl(f, nume_coloane, loturi):
+    for lot in loturi:
+        f.writelines(
+            json.dumps(dict(zip(nume_coloane, rand)), default=_json_implicit) + "\n"
+            for rand in lot
+        )
+
+
+def _scriere_parquet(f, coloane, loturi):
+    pyarrow = _incarcare_pyarrow()
+    tipuri = {
+        "intreg": pyarrow.int64(),
+        "text": pyarrow.string(),
+        "data": pyarrow.timestamp("us"),
+        "bani": pyarrow.decimal128(18, 2),
+        "cota": pyarrow.decimal128(9, 4),
+    }
+    schema = pyarrow.schema([(nume, tipuri[tip]) for nume, _, tip in coloane])
+    # fiecare lot devine un row group, deci in memorie sta un singur lot
+    with pyarrow.parquet.ParquetWriter(f, schema, compression="zstd") as scriitor:
+        for lot in loturi:
+            scriitor.write_table(
+                pyarrow.Table.from_arrays(
+                    [
+                        pyarrow.array([rand[i] for rand in lot], type=camp.type)
+                        for i, camp in enumerate(schema)
+                    ],
+                    schema=schema,
+                )
+            )
+
+
+def _format_fisier(cale, format_fisier=None):
+    if format_fisier:
+        return format_fisier.lower()
+    extensie = os.path.splitext(cale)[1].lower()
+    if extensie in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if extensie == ".parquet":
+        return "parquet"
+    return "csv"
+
+
+def _citire_marcaj(incremental):
+    with unit_of_work() as session:
+        marcaj = session.get(MarcajExport, incremental)
+        return (marcaj.ultimul_id, marcaj.ultima_data_emitere) if marcaj else (0, None)
+
+
+def _salvare_marcaj(incremental, ultimul_id, ultima_data_emitere):
+    with unit_of_work(scriere=True) as session:
+        marcaj = session.get(MarcajExport, incremental)
+        if marcaj is None:
+            marcaj = MarcajExport(nume=incremental)
+            session.add(marcaj)
+        marcaj.ultimul_id = ultimul_id
+        marcaj.ultima_data_emitere = ultima_data_emitere
+        marcaj.actualizat_la = func.now()
+
+
+@cronometru
+def exportare_facturi(
+    cale,
+    format_fisier=None,
+    incremental=None,
+    data_start=None,
+    data_sfarsit=None,
+    dimensiune_lot=None,
+):
+    format_fisier = _format_fisier(cale, format_fisier)
+    if format_fisier not in ("csv", "jsonl", "parquet"):
+        print(f"Formatul {format_fisier} nu este suportat (csv, jsonl, parquet)!")
+        return None
+    if format_fisier == "parquet" and _incarcare_pyarrow() is None:
+        print("Exportul in format parquet necesita pachetul pyarrow!")
+        return None
+    dimensiune_lot = dimensiune_lot or dimensiune_lot_export
+
+    coloane, interogare = _coloane_export()
+    dupa_id = ultima_data_emitere = None
+    if incremental:
+        # un export incremental livreaza doar facturile de dupa ultimul marcaj
+        dupa_id, ultima_data_emitere = _citire_marcaj(incremental)
+        interogare = interogare.where(Factura.id > dupa_id)
+    if data_start is not None:
+        interogare = interogare.where(Factura.data_emitere >= data_start)
+    if data_sfarsit is not None:
+        interogare = interogare.where(Factura.data_emitere < data_sfarsit)
+
+    raport = {"randuri": 0, "facturi": 0, "ultimul_id": dupa_id}
+    inceput = time.perf_counter()
+
+    def loturi(rezultat):
+        # randurile vin de la cursor pe loturi; doar lotul curent sta in memorie
+        ultimul_id = None
+        for lot in rezultat.partitions():
+            raport["randuri"] += len(lot)
+            for rand in lot:
+                if rand[0] != ultimul_id:
+                    ultimul_id = rand[0]
+                    raport["facturi"] += 1
+            raport["ultimul_id"] = ultimul_id
+            raport["ultima_data_emitere"] = lot[-1][2]
+            yield lot
+
+    # fisierul apare doar complet: se scrie alaturi si se redenumeste la final
+    fd, cale_temporara = fisier_temporar(cale, ".export_")
+    try:
+        with unit_of_work() as session:
+            rezultat = session.execute(
+                interogare, execution_options={"yield_per": dimensiune_lot}
+            )
+            nume_coloane = [nume for nume, _, _ in coloane]
+            if format_fisier == "parquet":
+                with os.fdopen(fd, "wb") as f:
+                    _scriere_parquet(f, coloane, loturi(rezultat))
+            else:
+                with os.fdopen(fd, "w", newline="", encoding="utf-8") as f:
+                    if format_fisier == "csv":
+                        _scriere_csv(f, nume_coloane, loturi(rezultat))
+                    else:
+                        _scriere_jsonl(f, nume_coloane, loturi(rezultat))
+        if incremental and not raport["facturi"]:
+            os.remove(cale_temporara)
+            print("Nu exista facturi noi de exportat.")
+            return raport
+        os.replace(cale_temporara, cale)
+    except BaseException:
+        if os.path.exists(cale_temporara):
+            os.remove(cale_temporara)
+        raise
+
+    if incremental:
+        # marcajul avanseaza doar dupa ce fisierul a fost scris complet
+        _salvare_marcaj(
+            incremental,
+            raport["ultimul_id"],
+            raport.get("ultima_data_emitere", ultima_data_emitere),
+        )
+
+    durata = time.perf_counter() - inceput
+    raport["durata"] = round(durata, 3)
+    raport["randuri_pe_secunda"] = round(raport["randuri"] / durata, 1) if durata else 0
+    print(
+        f"Au fost exportate {raport['facturi']} facturi ({raport['randuri']} randuri) "
+        f"in fisierul {cale}, {raport['randuri_pe_secunda']} randuri/s"
+    )
+    return raport
+
+
+def _data(text):
+    return datetime.fromisoformat(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export facturi cu linii, client si furnizor in CSV, JSONL sau parquet"
+    )
+    parser.add_argument("fisier")
+    parser.add_argument("--format", choices=["csv", "jsonl", "parquet"])
+    parser.add_argument(
+        "--incremental",
+        metavar="NUME",
+        help="exporta doar facturile noi fata de exportul anterior cu acest nume",
+    )
+    parser.add_argument("--de-la", type=_data, help="data_emitere minima (inclusiv)")
+    parser.add_argument("--pana-la", type=_data, help="data_emitere maxima (exclusiv)")
+    parser.add_argument("--dimensiune-lot", type=int)
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="scrie profilul cProfile si metricile rularii",
+    )
+    argumente = parser.parse_args()
+    with profilare("export") if argumente.profile else nullcontext():
+        init_db()
+        exportare_facturi(
+            argumente.fisier,
+            argumente.format,
+            argumente.incremental,
+            argumente.de_la,
+            argumente.pana_la,
+            argumente.dimensiune_lot,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+import csv
+import json
+import os
+import time
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import insert, select, update
+
+from .baza_date import randuri_dupa_id, unit_of_work
+from .cache import invalidare_clienti, invalidare_produse
+from .instrumentare import cronometru
+from .modele import Client, Produs
+from .stoc import inregistrare_miscari
+
+dimensiune_lot_import = int(os.getenv("DIMENSIUNE_LOT_IMPORT", "5000"))
+
+
+def _format_fisier(cale, format_fisier=None):
+    if format_fisier:
+        return format_fisier.lower()
+    extensie = os.path.splitext(cale)[1].lower()
+    return "jsonl" if extensie in (".jsonl", ".ndjson") else "csv"
+
+
+def citire_randuri(cale, format_fisier=None):
+    # fisierul se citeste rand cu rand, deci memoria nu depinde de marimea lui
+    format_fisier = _format_fisier(cale, format_fisier)
+    with open(cale, newline="", encoding="utf-8-sig") as f:
+        if format_fisier == "jsonl":
+            for numar_rand, linie in enumerate(f, 1):
+                if not linie.strip():
+                    continue
+                try:
+                    yield numar_rand, json.loads(linie)
+                except ValueError:
+                    # randul ramane text si va fi respins la validare
+                    yield numar_rand, linie.rstrip("\r\n")
+        else:
+            cititor = csv.DictReader(f)
+            for rand in cititor:
+                yield cititor.line_num, rand
+
+
+def _text(rand, coloana):
+    valoare = rand.get(coloana.name)
+    valoare = "" if valoare is None else str(valoare).strip()
+    if not valoare:
+        raise ValueError(f"Campul {coloana.name} lipseste")
+    if len(valoare) > coloana.type.length:
+        raise ValueError(
+            f"Campul {coloana.name} depaseste {coloana.type.length} caractere"
+        )
+    return valoare
+
+
+def _zecimal(rand, camp):
+    valoare = rand.get(camp)
+    try:
+        valoare = Decimal(str(valoare).strip())
+    except (InvalidOperation, ValueError):
+        raise ValueError(f"Campul {camp} nu este un numar: {valoare!r}")
+    if not valoare.is_finite():
+        raise ValueError(f"Campul {camp} nu este un numar: {valoare!r}")
+    return valoare
+
+
+def _completat(rand, camp):
+    valoare = rand.get(camp)
+    return valoare is not None and str(valoare).strip() != ""
+
+
+def _intreg(rand, camp):
+    valoare = _zecimal(rand, camp)
+    if valoare != valoare.to_integral_value():
+        raise ValueError(f"Campul {camp} trebuie sa fie un numar intreg")
+    return int(valoare)
+
+
+def validare_client(rand):
+    if not isinstance(rand, dict):
+        raise ValueError("Randul nu este un obiect JSON valid")
+    coloane = Client.__table__.c
+    return {
+        "nume_client": _text(rand, coloane.nume_client),
+        "cui": _text(rand, coloane.cui),
+        "adresa_client": _text(rand, coloane.adresa_client),
+    }
+
+
+def validare_produs(rand):
+    if not isinstance(rand, dict):
+        raise ValueError("Randul nu este un obiect JSON valid")
+    produs = {"denumire_produs": _text(rand, Produs.__table__.c.denumire_produs)}
+
+    produs["cantitate"] = _intreg(rand, "cantitate")
+    if produs["cantitate"] < 0:
+        raise ValueError("Cantitatea nu poate fi negativa")
+
+    pret_unitar = _zecimal(rand, "pret_unitar")
+    if pret_unitar < 0:
+        raise ValueError("Pretul unitar nu poate fi negativ")
+    if pret_unitar.as_tuple().exponent < -2:
+        raise ValueError("Pretul unitar are mai mult de doua zecimale")
+    produs["pret_unitar"] = pret_unitar
+
+    # cota lipsa inseamna cota implicita, aplicata la emiterea facturii
+    produs["cota_tva"] = None
+    if _completat(rand, "cota_tva"):
+        produs["cota_tva"] = _zecimal(rand, "cota_tva")
+        if not 0 <= produs["cota_tva"] < 1:
+            raise ValueError("Cota de TVA trebuie sa fie intre 0 si 1, de exemplu 0.19")
+
+    if _completat(rand, "id"):
+        produs["id"] = _intreg(rand, "id")
+    return produs
+
+
+def _salvare_clienti(lot):
+    # in acelasi lot ultimul rand cu un CUI dat castiga; clientii existenti se
+    # actualizeaza, restul se insereaza, fiecare grup intr-un singur executemany
+    clienti = {client["cui"]: client for client in lot}
+    with unit_of_work(scriere=True) as session:
+        existenti = {
+            rand.cui: rand
+            for rand in randuri_dupa_id(
+                session, select(Client.cui, Client.id), Client.cui, clienti
+            )
+        }
+        noi = [client for cui, client in clienti.items() if cui not in existenti]
+        actualizari = [
+            {"id": existenti[cui].id, **client}
+            for cui, client in clienti.items()
+            if cui in existenti
+        ]
+        if noi:
+            session.execute(insert(Client.__table__), noi)
+        if actualizari:
+            session.execute(update(Client), actualizari)
+            invalidare_clienti(
+                session, [(client["id"], client["cui"]) for client in actualizari]
+            )
+    return len(noi), len(actualizari), len(lot) - len(clienti)
+
+
+def _salvare_produse(lot):
+    # produsele fara id sunt mereu noi; cele cu id se actualizeaza daca exista.
+    # insert-ul pe tabela ramane un singur executemany si cand cota_tva lipseste
+    # doar pe unele randuri
+    fara_id = [produs for produs in lot if "id" not in produs]
+    cu_id = {produs["id"]: produs for produs in lot if "id" in produs}
+    with unit_of_work(scriere=True) as session:
+        existente = {
+            rand.id: rand
+            for rand in randuri_dupa_id(
+                session, select(Produs.id, Produs.cantitate), Produs.id, cu_id
+            )
+        }
+        noi_cu_id = [
+            produs for produs_id, produs in cu_id.items() if produs_id not in existente
+        ]
+        actualizari = [
+            produs for produs_id, produs in cu_id.items() if produs_id in existente
+        ]
+        for noi in (fara_id, noi_cu_id):
+            if noi:
+                session.execute(insert(Produs.__table__), noi)
+        if actualizari:
+            session.execute(update(Produs), actualizari)
+            invalidare_produse(session, [produs["id"] for produs in actualizari])
+            # cantitatea importata este stocul inventariat; diferenta intra in
+            # istoricul stocului
+            inregistrare_miscari(
+                session,
+                [
+                    (
+                        produs["id"],
+                        produs["cantitate"] - existente[produs["id"]].cantitate,
+                        None,
+                    )
+                    for produs in actualizari
+                    if produs["cantitate"] != existente[produs["id"]].cantitate
+                ],
+                "inventar",
+            )
+    duplicate = len(lot) - len(fara_id) - len(cu_id)
+    return len(fara_id) + len(noi_cu_id), len(actualizari), duplicate
+
+
+def _importare(cale, validare, salvare_lot, format_fisier, cale_respinse, dimensiune_lot):
+    dimensiune_lot = dimensiune_lot or dimensiune_lot_import
+    cale_respinse = cale_respinse or f"{os.path.splitext(cale)[0]}.respinse.jsonl"
+    raport = {"citite": 0, "inserate": 0, "actualizate": 0, "duplicate": 0, "respinse": 0}
+    fisier_respinse = None
+    lot = []
+    inceput = time.perf_counter()
+
+    def salvare():
+        inserate, actualizate, duplicate = salvare_lot(lot)
+        raport["inserate"] += inserate
+        raport["actualizate"] += actualizate
+        raport["duplicate"] += duplicate
+        lot.clear()
+
+    try:
+        for numar_rand, rand in citire_randuri(cale, format_fisier):
+            raport["citite"] += 1
+            try:
+                lot.append(validare(rand))
+            except ValueError as e:
+                # randurile respinse se scriu cu numarul lor si motivul respingerii
+                raport["respinse"] += 1
+                if fisier_respinse is None:
+                    fisier_respinse = open(cale_respinse, "w", encoding="utf-8")
+                fisier_respinse.write(
+                    json.dumps(
+                        {"rand": numar_rand, "eroare": str(e), "date": rand},
+                        ensure_ascii=False,
+                        default=str,
+                    )
+                    + "\n"
+                )
+                continue
+            if len(lot) >= dimensiune_lot:
+                salvare()
+        if lot:
+            salvare()
+    finally:
+        if fisier_respinse is not None:
+            fisier_respinse.close()
+
+    durata = time.perf_counter() - inceput
+    raport["fisier_respinse"] = cale_respinse if raport["respinse"] else None
+    raport["durata"] = round(durata, 3)
+    raport["randuri_pe_secunda"] = round(raport["citite"] / durata, 1) if durata else 0
+    print(
+        f"Randuri citite: {raport['citite']}, inserate: {raport['inserate']}, "
+        f"actualizate: {raport['actualizate']}, respinse: {raport['respinse']} "
+        f"({raport['randuri_pe_secunda']} randuri/s)"
+    )
+    if raport["respinse"]:
+        print(f"Randurile respinse au fost salvate in fisierul: {cale_respinse}")
+    return raport
+
+
+@cronometru
+def importare_clienti(cale, format_fisier=None, cale_respinse=None, dimensiune_lot=None):
+    return _importare(
+        cale, validare_client, _salvare_clienti, format_fisier, cale_respinse, dimensiune_lot
+    )
+
+
+@cronometru
+def importare_produse(cale, format_fisier=None, cale_respinse=None, dimensiune_lot=None):
+    return _importare(
+        cale, validare_produs, _salvare_produse, format_fisier, cale_respinse, dimensiune_lot
+    )
@@ -0,0 +1,278 @@
+# instrumentare optionala: numarul si durata interogarilor, durata functiilor
+# importante, incarcarile de relatii si un jurnal al interogarilor lente.
+# Dezactivata implicit; evenimentele SQLAlchemy se inregistreaza doar la
+# activare, iar functiile cronometrate verifica doar un indicator.
+import bisect
+import cProfile
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+prag_interogari_lente = float(os.getenv("INSTRUMENTARE_PRAG_LENT_MS", "100")) / 1000
+fisier_interogari_lente = os.getenv(
+    "INSTRUMENTARE_FISIER_LENTE", "interogari_lente.log"
+)
+director_profiluri = os.getenv("DIRECTOR_PROFILURI", ".")
+
+# limitele intervalelor histogramelor, in secunde
+limite_durata = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+
+_activ = False
+_blocare = threading.Lock()
+_contoare = {}
+_histograme = {}
+_descrieri = {
+    "interogari_total": ("counter", "Interogari SQL executate, dupa tip"),
+    "interogari_lente_total": ("counter", "Interogari peste pragul de durata"),
+    "erori_interogari_total": ("counter", "Interogari terminate cu eroare"),
+    "durata_interogari_secunde": ("histogram", "Durata interogarilor SQL"),
+    "incarcari_relatii_total": ("counter", "Incarcari de relatii ORM, lazy sau eager"),
+    "durata_functii_secunde": ("histogram", "Durata functiilor cronometrate"),
+    "erori_functii_total": ("counter", "Exceptii iesite din functiile cronometrate"),
+}
+
+
+def _cheie(nume, etichete):
+    return nume, tuple(sorted(etichete.items()))
+
+
+def contor(nume, valoare=1, **etichete):
+    cheie = _cheie(nume, etichete)
+    with _blocare:
+        _contoare[cheie] = _contoare.get(cheie, 0) + valoare
+
+
+def observare(nume, durata, **etichete):
+    cheie = _cheie(nume, etichete)
+    with _blocare:
+        histograma = _histograme.get(cheie)
+        if histograma is None:
+            # cate un numar pentru fiecare interval, plus suma si numarul total
+            histograma = _histograme[cheie] = [[0] * (len(limite_durata) + 1), 0.0, 0]
+        histograma[0][bisect.bisect_left(limite_durata, durata)] += 1
+        histograma[1] += durata
+        histograma[2] += 1
+
+
+def cronometru(functie):
+    # masoara durata apelurilor doar cand instrumentarea este activa
+    nume = functie.__name__
+
+    @functools.wraps(functie)
+    def functie_cronometrata(*args, **kwargs):
+        if not _activ:
+            return functie(*args, **kwargs)
+        inceput = time.perf_counter()
+        try:
+            return functie(*args, **kwargs)
+        except BaseException:
+            contor("erori_functii_total", functie=nume)
+            raise
+        finally:
+            observare(
+                "durata_functii_secunde", time.perf_counter() - inceput, functie=nume
+            )
+
+    return functie_cronometrata
+
+
+def _tip_interogare(instructiune):
+    cuvant = instructiune.lstrip().split(None, 1)[0].lower() if instructiune else ""
+    return cuvant if cuvant in ("select", "insert", "update", "delete") else "altele"
+
+
+def _inainte_de_executie(conexiune, cursor, instructiune, parametri, context, multi):
+    conexiune.info.setdefault("inceput_interogari", []).append(time.perf_counter())
+
+
+def _dupa_executie(conexiune, cursor, instructiune, parametri, context, multi):
+    inceputuri = conexiune.info.get("inceput_interogari")
+    if not inceputuri:
+        # instrumentarea a fost activata in timpul interogarii
+        return
+    durata = time.perf_counter() - inceputuri.pop()
+    tip = _tip_interogare(instructiune)
+    contor("interogari_total", tip=tip)
+    observare("durata_interogari_secunde", durata, tip=tip)
+    if durata >= prag_interogari_lente:
+        contor("interogari_lente_total", tip=tip)
+        _jurnal_interogare_lenta(conexiune, instructiune, parametri, multi, durata)
+
+
+def _eroare_executie(context_eroare):
+    # interogarile esuate nu ajung la after_cursor_execute
+    conexiune = context_eroare.connection
+    if conexiune is not None and conexiune.info.get("inceput_interogari"):
+        conexiune.info["inceput_interogari"].pop()
+        contor("erori_interogari_total")
+
+
+def _jurnal_interogare_lenta(conexiune, instructiune, parametri, multi, durata):
+    if multi:
+        numar_seturi = len(parametri)
+        parametri = parametri[0] if parametri else ()
+    else:
+        numar_seturi = 1
+    plan = None
+    if _tip_interogare(instructiune) != "altele":
+        prefix = (
+            "EXPLAIN QUERY PLAN " if conexiune.dialect.name == "sqlite" else "EXPLAIN "
+        )
+        try:
+            # planul se cere pe un cursor separat al aceleiasi conexiuni, in
+            # aceeasi tranzactie
+            cursor_plan = conexiune.connection.dbapi_connection.cursor()
+            try:
+                cursor_plan.execute(prefix + instructiune, parametri)
+                plan = "\n".join(
+                    "    " + " | ".join(str(valoare) for valoare in rand)
+                    for rand in cursor_plan.fetchall()
+                )
+            finally:
+                cursor_plan.close()
+        except Exception as e:
+            plan = f"    planul nu a putut fi obtinut: {e}"
+    parametri_text = repr(parametri)
+    if len(parametri_text) > 500:
+        parametri_text = parametri_text[:500] + "..."
+    with _blocare, open(fisier_interogari_lente, "a", encoding="utf-8") as f:
+        f.write(
+            f"{datetime.now().isoformat(sep=' ', timespec='milliseconds')} "
+            f"{durata * 1000:.1f} ms, {numar_seturi} seturi de parametri\n"
+            f"{instructiune.strip()}\nparametri: {parametri_text}\n"
+        )
+        if plan is not None:
+            f.write(f"plan:\n{plan}\n")
+        f.write("\n")
+
+
+def _executie_orm(stare):
+    if stare.is_relationship_load and stare.loader_strategy_path:
+        relatie = stare.loader_strategy_path.path[-1]
+        contor(
+            "incarcari_relatii_total",
+            relatie=str(relatie),
+            tip="lazy" if stare.lazy_loaded_from is not None else "eager",
+        )
+
+
+_evenimente = (
+    (Engine, "before_cursor_execute", _inainte_de_executie),
+    (Engine, "after_cursor_execute", _dupa_executie),
+    (Engine, "handle_error", _eroare_executie),
+    (Session, "do_orm_execute", _executie_orm),
+)
+
+
+def activare_instrumentare():
+    global _activ
+    with _blocare:
+        if _activ:
+            return
+        for tinta, nume, functie in _evenimente:
+            event.listen(tinta, nume, functie)
+        _activ = True
+
+
+def dezactivare_instrumentare():
+    global _activ
+    with _blocare:
+        if not _activ:
+            return
+        for tinta, nume, functie in _evenimente:
+            event.remove(tinta, nume, functie)
+        _activ = False
+
+
+def instrumentare_activa():
+    return _activ
+
+
+def resetare_metrici():
+    with _blocare:
+        _contoare.clear()
+        _histograme.clear()
+
+
+def _valoare_eticheta(valoare):
+    return str(valoare).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etichete_text(etichete):
+    if not etichete:
+        return ""
+    valori = ",".join(
+        f'{nume}="{_valoare_eticheta(valoare)}"' for nume, valoare in etichete
+    )
+    return "{" + valori + "}"
+
+
+def metrici_text():
+    # formatul text Prometheus (versiunea 0.0.4)
+    with _blocare:
+        contoare = sorted(_contoare.items())
+        histograme = sorted(
+            (cheie, ([*valori[0]], valori[1], valori[2]))
+            for cheie, valori in _histograme.items()
+        )
+    linii = []
+    anuntate = set()
+
+    def antet(nume):
+        if nume not in anuntate:
+            anuntate.add(nume)
+            tip, descriere = _descrieri.get(nume, ("untyped", nume))
+            linii.append(f"# HELP {nume} {descriere}")
+            linii.append(f"# TYPE {nume} {tip}")
+
+    for (nume, etichete), valoare in contoare:
+        antet(nume)
+        linii.append(f"{nume}{_etichete_text(etichete)} {valoare}")
+    for (nume, etichete), (intervale, suma, numar) in histograme:
+        antet(nume)
+        cumulat = 0
+        for limita, valoare in zip((*limite_durata, "+Inf"), intervale):
+            cumulat += valoare
+            linii.append(
+                f"{nume}_bucket{_etichete_text((*etichete, ('le', limita)))} {cumulat}"
+            )
+        linii.append(f"{nume}_sum{_etichete_text(etichete)} {suma:.6f}")
+        linii.append(f"{nume}_count{_etichete_text(etichete)} {numar}")
+    return "\n".join(linii) + "\n" if linii else ""
+
+
+def scriere_metrici(cale):
+    with open(cale, "w", encoding="utf-8") as f:
+        f.write(metrici_text())
+    return cale
+
+
+@contextmanager
+def profilare(nume="rulare"):
+    # --profile: cProfile pe toata rularea si metricile instrumentarii; ambele
+    # se scriu la final, cu numele rularii si momentul pornirii
+    os.makedirs(director_profiluri, exist_ok=True)
+    baza = os.path.join(
+        director_profiluri, f"profil_{nume}_{datetime.now():%Y%m%d_%H%M%S}"
+    )
+    activare_instrumentare()
+    profil = cProfile.Profile()
+    profil.enable()
+    try:
+        yield profil
+    finally:
+        profil.disable()
+        profil.dump_stats(baza + ".prof")
+        scriere_metrici(baza + ".metrici.txt")
+        print(f"Profilul rularii a fost scris in {baza}.prof si {baza}.metrici.txt")
+
+
+if os.getenv("INSTRUMENTARE", "0") == "1":
+    activare_instrumentare()
@@ -0,0 +1,407 @@
+# coada de joburi durabila, in aceeasi baza de date: lucrarile de dupa emitere
+# (documente, exporturi) se adauga in tranzactia facturii si sunt facute de
+# lucratori separati, deci emiterea nu mai asteapta scrierea fisierelor
+import argparse
+import json
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from .baza_date import init_db, sesiuni, unit_of_work
+from .exportare import exportare_facturi
+from .modele import Factura, Job
+from .randare import genereaza_factura
+
+# formatele documentelor generate in fundal pentru fiecare factura emisa, de
+# exemplu "txt,pdf"; implicit niciunul
+formate_joburi_factura = [
+    f.strip() for f in os.getenv("JOBURI_FACTURA", "").split(",") if f.strip()
+]
+director_joburi = os.getenv("DIRECTOR_JOBURI", ".")
+lucratori_impliciti = int(os.getenv("JOBURI_LUCRATORI", "4"))
+max_incercari = int(os.getenv("JOBURI_INCERCARI", "5"))
+# pauza dinaintea reincercarii se dubleaza la fiecare esec
+pauza_reincercare = float(os.getenv("JOBURI_PAUZA_REINCERCARE", "1"))
+pauza_maxima = float(os.getenv("JOBURI_PAUZA_MAXIMA", "300"))
+# un job preluat ramane al lucratorului cat timp acesta prelungeste blocarea;
+# dupa o cadere, jobul este preluat de altul cand blocarea expira
+durata_blocare = float(os.getenv("JOBURI_DURATA_BLOCARE", "60"))
+# peste limita, emiterea asteapta lucratorii cel mult asteptare_coada secunde
+limita_coada = int(os.getenv("JOBURI_LIMITA", "10000"))
+asteptare_coada = float(os.getenv("JOBURI_ASTEPTARE", "10"))
+
+# tip -> functia care face jobul; functiile trebuie sa poata fi repetate fara
+# alt efect, pentru ca un job intrerupt de o cadere se executa din nou
+tipuri_joburi = {}
+
+
+def tip_job(nume):
+    def inregistrare(functie):
+        tipuri_joburi[nume] = functie
+        return functie
+
+    return inregistrare
+
+
+@tip_job("randare_factura")
+def _randare_factura(factura_id, format_document="txt", director=None):
+    # fisierul se scrie atomic si doar daca difera, deci o rulare repetata nu
+    # schimba rezultatul; o factura stearsa intre timp nu mai are document
+    genereaza_factura(factura_id, format_document, director or director_joburi)
+
+
+@tip_job("exportare_facturi")
+def _exportare_facturi(cale, format_fisier=None, incremental=None):
+    exportare_facturi(cale, format_fisier, incremental)
+
+
+def _rand_job(tip, parametri, cheie, acum):
+    return {
+        "tip": tip,
+        "cheie": cheie or f"{tip}:{uuid.uuid4().hex}",
+        "parametri": json.dumps(parametri, sort_keys=True),
+        "stare": "in_asteptare",
+        "incercari": 0,
+        "max_incercari": max_incercari,
+        "disponibil_la": acum,
+    }
+
+
+def adaugare_joburi(sesiune, joburi):
+    # joburi: (tip, parametri, cheie); se salveaza odata cu tranzactia
+    # apelantului, deci un rollback nu lasa joburi fara factura
+    if joburi:
+        acum = datetime.now()
+        sesiune.execute(insert(Job), [_rand_job(*job, acum) for job in joburi])
+
+
+def joburi_facturi(sesiune, facturi):
+    # facturi: numar_factura -> id; cheia foloseste numarul, care nu se
+    # refoloseste niciodata (nici dupa stergere sau arhivare)
+    if formate_joburi_factura:
+        adaugare_joburi(
+            sesiune,
+            [
+                (
+                    "randare_factura",
+                    {"factura_id": factura_id, "format_document": format_document},
+                    f"randare_factura:{numar_factura}:{format_document}",
+                )
+                for numar_factura, factura_id in facturi.items()
+                for format_document in formate_joburi_factura
+            ],
+        )
+
+
+def adaugare_job(tip, parametri=None, cheie=None, refacere=False):
+    # intoarce id-ul jobului; cu o cheie deja folosita, id-ul jobului existent.
+    # Cu refacere, un job terminat (finalizat sau esuat) cu aceeasi cheie este
+    # pus din nou in asteptare; unul in asteptare sau in lucru ramane asa
+    if tip not in tipuri_joburi:
+        print(f"Tipul de job {tip} nu este cunoscut!")
+        return None
+    rand = _rand_job(tip, parametri or {}, cheie, datetime.now())
+    with unit_of_work(scriere=True) as session:
+        try:
+            with session.begin_nested():
+                session.execute(insert(Job), [rand])
+        except IntegrityError:
+            if refacere:
+                session.execute(
+                    update(Job)
+                    .where(
+                        Job.cheie == rand["cheie"],
+                        Job.stare.in_(("finalizat", "esuat")),
+                    )
+                    .values(
+                        parametri=rand["parametri"],
+                        stare="in_asteptare",
+                        incercari=0,
+                        disponibil_la=rand["disponibil_la"],
+                        lucrator=None,
+                        eroare=None,
+                        finalizat_la=None,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+        return session.execute(
+            select(Job.id).where(Job.cheie == rand["cheie"])
+        ).scalar()
+
+
+def randare_in_fundal(factura_id, format_document="txt", director=None):
+    # documentul unei facturi cerut explicit (de exemplu prin HTTP): cheia
+    # foloseste numarul facturii, ca la emitere, iar o cerere noua dupa ce
+    # documentul a fost generat il genereaza din nou. Fara factura, None
+    director = director or director_joburi
+    with unit_of_work(scriere=True) as session:
+        numar_factura = session.execute(
+            select(Factura.numar_factura).where(Factura.id == factura_id)
+        ).scalar()
+        if numar_factura is None:
+            return None
+        return adaugare_job(
+            "randare_factura",
+            {
+                "factura_id": factura_id,
+                "format_document": format_document,
+                "director": director,
+            },
+            f"randare_factura:{numar_factura}:{format_document}:{director}",
+            refacere=True,
+        )
+
+
+def adancime_coada(sesiune):
+    # joburile in asteptare, numarate pe indexul (stare, id) cel mult pana la
+    # limita, ca numaratoarea sa ramana ieftina cand coada este plina
+    in_asteptare = (
+        select(Job.id).where(Job.stare == "in_asteptare").limit(limita_coada)
+    )
+    return sesiune.execute(
+        select(func.count()).select_from(in_asteptare.subquery())
+    ).scalar()
+
+
+def asteptare_loc_in_coada():
+    # presiune inapoi: cat timp coada trece de limita, emiterea asteapta. In
+    # interiorul altei unitati de lucru (de exemplu din stratul asincron) nu se
+    # asteapta, ca sa nu fie tinuta tranzactia apelantului
+    if not formate_joburi_factura:
+        return True
+    in_unitate = sesiuni.registry.has() and sesiuni().info.get("adancime")
+    termen = time.monotonic() + (0 if in_unitate else asteptare_coada)
+    pauza = 0.05
+    while True:
+        with unit_of_work() as session:
+            adancime = adancime_coada(session)
+        if adancime < limita_coada:
+            return True
+        if time.monotonic() >= termen:
+            print(
+                f"Coada de joburi are {adancime} joburi in asteptare (limita "
+                f"{limita_coada}); porniti lucratorii cu python -m facturare.joburi"
+            )
+            return False
+        time.sleep(pauza)
+        pauza = min(pauza * 2, 1)
+
+
+def preluare_joburi(numar, lucrator, tipuri=None):
+    # joburile cu blocarea expirata (lucratorul lor a cazut) si cele ajunse la
+    # rand; pe MySQL, SKIP LOCKED lasa randurile preluate de altii
+    acum = datetime.now()
+    with unit_of_work(scriere=True) as session:
+        ids = []
+        for conditie in (
+            (Job.stare == "in_lucru") & (Job.blocat_pana_la < acum),
+            (Job.stare == "in_asteptare") & (Job.disponibil_la <= acum),
+        ):
+            if len(ids) >= numar:
+                break
+            interogare = select(Job.id).where(conditie)
+            if tipuri:
+                interogare = interogare.where(Job.tip.in_(tipuri))
+            ids += session.execute(
+                interogare.order_by(Job.id)
+                .limit(numar - len(ids))
+                .with_for_update(skip_locked=True)
+            ).scalars()
+        if not ids:
+            return []
+        session.execute(
+            update(Job)
+            .where(Job.id.in_(ids))
+            .values(
+                stare="in_lucru",
+                lucrator=lucrator,
+                blocat_pana_la=acum + timedelta(seconds=durata_blocare),
+                incercari=Job.incercari + 1,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        return session.execute(
+            select(Job.id, Job.tip, Job.parametri, Job.incercari, Job.max_incercari)
+            .where(Job.id.in_(ids))
+            .order_by(Job.id)
+        ).all()
+
+
+def _actualizare_job(job, lucrator, **valori):
+    # doar lucratorul care detine inca jobul ii poate schimba starea; daca
+    # blocarea a expirat si jobul a fost preluat de altul, rezultatul se ignora
+    with unit_of_work(scriere=True) as session:
+        return session.execute(
+            update(Job)
+            .where(
+                Job.id == job.id,
+                Job.lucrator == lucrator,
+                Job.incercari == job.incercari,
+                Job.stare == "in_lucru",
+            )
+            .values(blocat_pana_la=None, **valori)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+
+def _executare_job(job, lucrator):
+    try:
+        functie = tipuri_joburi.get(job.tip)
+        if functie is None:
+            raise LookupError(f"Tipul de job {job.tip} nu este cunoscut")
+        functie(**json.loads(job.parametri))
+    except Exception as e:
+        eroare = f"{type(e).__name__}: {e}"
+        if job.incercari >= job.max_incercari:
+            _actualizare_job(job, lucrator, stare="esuat", eroare=eroare)
+            return "esuat"
+        # pauza exponentiala, cu o parte aleatoare ca reincercarile sa nu vina
+        # toate deodata
+        pauza = min(pauza_reincercare * 2 ** (job.incercari - 1), pauza_maxima)
+        _actualizare_job(
+            job,
+            lucrator,
+            stare="in_asteptare",
+            disponibil_la=datetime.now()
+            + timedelta(seconds=random.uniform(pauza / 2, pauza)),
+            eroare=eroare,
+        )
+        return "reincercat"
+    _actualizare_job(
+        job, lucrator, stare="finalizat", finalizat_la=datetime.now(), eroare=None
+    )
+    return "finalizat"
+
+
+def _prelungire_blocare(joburi, lucrator):
+    with unit_of_work(scriere=True) as session:
+        session.execute(
+            update(Job)
+            .where(
+                Job.id.in_([job.id for job in joburi]),
+                Job.lucrator == lucrator,
+                Job.stare == "in_lucru",
+            )
+            .values(blocat_pana_la=datetime.now() + timedelta(seconds=durata_blocare))
+            .execution_options(synchronize_session=False)
+        )
+
+
+def _joburi_neterminate():
+    with unit_of_work() as session:
+        neterminate = select(Job.id).where(Job.stare.in_(("in_asteptare", "in_lucru")))
+        return session.execute(select(neterminate.exists())).scalar()
+
+
+def rulare_lucratori(lucratori=None, tipuri=None, oprire=None, pana_la_golire=False):
+    # un fir preia joburile si le da lucratorilor; se preiau doar atatea joburi
+    # cati lucratori sunt liberi, restul raman in coada pentru alte procese
+    lucratori = lucratori or lucratori_impliciti
+    lucrator = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    oprire = oprire or threading.Event()
+    raport = {"finalizat": 0, "reincercat": 0, "esuat": 0}
+    in_lucru = {}
+    ultima_prelungire = time.monotonic()
+    with ThreadPoolExecutor(lucratori) as executor:
+        while not oprire.is_set():
+            joburi = []
+            libere = lucratori - len(in_lucru)
+            if libere:
+                try:
+                    joburi = preluare_joburi(libere, lucrator, tipuri)
+                except OperationalError as e:
+                    # baza ocupata: se incearca din nou la urmatoarea trecere
+                    print(f"Joburile nu au putut fi preluate: {e}")
+            for job in joburi:
+                in_lucru[executor.submit(_executare_job, job, lucrator)] = job
+            if not in_lucru:
+                if pana_la_golire and not joburi and not _joburi_neterminate():
+                    break
+                oprire.wait(0.2)
+                continue
+            terminate, _ = wait(in_lucru, timeout=0.2, return_when=FIRST_COMPLETED)
+            for viitor in terminate:
+                del in_lucru[viitor]
+                raport[viitor.result()] += 1
+            if in_lucru and time.monotonic() - ultima_prelungire > durata_blocare / 3:
+                _prelungire_blocare(in_lucru.values(), lucrator)
+                ultima_prelungire = time.monotonic()
+        # la oprire se termina joburile deja incepute
+        for viitor in in_lucru:
+            raport[viitor.result()] += 1
+    print(
+        f"Joburi finalizate: {raport['finalizat']}, reincercate: "
+        f"{raport['reincercat']}, esuate: {raport['esuat']}"
+    )
+    return raport
+
+
+def stare_coada():
+    with unit_of_work() as session:
+        return dict(
+            session.execute(
+                select(Job.stare, func.count(Job.id)).group_by(Job.stare)
+            ).all()
+        )
+
+
+def curatare_joburi(zile=7):
+    # joburile finalizate raman o vreme, ca o cheie repetata sa nu le refaca
+    limita = datetime.now() - timedelta(days=zile)
+    with unit_of_work(scriere=True) as session:
+        sterse = session.execute(
+            delete(Job).where(Job.stare == "finalizat", Job.finalizat_la < limita)
+        ).rowcount
+    print(f"Au fost sterse {sterse} joburi finalizate mai vechi de {zile} zile.")
+    return sterse
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lucratorii cozii de joburi")
+    parser.add_argument("--lucratori", type=int)
+    parser.add_argument("--tipuri", help="tipurile de joburi, separate prin virgula")
+    parser.add_argument(
+        "--pana-la-golire",
+        action="store_true",
+        help="se opreste cand nu mai sunt joburi de facut",
+    )
+    parser.add_argument(
+        "--stare", action="store_true", help="afiseaza numarul de joburi pe stari"
+    )
+    parser.add_argument(
+        "--curatare",
+        type=int,
+        metavar="ZILE",
+        help="sterge joburile finalizate mai vechi de ZILE zile",
+    )
+    argumente = parser.parse_args()
+    init_db()
+    if argumente.stare:
+        for stare, numar in stare_coada().items():
+            print(f"{stare}: {numar}")
+        return
+    if argumente.curatare is not None:
+        curatare_joburi(argumente.curatare)
+        return
+    oprire = threading.Event()
+    try:
+        rulare_lucratori(
+            argumente.lucratori,
+            argumente.tipuri.split(",") if argumente.tipuri else None,
+            oprire,
+            argumente.pana_la_golire,
+        )
+    except KeyboardInterrupt:
+        oprire.set()
+
+
+if __name__ == "__main__":
+    main()
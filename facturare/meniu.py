@@ -0,0 +1,430 @@
+import csv
+import os
+
+from .baza_date import init_db
+from .cautare import cautare_clienti, cautare_produse
+from .importare import importare_clienti, importare_produse, validare_produs
+from .modele import Client, Factura, Produs
+from .randare import genereaza_factura, genereaza_factura_txt
+from .rapoarte import afisare_rapoarte
+from .servicii import (
+    adaugare_client,
+    adaugare_factura,
+    adaugare_produs,
+    cautare_numar_factura,
+    exista_inregistrari,
+    intrare_stoc,
+    iter_clienti,
+    iter_facturi,
+    iter_produse,
+    numar_inregistrari,
+    stergere_client,
+    stergere_factura,
+    stergere_produs,
+)
+
+
+def iesire_program():
+    interactiune_program = False
+    return interactiune_program
+
+
+culori = {
+        1: "\033[94m",  # Albastru pentru Client
+        2: "\033[92m",  # Verde pentru Produs
+        3: "\033[93m",  # Galben pentru Factura
+        0: "\033[91m",  # Roșu pentru Iesire
+    }
+
+resetare = "\033[0m"
+
+
+def afisare_meniu(optiune):
+    if optiune == 1:
+        print(f"{culori[1]}Meniu Client{resetare}")
+    elif optiune == 2:
+        print(f"{culori[2]}Meniu Produs{resetare}")
+    elif optiune == 3:
+        print(f"{culori[3]}Meniu Factura{resetare}")
+    elif optiune == 0:
+        print(f"{culori[0]}Ieșire din program{resetare}")
+        return False
+
+    return True
+
+
+def afisare_paginata(pagini, formatare=repr):
+    pagina = next(pagini, None)
+    numar_pagina = 1
+    while pagina:
+        for element in pagina:
+            print(formatare(element))
+        pagina = next(pagini, None)
+        if not pagina:
+            break
+        optiune = input(
+            f"Pagina {numar_pagina}. Apasati Enter pentru pagina urmatoare "
+            f"sau 'q' pentru a opri afisarea: "
+        )
+        if optiune.strip().lower() == "q":
+            break
+        numar_pagina += 1
+
+
+def descriere_factura(factura):
+    return (
+        f"Factura(id={factura.id}, nr factura={factura.numar_factura}, "
+        f"data_emitere={factura.data_emitere}, "
+        f"subtotal={factura.subtotal}, total={factura.total}"
+    )
+
+
+def afisare_cautare(cautare, iterare, descriere):
+    # primele potriviri pentru textul introdus; fara text se afiseaza lista
+    # completa, pe pagini
+    text_cautat = input(f"Cautati {descriere} (Enter pentru lista completa): ").strip()
+    if not text_cautat:
+        afisare_paginata(iterare())
+        return
+    while text_cautat:
+        rezultate = cautare(text_cautat)
+        if not rezultate:
+            print(f"Nu a fost gasit niciun rezultat pentru '{text_cautat}'.")
+        for rand in rezultate:
+            print(
+                ", ".join(
+                    f"{cheie}={valoare}" for cheie, valoare in rand._mapping.items()
+                )
+            )
+        text_cautat = input("Alta cautare (Enter pentru a continua): ").strip()
+
+
+def cautare_clienti_meniu():
+    afisare_cautare(cautare_clienti, iter_clienti, "clientul dupa nume, CUI sau adresa")
+
+
+def cautare_produse_meniu():
+    afisare_cautare(cautare_produse, iter_produse, "produsul dupa denumire")
+
+
+def adaugare_produs_din_text(produs):
+    produs = validare_produs(
+        {"denumire_produs": produs[0], "cantitate": produs[1], "pret_unitar": produs[2]}
+    )
+    return adaugare_produs(
+        produs["denumire_produs"], produs["cantitate"], produs["pret_unitar"]
+    )
+
+
+def importare_din_fisier(importare, coloane):
+    print(f"Fisierul CSV trebuie sa aiba antetul: {coloane} (JSONL: aceleasi chei)")
+    cale = input("Introduceti calea fisierului: ").strip()
+    if not os.path.isfile(cale):
+        print(f"Fisierul {cale} nu exista!")
+        return
+    try:
+        importare(cale)
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        print(f"Fisierul nu a putut fi importat: {e}")
+
+
+def main():
+    init_db()
+    interactiune_program = True
+
+    while interactiune_program:
+
+        optiuni = input(
+            f"""
+            Introduceti cifra optiunii dorite:
+            {culori[1]}1 Client{resetare};
+            {culori[2]}2 Produs{resetare};
+            {culori[3]}3 Factura{resetare};
+            {culori[0]}0 Iesire{resetare}
+        
+            """
+        )
+
+        try:
+            optiune_int = int(optiuni)
+            interactiune_program = afisare_meniu(optiune_int)
+            if interactiune_program:
+                if optiune_int == 1:
+                    meniu_clienti = True
+
+                    while meniu_clienti:
+                        optiuni_clienti = input(
+                            f""""
+                            {culori[1]}Introduceti cifra obtiunii din meniul clienti dorite:
+                            1 Adaugare Client
+                            2 Stergere Client
+                            3 Afisare Client
+                            4 Import Clienti din fisier CSV/JSONL
+                            0 Iesire meniu clienti{resetare}
+                            """
+                        )
+                        try:
+                            optiuni_clienti_int = int(optiuni_clienti)
+                            if optiuni_clienti_int == 1:
+                                try:
+                                    print(
+                                        "Introduceti datele despre Client astfel: Nume Client, RO00000001, Adresa Client"
+                                    )
+                                    date_client = input("Introduceti datele clientului: ")
+                                    client = [date.strip() for date in date_client.split(",")]
+                                    adaugare_client(client[0], client[1], client[2])
+                                except IndexError:
+                                    print(
+                                        "Nu ai introdus toate datele clientului ca in exemplul de mai sus!"
+                                    )
+
+                            if optiuni_clienti_int == 2:
+                                try:
+                                    cautare_clienti_meniu()
+                                    client_id = input(
+                                        "Introduceti id-ul clientului pe caredoriti sa-l stergeti: "
+                                    )
+                                    stergere_client(int(client_id))
+                                except ValueError:
+                                    print("Id-ul introdus nu este valid!")
+
+                            if optiuni_clienti_int == 3:
+                                if not exista_inregistrari(Client):
+                                    print("Nu se afla niciun client in baza de date")
+                                else:
+                                    afisare_paginata(iter_clienti())
+
+                            if optiuni_clienti_int == 4:
+                                importare_din_fisier(
+                                    importare_clienti, "nume_client,cui,adresa_client"
+                                )
+
+                            if optiuni_clienti_int == 0:
+                                meniu_clienti = False
+
+                        except ValueError:
+                            print("Optiunea ta nu se regaseste in meniul clienti!")
+
+                elif optiune_int == 2:
+                    meniu_produse = True
+
+                    while meniu_produse:
+                        optiuni_produse = input(
+                            f"""
+                            {culori[2]}Introduceti cifra optiunii din meniul produse dorite:
+                            1 Adaugare Produs
+                            2 Stergere Produs
+                            3 Afisare Produs
+                            4 Import Produse din fisier CSV/JSONL
+                            5 Intrare in stoc
+                            0 Iesire meniu produse{resetare}
+                            """
+                        )
+                        try:
+                            optiuni_produse_int = int(optiuni_produse)
+                            if optiuni_produse_int == 1:
+                                try:
+                                    print(
+                                        "Adaugati date despre produs astfel: Nume Produs, Cantitate Produs, Pret Produs"
+                                    )
+                                    date_produs = input("Introduceti date despre produs: ")
+                                    produs = [date.strip() for date in date_produs.split(",")]
+                                    adaugare_produs_din_text(produs)
+
+                                except IndexError:
+                                    print(
+                                        "Nu ai introdus toate datele produsului ca in exemplul de mai sus!"
+                                    )
+                                except ValueError as e:
+                                    print(f"Datele produsului nu sunt valide: {e}")
+
+                            elif optiuni_produse_int == 2:
+                                try:
+                                    cautare_produse_meniu()
+                                    produs_id = input(
+                                        "Introduceti id-ul produsului pe caredoriti sa-l stergeti: "
+                                    )
+                                    stergere_produs(int(produs_id))
+                                except ValueError:
+                                    print("Id-ul introdus nu este valid!")
+
+                            elif optiuni_produse_int == 3:
+                                if not exista_inregistrari(Produs):
+                                    print("Nu se afla niciun produs in baza de date")
+                                else:
+                                    afisare_paginata(iter_produse())
+
+                            elif optiuni_produse_int == 4:
+                                importare_din_fisier(
+                                    importare_produse,
+                                    "denumire_produs,cantitate,pret_unitar[,cota_tva][,id]",
+                                )
+
+                            elif optiuni_produse_int == 5:
+                                try:
+                                    cautare_produse_meniu()
+                                    produs_id = int(input("Introduceti id-ul produsului: "))
+                                    cantitate = int(input("Cantitatea intrata in stoc: "))
+                                    intrare_stoc(produs_id, cantitate)
+                                except ValueError:
+                                    print("Datele introduse nu sunt valide!")
+
+                            elif optiuni_produse_int == 0:
+                                meniu_produse = False
+
+                        except ValueError:
+                            print("Optiunea ta nu se regaseste in meniul produse!")
+
+                elif optiune_int == 3:
+                    meniu_facturi = True
+
+                    while meniu_facturi:
+                        optiuni_facturi = input(
+                            f"""
+                            {culori[3]}Introduceti cifra optiunii din meniul facturti dorite:
+                            1 Adaugare Factura
+                            2 Stergere Factura
+                            3 Afisare Facturi
+                            4 Generare Factura
+                            5 Rapoarte vanzari
+                            0 Iesire meniu facturi{resetare}
+                            """
+                        )
+
+                        try:
+                            optiuni_facturi_int = int(optiuni_facturi)
+                            if optiuni_facturi_int == 1:
+                                try:
+
+                                    if numar_inregistrari(Client) <= 1:
+                                        try:
+                                            print(
+                                                "Introduceti datele despre Client astfel: "
+                                                "Nume Client, RO00000001, Adresa Client"
+                                            )
+                                            date_client = input(
+                                                "Introduceti datele clientului: "
+                                            )
+                                            client = [
+                                                date.strip() for date in date_client.split(",")
+                                            ]
+                                            adaugare_client(client[0], client[1], client[2])
+                                        except IndexError:
+                                            print(
+                                                "Nu ai introdus toate datele clientului ca in exemplul de mai sus!"
+                                            )
+
+                                    print("Selectați ID-ul furnizorului:")
+                                    cautare_clienti_meniu()
+                                    furnizor_id = int(input("ID-ul furnizorului: "))
+
+                                    print("Selectați ID-ul clientului:")
+                                    cautare_clienti_meniu()
+                                    client_id = int(input("ID-ul clientului: "))
+
+                                    if not exista_inregistrari(Produs):
+                                        try:
+                                            print(
+                                                "Adaugati date despre produs astfel: Nume Produs, Cantitate Produs, Pret Produs"
+                                            )
+                                            date_produs = input(
+                                                "Introduceti date despre produs: "
+                                            )
+                                            produs = [
+                                                date.strip() for date in date_produs.split(",")
+                                            ]
+                                            adaugare_produs_din_text(produs)
+                                        except IndexError:
+                                            print(
+                                                "Nu ai introdus toate datele produsului ca in exemplul de mai sus!"
+                                            )
+
+                                    print(
+                                        "Selectați ID-urile produselor (separate prin virgula), "
+                                        "optional cu cantitatea: 12:3, 14"
+                                    )
+                                    cautare_produse_meniu()
+                                    produse_ids = []
+                                    cantitati = {}
+                                    for element in input("ID-urile produselor: ").split(","):
+                                        produs_id, _, cantitate = element.partition(":")
+                                        produse_ids.append(int(produs_id.strip()))
+                                        if cantitate.strip():
+                                            cantitati[produse_ids[-1]] = int(cantitate)
+                                    adaugare_factura(
+                                        furnizor_id, client_id, produse_ids, cantitati
+                                    )
+
+                                except ValueError:
+                                    print("Datele introduse nu sunt valide!")
+
+                            elif optiuni_facturi_int == 2:
+                                try:
+                                    afisare_paginata(iter_facturi(), descriere_factura)
+                                    factura_id = int(
+                                        input(
+                                            "Introduceți ID-ul facturii pe care doriți să o ștergeți: "
+                                        )
+                                    )
+                                    stergere_factura(factura_id)
+
+                                except ValueError:
+                                    print("ID-ul introdus nu este valid!")
+
+                            elif optiuni_facturi_int == 3:
+                                if not exista_inregistrari(Factura):
+                                    print(f"Nu se afla nici o factura in baza de date")
+                                else:
+                                    afisare_paginata(iter_facturi(), descriere_factura)
+
+                            elif optiuni_facturi_int == 4:
+                                try:
+                                    afisare_paginata(iter_facturi(), descriere_factura)
+
+                                    facturi_id = input(
+                                        "Introduceți ID-ul facturii pentru care doriți să o generați: "
+                                    )
+                                    if facturi_id.isnumeric():
+                                        facturi_id = int(facturi_id)
+                                        numar_factura = cautare_numar_factura(facturi_id)
+                                        if numar_factura is not None:
+                                            format_document = (
+                                                input(
+                                                    "Format (txt/html/pdf) [txt]: "
+                                                ).strip().lower()
+                                                or "txt"
+                                            )
+                                            if format_document == "txt":
+                                                genereaza_factura_txt(facturi_id)
+                                            else:
+                                                genereaza_factura(
+                                                    facturi_id, format_document
+                                                )
+                                            print(
+                                                f"Factura {numar_factura} a fost generata cu succes!"
+                                            )
+                                        else:
+                                            print(
+                                                "ID-ul {facturi_id} introdus nu corespunde niciunei facturi existente."
+                                            )
+                                    else:
+                                        print(
+                                            "ID-ul {facturi_id} introdus nu este un număr valid!"
+                                        )
+
+                                except Exception as e:
+                                    print(f"Eroare: {e}")
+
+                            elif optiuni_facturi_int == 5:
+                                afisare_rapoarte()
+
+                            elif optiuni_facturi_int == 0:
+                                meniu_facturi = False
+
+                        except ValueError:
+                            print("Opțiunea ta nu se regasește in meniul facturi!")
+
+                elif optiune_int == 0:
+                    interactiune_program = False
+        except ValueError:
+            print("Optiunea ta nu e o obtiune valida!")
@@ -0,0 +1,274 @@
+import os
+
+from sqlalchemy import Integer, create_engine, func, insert, inspect, select, text
+from sqlalchemy.schema import CreateTable
+
+from .bani import cota_tva, in_puncte
+from .modele import Arhivare, Base, Client, Factura, LinieFactura, VersiuneSchema
+from .totaluri_zilnice import reconstruire_totaluri_zilnice
+
+# tabela -> (numele indexului de cautare, coloanele indexate)
+indexuri_cautare = {
+    "clienti": ("clienti_fts", ("nume_client", "cui", "adresa_client")),
+    "produse": ("produse_fts", ("denumire_produs",)),
+}
+
+
+def _recalculare_totaluri_facturi(conexiune):
+    # totalurile facturii sunt sumele liniilor rotunjite, ca in bani.py
+    conexiune.execute(
+        text(
+            "UPDATE facturi SET "
+            "subtotal = (SELECT COALESCE(SUM(l.total_linie), 0) "
+            "FROM linii_factura l WHERE l.factura_id = facturi.id), "
+            "tva = (SELECT COALESCE(SUM(l.tva_linie), 0) "
+            "FROM linii_factura l WHERE l.factura_id = facturi.id)"
+        )
+    )
+    conexiune.execute(text("UPDATE facturi SET total = subtotal + tva"))
+
+
+def _migrare_linii_factura(conexiune):
+    # facturile vechi: totaluri pe factura si linii copiate din factura_produs.
+    # linii_factura este creata de create_all cu sumele in bani si cota in
+    # puncte de baza, deci liniile si totalurile se scriu direct asa
+    coloane = {c["name"] for c in inspect(conexiune).get_columns("facturi")}
+    for coloana in ("subtotal", "tva", "total"):
+        if coloana not in coloane:
+            conexiune.execute(
+                text(
+                    f"ALTER TABLE facturi ADD COLUMN {coloana} "
+                    f"BIGINT NOT NULL DEFAULT 0"
+                )
+            )
+    if not inspect(conexiune).has_table("factura_produs"):
+        return
+    conexiune.execute(
+        text(
+            "INSERT INTO linii_factura (factura_id, produs_id, denumire_produs, "
+            "cantitate, pret_unitar, cota_tva, total_linie, tva_linie) "
+            "SELECT fp.factura_id, p.id, p.denumire_produs, p.cantitate, "
+            "ROUND(p.pret_unitar * 100), :cota_tva, "
+            "ROUND(p.pret_unitar * 100) * p.cantitate, "
+            "ROUND(ROUND(p.pret_unitar * 100) * p.cantitate * :cota_tva / 10000.0) "
+            "FROM factura_produs fp JOIN produse p ON p.id = fp.produs_id"
+        ),
+        {"cota_tva": in_puncte(cota_tva)},
+    )
+    _recalculare_totaluri_facturi(conexiune)
+    conexiune.execute(text("DROP TABLE factura_produs"))
+
+
+def _coloane_de_convertit(conexiune, tabela, coloane):
+    # coloanele create deja ca numere intregi (de create_all sau de migrarea 1)
+    # au valorile in bani, respectiv puncte de baza
+    tipuri = {c["name"]: c["type"] for c in inspect(conexiune).get_columns(tabela)}
+    return [c for c in coloane if not isinstance(tipuri[c], Integer)]
+
+
+def _conversie(conexiune, tabela, coloane, factor, tip_mysql):
+    if conexiune.dialect.name == "mysql":
+        # FLOAT are doar ~7 cifre exacte; valorile se inmultesc in DOUBLE
+        for coloana in coloane:
+            conexiune.execute(
+                text(f"ALTER TABLE {tabela} MODIFY {coloana} DOUBLE NOT NULL")
+            )
+    valori = ", ".join(f"{c} = ROUND({c} * {factor})" for c in coloane)
+    conexiune.execute(text(f"UPDATE {tabela} SET {valori}"))
+    if conexiune.dialect.name == "mysql":
+        for coloana in coloane:
+            conexiune.execute(
+                text(f"ALTER TABLE {tabela} MODIFY {coloana} {tip_mysql} NOT NULL")
+            )
+
+
+def _migrare_bani(conexiune):
+    # sumele devin numere intregi de bani, cotele puncte de baza
+    coloane = {c["name"] for c in inspect(conexiune).get_columns("produse")}
+    if "cota_tva" not in coloane:
+        conexiune.execute(text("ALTER TABLE produse ADD COLUMN cota_tva INTEGER"))
+    sume = {
+        "produse": ["pret_unitar"],
+        "linii_factura": ["pret_unitar", "total_linie", "tva_linie"],
+        "facturi": ["subtotal", "tva", "total"],
+    }
+    convertite = set()
+    for tabela, coloane_sume in sume.items():
+        coloane_sume = _coloane_de_convertit(conexiune, tabela, coloane_sume)
+        if coloane_sume:
+            _conversie(conexiune, tabela, coloane_sume, 100, "BIGINT")
+            convertite.add(tabela)
+    if _coloane_de_convertit(conexiune, "linii_factura", ["cota_tva"]):
+        _conversie(conexiune, "linii_factura", ["cota_tva"], 10000, "INTEGER")
+    # TVA-ul facturilor vechi era rotunjit din totalul facturii
+    if convertite & {"linii_factura", "facturi"}:
+        _recalculare_totaluri_facturi(conexiune)
+
+
+def _migrare_indexuri(conexiune):
+    # indexuri pentru cheile straine si coloanele folosite la cautare
+    cui_duplicate = (
+        conexiune.execute(
+            select(Client.cui).group_by(Client.cui).having(func.count() > 1)
+        )
+        .scalars()
+        .all()
+    )
+    for tabela in ("clienti", "facturi", "linii_factura"):
+        for index in Base.metadata.tables[tabela].indexes:
+            if index.name == "ix_clienti_cui" and cui_duplicate:
+                print(
+                    f"CUI-urile {', '.join(cui_duplicate)} apar la mai multi clienti; "
+                    f"indexul pe cui a fost creat fara restrictia de unicitate."
+                )
+                conexiune.execute(text("CREATE INDEX ix_clienti_cui ON clienti (cui)"))
+                continue
+            index.create(conexiune, checkfirst=True)
+
+
+def _migrare_totaluri_zilnice(conexiune):
+    # tabelele noi sunt create de create_all; aici se completeaza din facturile
+    # emise inainte de introducerea lor. Reconstruirea ignora facturile sterse,
+    # deci are nevoie de coloana adaugata in migrarea 6
+    _migrare_stergere_logica(conexiune)
+    reconstruire_totaluri_zilnice(conexiune)
+
+
+def _migrare_cautare(conexiune):
+    # tabelele FTS5 (SQLite) sau indexurile FULLTEXT (MySQL) folosite de cautare
+    if conexiune.dialect.name == "mysql":
+        # InnoDB actualizeaza singur indexurile FULLTEXT la scriere
+        for tabela, (nume_index, coloane) in indexuri_cautare.items():
+            conexiune.execute(
+                text(
+                    f"ALTER TABLE {tabela} ADD FULLTEXT INDEX {nume_index} "
+                    f"({', '.join(coloane)})"
+                )
+            )
+        return
+    for tabela, (nume_index, coloane) in indexuri_cautare.items():
+        lista = ", ".join(coloane)
+        noi = ", ".join(f"new.{coloana}" for coloana in coloane)
+        vechi = ", ".join(f"old.{coloana}" for coloana in coloane)
+        stergere = (
+            f"INSERT INTO {nume_index} ({nume_index}, rowid, {lista}) "
+            f"VALUES ('delete', old.id, {vechi});"
+        )
+        inserare = f"INSERT INTO {nume_index} (rowid, {lista}) VALUES (new.id, {noi});"
+        conexiune.execute(
+            text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {nume_index} USING fts5("
+                f"{lista}, content='{tabela}', content_rowid='id', "
+                f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+        )
+        # indexul urmeaza tabela; actualizarile altor coloane (de exemplu
+        # stocul produselor) nu il ating
+        for nume_trigger, eveniment, corp in (
+            ("ai", "AFTER INSERT", inserare),
+            ("ad", "AFTER DELETE", stergere),
+            ("au", f"AFTER UPDATE OF {lista}", stergere + " " + inserare),
+        ):
+            conexiune.execute(
+                text(
+                    f"CREATE TRIGGER IF NOT EXISTS {nume_index}_{nume_trigger} "
+                    f"{eveniment} ON {tabela} BEGIN {corp} END"
+                )
+            )
+        conexiune.execute(
+            text(f"INSERT INTO {nume_index} ({nume_index}) VALUES ('rebuild')")
+        )
+
+
+def _migrare_stergere_logica(conexiune):
+    # facturile sterse raman in tabela, marcate cu data stergerii
+    coloane = {c["name"] for c in inspect(conexiune).get_columns("facturi")}
+    if "sters_la" not in coloane:
+        conexiune.execute(text("ALTER TABLE facturi ADD COLUMN sters_la DATETIME"))
+
+
+def _id_maxim_arhive(conexiune, tabela):
+    # cel mai mare id mutat in arhivele inregistrate, ca sa nu fie refolosit
+    maxim = 0
+    for cale in set(conexiune.execute(select(Arhivare.cale)).scalars()):
+        if not os.path.exists(cale):
+            continue
+        engine = create_engine(f"sqlite:///file:{cale}?mode=ro&uri=true")
+        try:
+            with engine.connect() as conexiune_arhiva:
+                if inspect(conexiune_arhiva).has_table(tabela):
+                    maxim = max(
+                        maxim,
+                        conexiune_arhiva.execute(
+                            text(f"SELECT COALESCE(MAX(id), 0) FROM {tabela}")
+                        ).scalar(),
+                    )
+        finally:
+            engine.dispose()
+    return maxim
+
+
+def _migrare_autoincrement(conexiune):
+    # SQLite refoloseste cel mai mare id dupa stergerea lui, deci o factura noua
+    # putea primi id-ul unei facturi arhivate; tabelele se reconstruiesc cu
+    # AUTOINCREMENT (MySQL nu refoloseste id-urile)
+    if conexiune.dialect.name != "sqlite":
+        return
+    for tabela in (Factura.__table__, LinieFactura.__table__):
+        definitie = conexiune.execute(
+            text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :n"),
+            {"n": tabela.name},
+        ).scalar()
+        if "AUTOINCREMENT" not in definitie.upper():
+            coloane = ", ".join(coloana.name for coloana in tabela.c)
+            creare = str(CreateTable(tabela).compile(dialect=conexiune.dialect))
+            creare = creare.replace(
+                f"CREATE TABLE {tabela.name} ", f"CREATE TABLE {tabela.name}_nou ", 1
+            )
+            conexiune.execute(text(creare))
+            conexiune.execute(
+                text(
+                    f"INSERT INTO {tabela.name}_nou ({coloane}) "
+                    f"SELECT {coloane} FROM {tabela.name}"
+                )
+            )
+            conexiune.execute(text(f"DROP TABLE {tabela.name}"))
+            conexiune.execute(
+                text(f"ALTER TABLE {tabela.name}_nou RENAME TO {tabela.name}")
+            )
+            for index in tabela.indexes:
+                index.create(conexiune)
+        maxim = _id_maxim_arhive(conexiune, tabela.name)
+        if maxim:
+            conexiune.execute(
+                text("DELETE FROM sqlite_sequence WHERE name = :n AND seq < :maxim"),
+                {"n": tabela.name, "maxim": maxim},
+            )
+            conexiune.execute(
+                text(
+                    "INSERT INTO sqlite_sequence (name, seq) SELECT :n, :maxim "
+                    "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = :n)"
+                ),
+                {"n": tabela.name, "maxim": maxim},
+            )
+
+
+# migrari versionate; create_all nu poate modifica tabelele existente
+migrari = [
+    (1, _migrare_linii_factura),
+    (2, _migrare_bani),
+    (3, _migrare_indexuri),
+    (4, _migrare_totaluri_zilnice),
+    (5, _migrare_cautare),
+    (6, _migrare_stergere_logica),
+    (7, _migrare_autoincrement),
+]
+
+
+def aplicare_migrari(engine):
+    with engine.begin() as conexiune:
+        aplicate = set(conexiune.execute(select(VersiuneSchema.versiune)).scalars())
+        for versiune, migrare in migrari:
+            if versiune not in aplicate:
+                migrare(conexiune)
+                conexiune.execute(insert(VersiuneSchema).values(versiune=versiune))
@@ -0,0 +1,263 @@
+from sqlalchemy import (
+    Column,
+    Date,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    func,
+)
+from sqlalchemy.orm import declarative_base, relationship
+
+from .bani import Bani, CotaTva
+
+Base = declarative_base()
+
+
+class Client(Base):
+    __tablename__ = "clienti"
+    id = Column(Integer, primary_key=True)
+    nume_client = Column(String(30), nullable=False)
+    cui = Column(String(20), nullable=False, unique=True, index=True)
+    adresa_client = Column(String(100), nullable=False)
+    facturi_emise = relationship(
+        "Factura", back_populates="furnizor", foreign_keys="Factura.furnizor_id"
+    )
+
+    def __repr__(self):
+        return (
+            f"Client(id={self.id}, nume_client={self.nume_client}, cui={self.cui}, "
+            f"adresa_client={self.adresa_client})"
+        )
+
+
+class Produs(Base):
+    __tablename__ = "produse"
+    id = Column(Integer, primary_key=True)
+    denumire_produs = Column(String(30), nullable=False)
+    cantitate = Column(Integer, nullable=False)
+    pret_unitar = Column(Bani, nullable=False)
+    # cota proprie a produsului; daca lipseste se aplica cota_tva
+    cota_tva = Column(CotaTva)
+    facturi = relationship(
+        "Factura", secondary="linii_factura", back_populates="produse", viewonly=True
+    )
+
+    def __repr__(self):
+        return (
+            f"Produs(id={self.id}, denumire_produs={self.denumire_produs}, "
+            f"cantitate={self.cantitate}, pret_unitar={self.pret_unitar})"
+        )
+
+
+class Factura(Base):
+    __tablename__ = "facturi"
+    # AUTOINCREMENT: id-urile facturilor mutate in arhiva nu se mai refolosesc
+    __table_args__ = {"sqlite_autoincrement": True}
+    id = Column(Integer, primary_key=True)
+    numar_factura = Column(String(20), unique=True, nullable=False)
+    data_emitere = Column(DateTime, default=func.now(), nullable=False, index=True)
+    furnizor_id = Column(Integer, ForeignKey("clienti.id"), nullable=False, index=True)
+    client_id = Column(Integer, ForeignKey("clienti.id"), nullable=False, index=True)
+    # totaluri calculate la emitere, citirea lor nu mai atinge produsele
+    subtotal = Column(Bani, nullable=False, default=0)
+    tva = Column(Bani, nullable=False, default=0)
+    total = Column(Bani, nullable=False, default=0)
+    # stergerea este logica: factura ramane, cu numarul ei, dar nu mai apare in
+    # interogari (filtrul din baza_date.py)
+    sters_la = Column(DateTime)
+    furnizor = relationship(
+        "Client", back_populates="facturi_emise", foreign_keys=[furnizor_id]
+    )
+    client = relationship(
+        "Client", back_populates="facturi_emise", foreign_keys=[client_id]
+    )
+    linii = relationship(
+        "LinieFactura",
+        back_populates="factura",
+        cascade="all, delete-orphan",
+        order_by="LinieFactura.id",
+    )
+    produse = relationship(
+        "Produs", secondary="linii_factura", back_populates="facturi", viewonly=True
+    )
+
+    def __repr__(self):
+        return (
+            f"Factura(id={self.id}, numar_factura={self.numar_factura}, "
+            f"data_emitere={self.data_emitere.strftime('%Y-%m-%d')}, "
+            f"subtotal={self.subtotal} RON, total={self.total} RON)"
+        )
+
+
+class LinieFactura(Base):
+    __tablename__ = "linii_factura"
+    __table_args__ = {"sqlite_autoincrement": True}
+    id = Column(Integer, primary_key=True)
+    factura_id = Column(Integer, ForeignKey("facturi.id"), nullable=False, index=True)
+    produs_id = Column(Integer, ForeignKey("produse.id"), nullable=False, index=True)
+    # datele produsului sunt copiate la emitere, ca facturile emise sa nu se
+    # schimbe cand se modifica produsul
+    denumire_produs = Column(String(30), nullable=False)
+    cantitate = Column(Integer, nullable=False)
+    pret_unitar = Column(Bani, nullable=False)
+    cota_tva = Column(CotaTva, nullable=False)
+    total_linie = Column(Bani, nullable=False)
+    tva_linie = Column(Bani, nullable=False)
+    factura = relationship("Factura", back_populates="linii")
+
+    def __repr__(self):
+        return (
+            f"LinieFactura(id={self.id}, factura_id={self.factura_id}, "
+            f"produs_id={self.produs_id}, denumire_produs={self.denumire_produs}, "
+            f"cantitate={self.cantitate}, pret_unitar={self.pret_unitar}, "
+            f"total_linie={self.total_linie})"
+        )
+
+
+class MiscareStoc(Base):
+    __tablename__ = "miscari_stoc"
+    # fiecare modificare a stocului dupa crearea produsului; cantitatea este
+    # negativa la iesiri. factura_id nu este cheie straina, ca facturile sa
+    # poata fi mutate in arhiva fara istoricul stocului
+    id = Column(Integer, primary_key=True)
+    produs_id = Column(Integer, ForeignKey("produse.id"), nullable=False, index=True)
+    cantitate = Column(Integer, nullable=False)
+    # intrare, factura, anulare sau inventar
+    tip = Column(String(20), nullable=False)
+    factura_id = Column(Integer, index=True)
+    data = Column(DateTime, default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return (
+            f"MiscareStoc(produs_id={self.produs_id}, cantitate={self.cantitate}, "
+            f"tip={self.tip}, factura_id={self.factura_id})"
+        )
+
+
+class SerieFactura(Base):
+    __tablename__ = "serii_facturi"
+    serie = Column(String(10), primary_key=True)
+    # an = 0 pentru seriile fara resetare anuala
+    an = Column(Integer, primary_key=True)
+    ultimul_numar = Column(Integer, nullable=False)
+
+    def __repr__(self):
+        return (
+            f"SerieFactura(serie={self.serie}, an={self.an}, "
+            f"ultimul_numar={self.ultimul_numar})"
+        )
+
+
+class TotalZilnicClient(Base):
+    __tablename__ = "totaluri_zilnice_clienti"
+    # vanzarile fiecarei zile pe client, actualizate la emiterea si stergerea
+    # facturilor, ca rapoartele sa nu mai parcurga toate facturile
+    zi = Column(Date, primary_key=True)
+    client_id = Column(Integer, primary_key=True, index=True)
+    numar_facturi = Column(Integer, nullable=False, default=0)
+    subtotal = Column(Bani, nullable=False, default=0)
+    tva = Column(Bani, nullable=False, default=0)
+    total = Column(Bani, nullable=False, default=0)
+
+    def __repr__(self):
+        return (
+            f"TotalZilnicClient(zi={self.zi}, client_id={self.client_id}, "
+            f"numar_facturi={self.numar_facturi}, total={self.total})"
+        )
+
+
+class TotalZilnicProdus(Base):
+    __tablename__ = "totaluri_zilnice_produse"
+    zi = Column(Date, primary_key=True)
+    produs_id = Column(Integer, primary_key=True, index=True)
+    cota_tva = Column(CotaTva, primary_key=True)
+    numar_linii = Column(Integer, nullable=False, default=0)
+    cantitate = Column(Integer, nullable=False, default=0)
+    total = Column(Bani, nullable=False, default=0)
+    tva = Column(Bani, nullable=False, default=0)
+
+    def __repr__(self):
+        return (
+            f"TotalZilnicProdus(zi={self.zi}, produs_id={self.produs_id}, "
+            f"cota_tva={self.cota_tva}, cantitate={self.cantitate}, total={self.total})"
+        )
+
+
+class MarcajExport(Base):
+    __tablename__ = "marcaje_export"
+    # fiecare export incremental are marcajul lui: ultima factura livrata
+    nume = Column(String(50), primary_key=True)
+    ultimul_id = Column(Integer, nullable=False, default=0)
+    ultima_data_emitere = Column(DateTime)
+    actualizat_la = Column(DateTime, default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return (
+            f"MarcajExport(nume={self.nume}, ultimul_id={self.ultimul_id}, "
+            f"ultima_data_emitere={self.ultima_data_emitere})"
+        )
+
+
+class VersiuneCache(Base):
+    __tablename__ = "versiuni_cache"
+    # creste la fiecare modificare, ca procesele sa-si goleasca cache-ul local
+    nume = Column(String(20), primary_key=True)
+    versiune = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"VersiuneCache(nume={self.nume}, versiune={self.versiune})"
+
+
+class Arhivare(Base):
+    __tablename__ = "arhivari"
+    # facturile emise inainte de pana_la au fost mutate in fisierul arhivei
+    id = Column(Integer, primary_key=True)
+    pana_la = Column(Date, nullable=False)
+    cale = Column(String(255), nullable=False)
+    numar_facturi = Column(Integer, nullable=False, default=0)
+    arhivat_la = Column(DateTime, default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return (
+            f"Arhivare(pana_la={self.pana_la}, cale={self.cale}, "
+            f"numar_facturi={self.numar_facturi})"
+        )
+
+
+class Job(Base):
+    __tablename__ = "joburi"
+    # lucrarile facute dupa commit (randare, export), adaugate in tranzactia
+    # care le cere; lucratorii le preiau dupa (stare, id)
+    __table_args__ = (Index("ix_joburi_stare_id", "stare", "id"),)
+    id = Column(Integer, primary_key=True)
+    tip = Column(String(30), nullable=False)
+    # cheia de idempotenta: un job adaugat de doua ori ramane unul singur
+    cheie = Column(String(150), nullable=False, unique=True)
+    parametri = Column(Text, nullable=False)
+    # in_asteptare, in_lucru, finalizat sau esuat
+    stare = Column(String(20), nullable=False, default="in_asteptare")
+    incercari = Column(Integer, nullable=False, default=0)
+    max_incercari = Column(Integer, nullable=False, default=5)
+    disponibil_la = Column(DateTime, nullable=False)
+    # lucratorul care a preluat jobul si pana cand il pastreaza
+    lucrator = Column(String(100))
+    blocat_pana_la = Column(DateTime)
+    eroare = Column(Text)
+    creat_la = Column(DateTime, default=func.now(), nullable=False)
+    finalizat_la = Column(DateTime)
+
+    def __repr__(self):
+        return (
+            f"Job(id={self.id}, tip={self.tip}, cheie={self.cheie}, "
+            f"stare={self.stare}, incercari={self.incercari})"
+        )
+
+
+class VersiuneSchema(Base):
+    __tablename__ = "versiune_schema"
+    versiune = Column(Integer, primary_key=True)
+    aplicata_la = Column(DateTime, default=func.now(), nullable=False)
+
@@ -0,0 +1,248 @@
+import os
+import stat
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
+
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from .baza_date import unit_of_work
+from .instrumentare import cronometru
+from .modele import Factura
+from .sabloane import formate_document, randare_document
+
+
+def _date_factura(factura):
+    # copie simpla a facturii, care poate fi trimisa unui proces separat
+    return {
+        "numar_factura": factura.numar_factura,
+        "data_emitere": factura.data_emitere,
+        "client": {
+            "nume_client": factura.client.nume_client,
+            "cui": factura.client.cui,
+            "adresa_client": factura.client.adresa_client,
+        },
+        "furnizor": {
+            "nume_client": factura.furnizor.nume_client,
+            "cui": factura.furnizor.cui,
+            "adresa_client": factura.furnizor.adresa_client,
+        },
+        "produse": [
+            (
+                linie.denumire_produs,
+                linie.cantitate,
+                linie.pret_unitar,
+                linie.total_linie,
+                linie.tva_linie,
+            )
+            for linie in factura.linii
+        ],
+        "subtotal": factura.subtotal,
+        "tva": factura.tva,
+        "total": factura.total,
+    }
+
+
+def continut_factura_txt(date):
+    return randare_document(date, "txt")
+
+
+# drepturile fisierelor noi; se citesc o singura data, pentru ca os.umask nu
+# poate fi citit fara a fi schimbat
+_umask = os.umask(0o022)
+os.umask(_umask)
+
+
+def fisier_temporar(cale, prefix):
+    # fisier temporar in directorul lui cale, cu drepturile pe care le-ar avea
+    # fisierul final: ale celui inlocuit sau cele implicite dupa umask, nu 0600
+    # cum il creeaza mkstemp (os.replace pastreaza drepturile temporarului)
+    fd, cale_temporara = tempfile.mkstemp(
+        dir=os.path.dirname(cale) or ".", prefix=prefix, suffix=".tmp"
+    )
+    try:
+        drepturi = stat.S_IMODE(os.stat(cale).st_mode)
+    except FileNotFoundError:
+        drepturi = 0o666 & ~_umask
+    try:
+        os.chmod(cale_temporara, drepturi)
+    except BaseException:
+        os.close(fd)
+        os.remove(cale_temporara)
+        raise
+    return fd, cale_temporara
+
+
+def scriere_atomica(cale, continut):
+    # fisierele deja la zi nu se rescriu; altfel se scrie intr-un fisier
+    # temporar din acelasi director si se redenumeste peste cel final
+    binar = isinstance(continut, bytes)
+    codare = None if binar else "utf-8"
+    if os.path.exists(cale):
+        with open(cale, "rb" if binar else "r", encoding=codare) as f:
+            if f.read() == continut:
+                return False
+    fd, cale_temporara = fisier_temporar(cale, ".factura_")
+    try:
+        with os.fdopen(fd, "wb" if binar else "w", encoding=codare) as f:
+            f.write(continut)
+        os.replace(cale_temporara, cale)
+    except BaseException:
+        os.remove(cale_temporara)
+        raise
+    return True
+
+
+def _randare_si_scriere(cale, date, format_document="txt"):
+    return scriere_atomica(cale, randare_document(date, format_document))
+
+
+@cronometru
+def incarcare_date_factura(factura_id):
+    with unit_of_work() as session:
+        factura = session.execute(
+            select(Factura)
+            .where(Factura.id == factura_id)
+            .options(
+                selectinload(Factura.linii),
+                selectinload(Factura.client),
+                selectinload(Factura.furnizor),
+            )
+        ).scalar()
+        return _date_factura(factura) if factura else None
+
+
+def _nume_fisier(date, format_document, director="."):
+    return os.path.join(
+        director, f"Factura_{date['numar_factura']}{formate_document[format_document]}"
+    )
+
+
+@cronometru
+def genereaza_factura(factura_id, format_document="txt", director="."):
+    if format_document not in formate_document:
+        print(
+            f"Formatul {format_document} nu este suportat "
+            f"({', '.join(formate_document)})!"
+        )
+        return
+    date = incarcare_date_factura(factura_id)
+    if not date:
+        print(f"Factura cu ID-ul {factura_id} nu a fost gasita!")
+        return
+
+    filename = _nume_fisier(date, format_document, director)
+    _randare_si_scriere(filename, date, format_document)
+    print(f"\nFactura generata si salvata în fisierul: {filename}")
+    return filename
+
+
+@cronometru
+def genereaza_factura_txt(factura_id):
+    date = incarcare_date_factura(factura_id)
+    if not date:
+        print(f"Factura cu ID-ul {factura_id} nu a fost gasita!")
+        return
+
+    filename = _nume_fisier(date, "txt")
+    continut_factura_str = continut_factura_txt(date)
+    scriere_atomica(filename, continut_factura_str)
+
+    print(f"\nFactura generata si salvata în fisierul: {filename}")
+    print(continut_factura_str)
+    return filename
+
+
+@cronometru
+def _loturi_facturi(interogare, facturi_ids, dimensiune_lot):
+    # facturile se incarca pe loturi, cu toate relatiile dintr-o data. Cu o
+    # lista de id-uri, fiecare lot cere doar bucata lui din lista sortata (cel
+    # mult 900 de parametri); altfel loturile continua dupa ultimul id
+    if facturi_ids is not None:
+        ids = sorted(set(facturi_ids))
+        pas = min(dimensiune_lot, 900)
+        bucati = (Factura.id.in_(ids[i : i + pas]) for i in range(0, len(ids), pas))
+    dupa_id = 0
+    while True:
+        if facturi_ids is None:
+            conditie = Factura.id > dupa_id
+        else:
+            conditie = next(bucati, None)
+            if conditie is None:
+                return
+        with unit_of_work() as session:
+            facturi = (
+                session.execute(
+                    interogare.where(conditie)
+                    .order_by(Factura.id)
+                    .limit(dimensiune_lot)
+                )
+                .scalars()
+                .all()
+            )
+            date = [_date_factura(factura) for factura in facturi]
+        if facturi_ids is None:
+            if not facturi:
+                return
+            dupa_id = facturi[-1].id
+        if date:
+            yield date
+
+
+def genereaza_facturi_txt_batch(
+    facturi_ids=None,
+    data_start=None,
+    data_sfarsit=None,
+    lucratori=4,
+    procese=False,
+    director=".",
+    dimensiune_lot=500,
+    format_document="txt",
+):
+    if format_document not in formate_document:
+        print(
+            f"Formatul {format_document} nu este suportat "
+            f"({', '.join(formate_document)})!"
+        )
+        return None
+    interogare = select(Factura).options(
+        selectinload(Factura.linii),
+        selectinload(Factura.client),
+        selectinload(Factura.furnizor),
+    )
+    if data_start is not None:
+        interogare = interogare.where(Factura.data_emitere >= data_start)
+    if data_sfarsit is not None:
+        interogare = interogare.where(Factura.data_emitere < data_sfarsit)
+
+    os.makedirs(director, exist_ok=True)
+    executor_clasa = ProcessPoolExecutor if procese else ThreadPoolExecutor
+    scrise = sarite = 0
+    inceput = time.perf_counter()
+    with executor_clasa(max_workers=lucratori) as executor:
+        for date in _loturi_facturi(interogare, facturi_ids, dimensiune_lot):
+            cai = [_nume_fisier(factura, format_document, director) for factura in date]
+            for scrisa in executor.map(
+                _randare_si_scriere, cai, date, repeat(format_document)
+            ):
+                if scrisa:
+                    scrise += 1
+                else:
+                    sarite += 1
+    durata = time.perf_counter() - inceput
+
+    raport = {
+        "scrise": scrise,
+        "sarite": sarite,
+        "lucratori": lucratori,
+        "durata": round(durata, 3),
+        "facturi_pe_secunda": round((scrise + sarite) / durata, 1) if durata else 0,
+    }
+    print(
+        f"Facturi generate: {scrise}, deja la zi: {sarite}, "
+        f"{raport['facturi_pe_secunda']} facturi/s cu {lucratori} lucratori"
+    )
+    return raport
+
@@ -0,0 +1,207 @@
+from datetime import datetime, time
+
+from sqlalchemy import extract, func, select
+
+from .baza_date import unit_of_work
+from .modele import (
+    Client,
+    Factura,
+    LinieFactura,
+    Produs,
+    TotalZilnicClient,
+    TotalZilnicProdus,
+)
+
+# rapoartele citesc implicit totalurile zilnice; cu din_totaluri=False aceleasi
+# agregari se calculeaza direct din facturi si linii
+
+
+def _limita_perioada(valoare, zilnic):
+    # totalurile zilnice se filtreaza pe zi, facturile pe data si ora emiterii
+    if zilnic and isinstance(valoare, datetime):
+        return valoare.date()
+    if not zilnic and not isinstance(valoare, datetime):
+        return datetime.combine(valoare, time())
+    return valoare
+
+
+def _filtru_perioada(interogare, coloana, data_start, data_sfarsit, zilnic):
+    # data_start inclusiv, data_sfarsit exclusiv
+    if data_start is not None:
+        interogare = interogare.where(coloana >= _limita_perioada(data_start, zilnic))
+    if data_sfarsit is not None:
+        interogare = interogare.where(coloana < _limita_perioada(data_sfarsit, zilnic))
+    return interogare
+
+
+def _executare(interogare):
+    with unit_of_work() as session:
+        return session.execute(interogare).all()
+
+
+def venituri_pe_client(
+    data_start=None, data_sfarsit=None, limita=None, din_totaluri=True
+):
+    if din_totaluri:
+        sursa = TotalZilnicClient
+        numar_facturi = func.sum(sursa.numar_facturi)
+        coloana_data = sursa.zi
+    else:
+        sursa = Factura
+        numar_facturi = func.count(sursa.id)
+        coloana_data = sursa.data_emitere
+    total = func.sum(sursa.total).label("total")
+    interogare = (
+        select(
+            sursa.client_id,
+            Client.nume_client,
+            Client.cui,
+            numar_facturi.label("numar_facturi"),
+            func.sum(sursa.subtotal).label("subtotal"),
+            func.sum(sursa.tva).label("tva"),
+            total,
+        )
+        .join(Client, Client.id == sursa.client_id)
+        .group_by(sursa.client_id, Client.nume_client, Client.cui)
+        .order_by(total.desc(), sursa.client_id)
+    )
+    interogare = _filtru_perioada(
+        interogare, coloana_data, data_start, data_sfarsit, din_totaluri
+    )
+    if limita is not None:
+        interogare = interogare.limit(limita)
+    return _executare(interogare)
+
+
+def venituri_pe_produs(
+    data_start=None, data_sfarsit=None, limita=None, din_totaluri=True
+):
+    if din_totaluri:
+        sursa = TotalZilnicProdus
+        numar_linii = func.sum(sursa.numar_linii)
+        cantitate = func.sum(sursa.cantitate)
+        total = func.sum(sursa.total).label("total")
+        tva = func.sum(sursa.tva)
+        interogare = select(sursa.produs_id)
+        coloana_data = sursa.zi
+    else:
+        sursa = LinieFactura
+        numar_linii = func.count(sursa.id)
+        cantitate = func.sum(sursa.cantitate)
+        total = func.sum(sursa.total_linie).label("total")
+        tva = func.sum(sursa.tva_linie)
+        interogare = select(sursa.produs_id).join(
+            Factura, Factura.id == sursa.factura_id
+        )
+        coloana_data = Factura.data_emitere
+    interogare = (
+        interogare.add_columns(
+            Produs.denumire_produs,
+            numar_linii.label("numar_linii"),
+            cantitate.label("cantitate"),
+            total,
+            tva.label("tva"),
+        )
+        .outerjoin(Produs, Produs.id == sursa.produs_id)
+        .group_by(sursa.produs_id, Produs.denumire_produs)
+        .order_by(total.desc(), sursa.produs_id)
+    )
+    interogare = _filtru_perioada(
+        interogare, coloana_data, data_start, data_sfarsit, din_totaluri
+    )
+    if limita is not None:
+        interogare = interogare.limit(limita)
+    return _executare(interogare)
+
+
+def venituri_pe_luna(data_start=None, data_sfarsit=None, din_totaluri=True):
+    if din_totaluri:
+        sursa = TotalZilnicClient
+        numar_facturi = func.sum(sursa.numar_facturi)
+        coloana_data = sursa.zi
+    else:
+        sursa = Factura
+        numar_facturi = func.count(sursa.id)
+        coloana_data = sursa.data_emitere
+    an = extract("year", coloana_data).label("an")
+    luna = extract("month", coloana_data).label("luna")
+    interogare = (
+        select(
+            an,
+            luna,
+            numar_facturi.label("numar_facturi"),
+            func.sum(sursa.subtotal).label("subtotal"),
+            func.sum(sursa.tva).label("tva"),
+            func.sum(sursa.total).label("total"),
+        )
+        .group_by(an, luna)
+        .order_by(an, luna)
+    )
+    interogare = _filtru_perioada(
+        interogare, coloana_data, data_start, data_sfarsit, din_totaluri
+    )
+    return _executare(interogare)
+
+
+def venituri_pe_cota_tva(data_start=None, data_sfarsit=None, din_totaluri=True):
+    if din_totaluri:
+        sursa = TotalZilnicProdus
+        baza = func.sum(sursa.total)
+        tva = func.sum(sursa.tva)
+        interogare = select()
+        coloana_data = sursa.zi
+    else:
+        sursa = LinieFactura
+        baza = func.sum(sursa.total_linie)
+        tva = func.sum(sursa.tva_linie)
+        interogare = select().select_from(sursa)
+        coloana_data = Factura.data_emitere
+    an = extract("year", coloana_data).label("an")
+    luna = extract("month", coloana_data).label("luna")
+    interogare = (
+        interogare.add_columns(
+            an, luna, sursa.cota_tva, baza.label("baza"), tva.label("tva")
+        )
+        .group_by(an, luna, sursa.cota_tva)
+        .order_by(an, luna, sursa.cota_tva)
+    )
+    if not din_totaluri:
+        interogare = interogare.join(Factura, Factura.id == sursa.factura_id)
+    interogare = _filtru_perioada(
+        interogare, coloana_data, data_start, data_sfarsit, din_totaluri
+    )
+    return _executare(interogare)
+
+
+def afisare_rapoarte(data_start=None, data_sfarsit=None, limita=10):
+    print("Vanzari pe luni:")
+    print(f"{'LUNA':<10} {'FACTURI':>8} {'SUBTOTAL':>14} {'TVA':>12} {'TOTAL':>14}")
+    for rand in venituri_pe_luna(data_start, data_sfarsit):
+        print(
+            f"{rand.an:04d}-{rand.luna:02d}{'':<3} {rand.numar_facturi:>8} "
+            f"{rand.subtotal:>14} {rand.tva:>12} {rand.total:>14}"
+        )
+
+    print("\nTVA pe cote:")
+    print(f"{'LUNA':<10} {'COTA':>6} {'BAZA':>14} {'TVA':>12}")
+    for rand in venituri_pe_cota_tva(data_start, data_sfarsit):
+        print(
+            f"{rand.an:04d}-{rand.luna:02d}{'':<3} {rand.cota_tva:>6} "
+            f"{rand.baza:>14} {rand.tva:>12}"
+        )
+
+    print(f"\nPrimii {limita} clienti dupa total:")
+    print(f"{'CLIENT':<30} {'CUI':<20} {'FACTURI':>8} {'TOTAL':>14}")
+    for rand in venituri_pe_client(data_start, data_sfarsit, limita):
+        print(
+            f"{rand.nume_client:<30} {rand.cui:<20} "
+            f"{rand.numar_facturi:>8} {rand.total:>14}"
+        )
+
+    print(f"\nPrimele {limita} produse dupa total:")
+    print(f"{'PRODUS':<30} {'CANT.':>8} {'TOTAL':>14} {'TVA':>12}")
+    for rand in venituri_pe_produs(data_start, data_sfarsit, limita):
+        print(
+            f"{rand.denumire_produs or rand.produs_id!s:<30} {rand.cantitate:>8} "
+            f"{rand.total:>14} {rand.tva:>12}"
+        )
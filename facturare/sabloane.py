@@ -0,0 +1,265 @@
+# sabloanele documentelor se compileaza o singura data: latimile coloanelor si
+# sirurile de formatare se pregatesc la creare, iar fiecare factura doar umple
+# valorile. Rezultatul se produce pe bucati, ca sa poata fi scris direct intr-un
+# fisier sau intr-un buffer din memorie.
+import html
+import textwrap
+import unicodedata
+from itertools import zip_longest
+
+from .instrumentare import cronometru
+
+formate_document = {"txt": ".txt", "html": ".html", "pdf": ".pdf"}
+
+
+def _format_coloane(latimi):
+    # ultima coloana fara latime (None) nu se completeaza cu spatii; valorile
+    # trec prin str inainte de aliniere, mai repede decat formatarea Decimal
+    return " ".join("{!s:<%d}" % latime if latime else "{!s}" for latime in latimi)
+
+
+class _RandTabel:
+    def __init__(self, latimi, coloane_text):
+        self.latimi = latimi
+        self.format = _format_coloane(latimi).format
+        # doar coloanele de text se impart pe mai multe randuri; numerele nu
+        self.coloane_text = [(i, latimi[i]) for i in coloane_text if latimi[i]]
+
+    def linii(self, celule):
+        for i, latime in self.coloane_text:
+            if len(celule[i]) > latime:
+                break
+        else:
+            return [self.format(*celule)]
+        bucati = [[celula] for celula in celule]
+        for i, latime in self.coloane_text:
+            bucati[i] = textwrap.wrap(celule[i], latime) or [""]
+        return [
+            self.format(*linie)
+            for linie in zip_longest(*bucati, fillvalue="")
+        ]
+
+
+class SablonText:
+    extensie = ".txt"
+
+    def __init__(self, latime_parte=30):
+        self.antet = _RandTabel((latime_parte, latime_parte, None), (0, 1))
+        self.produse = _RandTabel((latime_parte, 5, 12, 10, 10), (0,))
+        self.titlu = " " * latime_parte + "Factura #{}\nData facturii: {}\n"
+        self.cap_tabel = (
+            "\n"
+            + "\n".join(
+                self.produse.linii(("DENUMIRE", "CANT.", "PRET UNITAR", "TOTAL", "TVA"))
+            )
+            + "\n"
+            + "-" * 80
+        )
+        self.sfarsit_tabel = "-" * 80
+
+    def bucati(self, date):
+        client = date["client"]
+        furnizor = date["furnizor"]
+        linii = [
+            self.titlu.format(
+                date["numar_factura"], date["data_emitere"].strftime("%d.%m.%Y")
+            )
+        ]
+        for celule in (
+            ("CUMPARATOR", "", "FURNIZOR"),
+            (client["nume_client"], "", furnizor["nume_client"]),
+            (client["adresa_client"], "", furnizor["adresa_client"]),
+            ("Reg. com.: [Nr.Reg.Comertului]", "", "Reg. com.: [Nr.Reg.Comertului]"),
+            (f"CIF: {client['cui']}", "", f"CIF: {furnizor['cui']}"),
+        ):
+            linii += self.antet.linii(celule)
+        linii.append(self.cap_tabel)
+        yield "\n".join(linii) + "\n"
+
+        # totalurile coloanelor se aduna in aceeasi trecere cu liniile
+        cantitate_totala = 0
+        pret_total = 0
+        linii = []
+        linii_produs = self.produse.linii
+        format_produs = self.produse.format
+        latime_denumire = self.produse.latimi[0]
+        for produs in date["produse"]:
+            cantitate_totala += produs[1]
+            pret_total += produs[2]
+            if len(produs[0]) <= latime_denumire:
+                linii.append(format_produs(*produs))
+            else:
+                linii += linii_produs(produs)
+        linii.append(self.sfarsit_tabel)
+        linii += linii_produs(
+            ("TOTAL", cantitate_totala, pret_total, date["subtotal"], date["tva"])
+        )
+        linii.append(f"\nTotal de plata: {date['total']:>10} RON\n")
+        yield "\n".join(linii)
+
+
+class SablonHtml:
+    extensie = ".html"
+
+    def __init__(self):
+        self.inceput = (
+            "<!DOCTYPE html>\n<html lang=\"ro\">\n<head>\n<meta charset=\"utf-8\">\n"
+            "<title>Factura {numar_factura}</title>\n<style>\n"
+            "body {{ font-family: sans-serif; margin: 2em; }}\n"
+            "table {{ border-collapse: collapse; width: 100%; }}\n"
+            "th, td {{ border: 1px solid #999; padding: 4px 8px; }}\n"
+            "td.numar {{ text-align: right; }}\n"
+            ".parti td {{ border: none; vertical-align: top; width: 50%; }}\n"
+            "</style>\n</head>\n<body>\n"
+            "<h1>Factura #{numar_factura}</h1>\n"
+            "<p>Data facturii: {data_emitere}</p>\n"
+            "<table class=\"parti\"><tr>\n"
+            "<td><strong>CUMPARATOR</strong><br>{client_nume}<br>{client_adresa}<br>"
+            "Reg. com.: [Nr.Reg.Comertului]<br>CIF: {client_cui}</td>\n"
+            "<td><strong>FURNIZOR</strong><br>{furnizor_nume}<br>{furnizor_adresa}<br>"
+            "Reg. com.: [Nr.Reg.Comertului]<br>CIF: {furnizor_cui}</td>\n"
+            "</tr></table>\n<br>\n<table>\n"
+            "<tr><th>DENUMIRE</th><th>CANT.</th><th>PRET UNITAR</th>"
+            "<th>TOTAL</th><th>TVA</th></tr>\n"
+        )
+        self.linie = (
+            "<tr><td>{}</td><td class=\"numar\">{}</td><td class=\"numar\">{}</td>"
+            "<td class=\"numar\">{}</td><td class=\"numar\">{}</td></tr>\n"
+        )
+        self.sfarsit = (
+            "<tr><th>TOTAL</th><th></th><th></th>"
+            "<th class=\"numar\">{subtotal}</th><th class=\"numar\">{tva}</th></tr>\n"
+            "</table>\n<p><strong>Total de plata: {total} RON</strong></p>\n"
+            "</body>\n</html>\n"
+        )
+
+    def bucati(self, date):
+        client = date["client"]
+        furnizor = date["furnizor"]
+        yield self.inceput.format(
+            numar_factura=html.escape(date["numar_factura"]),
+            data_emitere=date["data_emitere"].strftime("%d.%m.%Y"),
+            client_nume=html.escape(client["nume_client"]),
+            client_adresa=html.escape(client["adresa_client"]),
+            client_cui=html.escape(client["cui"]),
+            furnizor_nume=html.escape(furnizor["nume_client"]),
+            furnizor_adresa=html.escape(furnizor["adresa_client"]),
+            furnizor_cui=html.escape(furnizor["cui"]),
+        )
+        for denumire_produs, cantitate, pret_unitar, total, tva in date["produse"]:
+            yield self.linie.format(
+                html.escape(denumire_produs), cantitate, pret_unitar, total, tva
+            )
+        yield self.sfarsit.format(
+            subtotal=date["subtotal"], tva=date["tva"], total=date["total"]
+        )
+
+
+class SablonPdf:
+    # PDF scris direct, fara biblioteci: textul facturii, cu fontul Courier
+    # inclus in orice cititor PDF, pe pagini A4
+    extensie = ".pdf"
+
+    def __init__(self, sablon_text=None, marime_font=9, interlinie=11, margine=40):
+        self.sablon_text = sablon_text or SablonText()
+        self.latime, self.inaltime = 595, 842
+        self.linii_pe_pagina = int((self.inaltime - 2 * margine) / interlinie)
+        self.inceput_text = (
+            f"BT /F1 {marime_font} Tf {interlinie} TL "
+            f"{margine} {self.inaltime - margine - marime_font} Td\n"
+        ).encode("ascii")
+        self.obiecte_fixe = [
+            b"<< /Type /Catalog /Pages 2 0 R >>",
+            None,
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier "
+            b"/Encoding /WinAnsiEncoding >>",
+        ]
+
+    @staticmethod
+    def _text_pdf(text):
+        if not text.isascii():
+            # diacriticele fara echivalent in WinAnsi se scriu fara semn
+            text = "".join(
+                c
+                for c in unicodedata.normalize("NFKD", text)
+                if not unicodedata.combining(c)
+            )
+        text = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+        return text.encode("cp1252", "replace")
+
+    def bucati(self, date):
+        linii = "".join(self.sablon_text.bucati(date)).rstrip("\n").split("\n")
+        pagini = [
+            linii[i : i + self.linii_pe_pagina]
+            for i in range(0, len(linii), self.linii_pe_pagina)
+        ] or [[]]
+        numar_obiecte = 3 + 2 * len(pagini)
+        pagini_ids = [4 + 2 * i for i in range(len(pagini))]
+        obiecte = list(self.obiecte_fixe)
+        obiecte[1] = (
+            b"<< /Type /Pages /Kids ["
+            + b" ".join(b"%d 0 R" % pagina_id for pagina_id in pagini_ids)
+            + b"] /Count %d >>" % len(pagini)
+        )
+        for pagina_id, pagina in zip(pagini_ids, pagini):
+            continut = (
+                self.inceput_text
+                + b"".join(
+                    b"(" + self._text_pdf(linie) + b") Tj T*\n" for linie in pagina
+                )
+                + b"ET\n"
+            )
+            obiecte.append(
+                b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+                b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+                % (self.latime, self.inaltime, pagina_id + 1)
+            )
+            obiecte.append(
+                b"<< /Length %d >>\nstream\n" % len(continut) + continut + b"endstream"
+            )
+
+        pozitie = 0
+        pozitii = []
+        bucata = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+        for numar, obiect in enumerate(obiecte, 1):
+            pozitie += len(bucata)
+            yield bucata
+            pozitii.append(pozitie)
+            bucata = b"%d 0 obj\n" % numar + obiect + b"\nendobj\n"
+        pozitie += len(bucata)
+        yield bucata
+        yield (
+            b"xref\n0 %d\n0000000000 65535 f \n" % (numar_obiecte + 1)
+            + b"".join(b"%010d 00000 n \n" % p for p in pozitii)
+            + b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+            % (numar_obiecte + 1, pozitie)
+        )
+
+
+_clase_sabloane = {"txt": SablonText, "html": SablonHtml, "pdf": SablonPdf}
+_sabloane = {}
+
+
+def sablon(format_document="txt"):
+    # fiecare sablon se compileaza la prima utilizare si apoi se refoloseste
+    if format_document not in _sabloane:
+        if format_document not in _clase_sabloane:
+            raise ValueError(
+                f"Formatul {format_document} nu este suportat "
+                f"({', '.join(_clase_sabloane)})"
+            )
+        _sabloane[format_document] = _clase_sabloane[format_document]()
+    return _sabloane[format_document]
+
+
+def randare_in(date, iesire, format_document="txt"):
+    # scrie documentul pe bucati intr-un fisier deschis sau intr-un buffer
+    # (io.StringIO pentru txt/html, io.BytesIO pentru pdf)
+    for bucata in sablon(format_document).bucati(date):
+        iesire.write(bucata)
+
+
+@cronometru
+def randare_document(date, format_document="txt"):
+    bucati = sablon(format_document).bucati(date)
+    return b"".join(bucati) if format_document == "pdf" else "".join(bucati)
@@ -0,0 +1,242 @@
+import argparse
+import asyncio
+import json
+import os
+from contextlib import nullcontext
+from datetime import datetime
+from decimal import Decimal
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from .asincron import (
+    adaugare_client_async,
+    adaugare_factura_async,
+    adaugare_facturi_bulk_async,
+    adaugare_produs_async,
+    genereaza_factura_txt_async,
+    listare_facturi_async,
+    randare_in_fundal_async,
+)
+from .baza_date import init_db
+from .instrumentare import metrici_text, profilare
+
+# cate cereri lucreaza simultan cu baza de date; restul asteapta la semafor
+concurenta_maxima = int(os.getenv("HTTP_CONCURENTA", "64"))
+director_export = os.getenv("DIRECTOR_EXPORT", ".")
+
+
+class EroareCerere(Exception):
+    def __init__(self, stare, mesaj):
+        super().__init__(mesaj)
+        self.stare = stare
+        self.mesaj = mesaj
+
+
+def _json_implicit(valoare):
+    if isinstance(valoare, Decimal):
+        return str(valoare)
+    if isinstance(valoare, datetime):
+        return valoare.isoformat()
+    raise TypeError(f"Valoarea {valoare!r} nu poate fi convertita in JSON")
+
+
+def _factura_json(factura):
+    return {
+        "id": factura.id,
+        "numar_factura": factura.numar_factura,
+        "data_emitere": factura.data_emitere,
+        "subtotal": factura.subtotal,
+        "tva": factura.tva,
+        "total": factura.total,
+    }
+
+
+async def _tratare_cerere(metoda, cale, parametri, date):
+    if metoda == "POST" and cale == "/clienti":
+        client = await adaugare_client_async(
+            date["nume_client"], date["cui"], date["adresa_client"]
+        )
+        if client is None:
+            raise EroareCerere(409, f"Clientul cu CUI-ul {date['cui']} exista deja")
+        return 201, {
+            "id": client.id,
+            "nume_client": client.nume_client,
+            "cui": client.cui,
+            "adresa_client": client.adresa_client,
+        }
+
+    if metoda == "POST" and cale == "/produse":
+        produs = await adaugare_produs_async(
+            date["denumire_produs"], int(date["cantitate"]), Decimal(date["pret_unitar"])
+        )
+        return 201, {
+            "id": produs.id,
+            "denumire_produs": produs.denumire_produs,
+            "cantitate": produs.cantitate,
+            "pret_unitar": produs.pret_unitar,
+        }
+
+    if metoda == "POST" and cale == "/facturi":
+        cantitati = {int(k): int(v) for k, v in (date.get("cantitati") or {}).items()}
+        factura = await adaugare_factura_async(
+            int(date["furnizor_id"]),
+            int(date["client_id"]),
+            [int(produs_id) for produs_id in date["produse_ids"]],
+            cantitati,
+        )
+        if factura is None:
+            raise EroareCerere(
+                422,
+                "Furnizorul, clientul sau produsele nu exista ori stocul nu ajunge",
+            )
+        return 201, _factura_json(factura)
+
+    if metoda == "POST" and cale == "/facturi/lot":
+        specificatii = [
+            {
+                "furnizor_id": int(spec["furnizor_id"]),
+                "client_id": int(spec["client_id"]),
+                "produse_ids": [int(produs_id) for produs_id in spec["produse_ids"]],
+                "cantitati": {
+                    int(k): int(v) for k, v in (spec.get("cantitati") or {}).items()
+                },
+            }
+            for spec in date["facturi"]
+        ]
+        raport = await adaugare_facturi_bulk_async(
+            specificatii, int(date.get("dimensiune_lot", 1000))
+        )
+        return 200, {"facturi": raport}
+
+    if metoda == "GET" and cale == "/facturi":
+        dupa_id = int(parametri.get("dupa_id", ["0"])[0])
+        limita = min(int(parametri.get("limita", ["100"])[0]), 1000)
+        facturi = await listare_facturi_async(dupa_id, limita)
+        return 200, {"facturi": [_factura_json(factura) for factura in facturi]}
+
+    if metoda == "GET" and cale == "/metrici":
+        # metricile instrumentarii, in formatul text Prometheus
+        return 200, metrici_text()
+
+    parti = cale.strip("/").split("/")
+    if metoda == "POST" and len(parti) == 3 and parti[0] == "facturi":
+        if parti[2] == "export" and parti[1].isdigit():
+            # ?asincron=1: documentul este generat de lucratorii cozii de joburi
+            if parametri.get("asincron", ["0"])[0] == "1":
+                job_id = await randare_in_fundal_async(
+                    int(parti[1]), "txt", director_export
+                )
+                if job_id is None:
+                    raise EroareCerere(404, f"Factura cu id-ul {parti[1]} nu exista")
+                return 202, {"job_id": job_id}
+            fisier = await genereaza_factura_txt_async(int(parti[1]), director_export)
+            if fisier is None:
+                raise EroareCerere(404, f"Factura cu id-ul {parti[1]} nu exista")
+            return 200, {"fisier": fisier}
+
+    raise EroareCerere(404, f"Ruta {metoda} {cale} nu exista")
+
+
+async def _citire_cerere(reader):
+    linie = await reader.readline()
+    if not linie:
+        return None
+    metoda, tinta, _ = linie.decode("latin-1").split(" ", 2)
+    antete = {}
+    while True:
+        linie = await reader.readline()
+        if linie in (b"\r\n", b"\n", b""):
+            break
+        nume, valoare = linie.decode("latin-1").split(":", 1)
+        antete[nume.strip().lower()] = valoare.strip()
+    lungime = int(antete.get("content-length", "0"))
+    corp = await reader.readexactly(lungime) if lungime else b""
+    return metoda.upper(), tinta, antete, corp
+
+
+async def _tratare_conexiune(reader, writer, semafor):
+    try:
+        while True:
+            try:
+                cerere = await _citire_cerere(reader)
+            except ValueError:
+                cerere = ("", "/", {"connection": "close"}, b"")
+                stare, raspuns = 400, {"eroare": "Cerere HTTP invalida"}
+            else:
+                if cerere is None:
+                    break
+                metoda, tinta, antete, corp = cerere
+                url = urlsplit(tinta)
+                try:
+                    date = json.loads(corp) if corp else {}
+                    if not isinstance(date, dict):
+                        raise EroareCerere(400, "Corpul cererii trebuie sa fie un obiect JSON")
+                    async with semafor:
+                        stare, raspuns = await _tratare_cerere(
+                            metoda, url.path, parse_qs(url.query), date
+                        )
+                except EroareCerere as e:
+                    stare, raspuns = e.stare, {"eroare": e.mesaj}
+                except (ValueError, KeyError, TypeError) as e:
+                    stare, raspuns = 400, {"eroare": f"Date invalide: {e}"}
+                except Exception as e:
+                    stare, raspuns = 500, {"eroare": f"Eroare: {e}"}
+
+            if isinstance(raspuns, str):
+                tip_continut = "text/plain; version=0.0.4; charset=utf-8"
+                corp_raspuns = raspuns.encode("utf-8")
+            else:
+                tip_continut = "application/json; charset=utf-8"
+                corp_raspuns = json.dumps(raspuns, default=_json_implicit).encode(
+                    "utf-8"
+                )
+            pastrare_conexiune = cerere[2].get("connection", "").lower() != "close"
+            writer.write(
+                (
+                    f"HTTP/1.1 {stare} {HTTPStatus(stare).phrase}\r\n"
+                    f"Content-Type: {tip_continut}\r\n"
+                    f"Content-Length: {len(corp_raspuns)}\r\n"
+                    f"Connection: {'keep-alive' if pastrare_conexiune else 'close'}\r\n"
+                    f"\r\n"
+                ).encode("latin-1")
+                + corp_raspuns
+            )
+            await writer.drain()
+            if not pastrare_conexiune:
+                break
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def pornire_server(host="127.0.0.1", port=8080):
+    semafor = asyncio.Semaphore(concurenta_maxima)
+    server = await asyncio.start_server(
+        lambda reader, writer: _tratare_conexiune(reader, writer, semafor), host, port
+    )
+    print(f"Serverul de facturare asculta pe http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API HTTP pentru emiterea facturilor")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="scrie profilul cProfile si metricile rularii la oprirea serverului",
+    )
+    argumente = parser.parse_args()
+    init_db()
+    with profilare("server_http") if argumente.profile else nullcontext():
+        try:
+            asyncio.run(pornire_server(argumente.host, argumente.port))
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,615 @@
+import os
+from datetime import datetime
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from .bani import (
+    calcul_facturi_lot,
+    calcul_linii_lot,
+    cota_tva,
+    din_bani,
+    din_puncte,
+    in_bani,
+    in_puncte,
+    tva_bani,
+)
+from .baza_date import pornire_scriere, randuri_dupa_id, sesiune_noua, unit_of_work
+from .cache import (
+    client_dupa_id,
+    clienti_dupa_id,
+    invalidare_clienti,
+    invalidare_produse,
+    produse_dupa_id,
+)
+from .instrumentare import cronometru
+from .joburi import asteptare_loc_in_coada, joburi_facturi
+from .modele import Client, Factura, LinieFactura, MiscareStoc, Produs, SerieFactura
+from .stoc import (
+    iesiri_facturi,
+    inregistrare_miscari,
+    readaugare_stoc,
+    rezervare_stoc,
+)
+from .totaluri_zilnice import actualizare_totaluri_zilnice
+
+serie_implicita = os.getenv("SERIE_FACTURA", "FF")
+resetare_anuala = os.getenv("RESETARE_ANUALA_FACTURI", "0") == "1"
+dimensiune_pagina = int(os.getenv("DIMENSIUNE_PAGINA", "20"))
+
+
+def adaugare_client(nume_client, cui, adresa_client):
+    with unit_of_work(scriere=True) as session:
+        client = Client(nume_client=nume_client, cui=cui, adresa_client=adresa_client)
+        try:
+            with session.begin_nested():
+                session.add(client)
+        except IntegrityError:
+            print(f"Clientul cu CUI-ul {cui} se afla deja in baza de date!")
+            return None
+        invalidare_clienti(session, [(client.id, cui)])
+    return client
+
+
+def afisare_client():
+    with unit_of_work() as session:
+        return session.query(Client).all()
+
+
+def stergere_client(client_id):
+    with unit_of_work(scriere=True) as session:
+        # fiecare verificare citeste doar indexul coloanei respective; facturile
+        # sterse logic pastreaza legatura cu clientul, deci se numara si ele
+        for coloana in (Factura.furnizor_id, Factura.client_id):
+            numar_factura = session.execute(
+                select(Factura.numar_factura).where(coloana == client_id).limit(1),
+                execution_options={"cu_sterse": True},
+            ).scalar()
+            if numar_factura:
+                print(f"Clientul cu id-ul {client_id} nu poate fi sters deoarece este asociat cu factura "
+                      f"{numar_factura}.")
+                return
+        client = session.query(Client).filter_by(id=client_id).first()
+        if client:
+            invalidare_clienti(session, [(client.id, client.cui)])
+            session.delete(client)
+        else:
+            print(f"Clientul cu id-ul {client_id}, nu se afla in baza de date!")
+            return
+    print(f"A fost sters din bazade date clientul cu id-ul {client_id}!")
+
+
+def adaugare_produs(denumire_produs, cantitate, pret_unitar):
+    with unit_of_work(scriere=True) as session:
+        produs = Produs(
+            denumire_produs=denumire_produs,
+            cantitate=cantitate,
+            pret_unitar=pret_unitar,
+        )
+        session.add(produs)
+        session.flush()
+        invalidare_produse(session, [produs.id])
+    return produs
+
+
+def afisare_produs():
+    with unit_of_work() as session:
+        return session.query(Produs).all()
+
+
+def stergere_produs(produs_id):
+    with unit_of_work(scriere=True) as session:
+        numar_factura = session.execute(
+            select(Factura.numar_factura)
+            .join(LinieFactura, LinieFactura.factura_id == Factura.id)
+            .where(LinieFactura.produs_id == produs_id)
+            .limit(1),
+            execution_options={"cu_sterse": True},
+        ).scalar()
+        if numar_factura:
+            print(f"Produsul cu id-ul {produs_id} nu poate fi sters deoarece este asociat cu factura "
+                  f"{numar_factura}.")
+            return
+        # istoricul stocului ramane si pentru facturile mutate in arhiva, deci un
+        # produs cu miscari de stoc nu se mai sterge
+        if session.execute(
+            select(MiscareStoc.id).where(MiscareStoc.produs_id == produs_id).limit(1)
+        ).scalar():
+            print(
+                f"Produsul cu id-ul {produs_id} nu poate fi sters deoarece are "
+                f"miscari in istoricul stocului."
+            )
+            return
+        produs = session.query(Produs).filter_by(id=produs_id).first()
+        if produs:
+            invalidare_produse(session, [produs.id])
+            session.delete(produs)
+        else:
+            print(f"Produsul cu id-ul {produs_id}, nu se afla in baza de date!")
+            return
+    print(f"A fost sters din bazade date produsul cu id-ul {produs_id}!")
+
+
+def intrare_stoc(produs_id, cantitate):
+    cantitate = int(cantitate)
+    if cantitate <= 0:
+        print("Cantitatea intrata in stoc trebuie sa fie pozitiva!")
+        return None
+    with unit_of_work(scriere=True) as session:
+        actualizat = session.execute(
+            update(Produs)
+            .where(Produs.id == produs_id)
+            .values(cantitate=Produs.cantitate + cantitate)
+        ).rowcount
+        if not actualizat:
+            print(f"Produsul cu id-ul {produs_id}, nu se afla in baza de date!")
+            return None
+        inregistrare_miscari(session, [(produs_id, cantitate, None)], "intrare")
+        stoc = session.execute(
+            select(Produs.cantitate).where(Produs.id == produs_id)
+        ).scalar()
+    print(f"Stocul produsului cu id-ul {produs_id} este acum {stoc}.")
+    return stoc
+
+
+def formatare_numar_factura(serie, an, numar):
+    if an:
+        return f"{serie}{an}-{numar:04d}"
+    return f"{serie}{numar:04d}"
+
+
+def _ultimul_numar_existent(sesiune, serie, an):
+    # folosit o singura data, la crearea contorului unei serii care are deja facturi
+    prefix = formatare_numar_factura(serie, an, 0)[:-4]
+    numar_factura = sesiune.execute(
+        select(Factura.numar_factura)
+        .where(
+            Factura.numar_factura.like(f"{prefix}%"),
+            ~Factura.numar_factura.like(f"{prefix}%-%"),
+        )
+        .order_by(
+            func.length(Factura.numar_factura).desc(), Factura.numar_factura.desc()
+        )
+        .limit(1),
+        # numerele facturilor sterse nu se refolosesc
+        execution_options={"cu_sterse": True},
+    ).scalar()
+    if numar_factura is None or not numar_factura[len(prefix) :].isdigit():
+        return 0
+    return int(numar_factura[len(prefix) :])
+
+
+def _rezervare_numere(sesiune, cantitate, serie, an):
+    # UPDATE-ul pe contor blocheaza randul (MySQL) sau baza pentru scriere (SQLite)
+    # pana la commit, deci doua procese nu pot primi acelasi numar
+    conditie = (SerieFactura.serie == serie) & (SerieFactura.an == an)
+    actualizat = sesiune.execute(
+        update(SerieFactura)
+        .where(conditie)
+        .values(ultimul_numar=SerieFactura.ultimul_numar + cantitate)
+    ).rowcount
+    if not actualizat:
+        try:
+            with sesiune.begin_nested():
+                sesiune.add(
+                    SerieFactura(
+                        serie=serie,
+                        an=an,
+                        ultimul_numar=_ultimul_numar_existent(sesiune, serie, an)
+                        + cantitate,
+                    )
+                )
+        except IntegrityError:
+            # seria a fost creata intre timp de alt proces
+            sesiune.execute(
+                update(SerieFactura)
+                .where(conditie)
+                .values(ultimul_numar=SerieFactura.ultimul_numar + cantitate)
+            )
+    ultimul_numar = sesiune.execute(
+        select(SerieFactura.ultimul_numar).where(conditie)
+    ).scalar_one()
+    return [
+        formatare_numar_factura(serie, an, numar)
+        for numar in range(ultimul_numar - cantitate + 1, ultimul_numar + 1)
+    ]
+
+
+def rezervare_numere_factura(cantitate=1, serie=None, anual=None):
+    # numerele sunt rezervate in tranzactia curenta: un rollback le elibereaza
+    serie = serie or serie_implicita
+    anual = resetare_anuala if anual is None else anual
+    an = datetime.now().year if anual else 0
+    with unit_of_work(scriere=True) as session:
+        return _rezervare_numere(session, cantitate, serie, an)
+
+
+def rezervare_bloc_numere(cantitate, serie=None, anual=None):
+    # bloc rezervat si confirmat imediat, pentru un proces care emite separat;
+    # numerele nefolosite din bloc raman goluri in serie
+    serie = serie or serie_implicita
+    anual = resetare_anuala if anual is None else anual
+    an = datetime.now().year if anual else 0
+    sesiune = sesiune_noua()
+    try:
+        pornire_scriere(sesiune)
+        numere = _rezervare_numere(sesiune, cantitate, serie, an)
+        sesiune.commit()
+        return numere
+    except Exception:
+        sesiune.rollback()
+        raise
+    finally:
+        sesiune.close()
+
+
+@cronometru
+def generare_numar_factura(serie=None, anual=None):
+    return rezervare_numere_factura(1, serie, anual)[0]
+
+
+def calcul_linie(produs_id, denumire_produs, cantitate, pret_unitar, cota=None):
+    cota = cota_tva if cota is None else cota
+    pret_bani = in_bani(pret_unitar)
+    total_bani = pret_bani * int(cantitate)
+    return {
+        "produs_id": produs_id,
+        "denumire_produs": denumire_produs,
+        "cantitate": int(cantitate),
+        "pret_unitar": din_bani(pret_bani),
+        "cota_tva": din_puncte(in_puncte(cota)),
+        "total_linie": din_bani(total_bani),
+        "tva_linie": din_bani(tva_bani(total_bani, in_puncte(cota))),
+    }
+
+
+def calcul_totaluri(linii):
+    # TVA-ul facturii este suma TVA-ului pe linii, ca documentul sa se adune
+    subtotal = sum(in_bani(linie["total_linie"]) for linie in linii)
+    tva = sum(in_bani(linie["tva_linie"]) for linie in linii)
+    return {
+        "subtotal": din_bani(subtotal),
+        "tva": din_bani(tva),
+        "total": din_bani(subtotal + tva),
+    }
+
+
+@cronometru
+def adaugare_factura(furnizor_id, client_id, produse_ids, cantitati=None):
+    # cu documente generate in fundal, emiterea asteapta cand coada este plina
+    if not asteptare_loc_in_coada():
+        return None
+    with unit_of_work(scriere=True) as session:
+        # furnizorii, clientii si produsele se citesc prin cache
+        furnizor = client_dupa_id(session, furnizor_id)
+        if not furnizor:
+            print(f"Furnizorul cu id-ul {furnizor_id} nu se afla in baza de date!")
+            return None
+
+        client = client_dupa_id(session, client_id)
+        if not client:
+            print(f"Clientul cu id-ul {client_id} nu se afla in baza de date!")
+            return None
+
+        produse_gasite = produse_dupa_id(session, produse_ids)
+        produse_lipsa = set(produse_ids) - produse_gasite.keys()
+        if produse_lipsa:
+            print(f"Produsele cu id-ul {', '.join(map(str, produse_lipsa))} nu se afla in baza de date!")
+            return None
+
+        # cantitatea produsului este stocul; implicit se factureaza o bucata
+        cantitati = cantitati or {}
+        produse = [produse_gasite[produs_id] for produs_id in dict.fromkeys(produse_ids)]
+        linii = [
+            calcul_linie(
+                produs.id,
+                produs.denumire_produs,
+                cantitati.get(produs.id, 1),
+                produs.pret_unitar,
+                produs.cota_tva,
+            )
+            for produs in produse
+        ]
+        if any(linie["cantitate"] <= 0 for linie in linii):
+            print("Cantitatile facturate trebuie sa fie pozitive!")
+            return None
+        # stocul se scade inainte de numerotare, deci o factura respinsa nu
+        # consuma un numar
+        lipsa = rezervare_stoc(
+            session, [{linie["produs_id"]: linie["cantitate"] for linie in linii}]
+        )[0]
+        if lipsa:
+            print(
+                f"Stoc insuficient pentru produsele cu id-ul "
+                f"{', '.join(map(str, sorted(lipsa)))}!"
+            )
+            return None
+
+        numar_factura = generare_numar_factura()
+        factura = Factura(
+            numar_factura=numar_factura,
+            furnizor_id=furnizor_id,
+            client_id=client_id,
+            linii=[LinieFactura(**linie) for linie in linii],
+            **calcul_totaluri(linii),
+        )
+        session.add(factura)
+        session.flush()
+        iesiri_facturi(
+            session, [{**linie, "factura_id": factura.id} for linie in linii]
+        )
+        actualizare_totaluri_zilnice(session, [factura.id])
+        joburi_facturi(session, {numar_factura: factura.id})
+    print(f"Factura a fost emisa cu succes: {factura}")
+    return factura
+
+
+@cronometru
+def adaugare_facturi_bulk(specificatii, dimensiune_lot=1000):
+    clienti_ids = set()
+    produse_ids = set()
+    for spec in specificatii:
+        clienti_ids.update((spec["furnizor_id"], spec["client_id"]))
+        produse_ids.update(spec["produse_ids"])
+    with unit_of_work() as session:
+        clienti_existenti = clienti_dupa_id(session, clienti_ids)
+        produse_existente = produse_dupa_id(session, produse_ids)
+
+    raport = []
+    valide = []
+    for index, spec in enumerate(specificatii):
+        rezultat = {
+            "index": index,
+            "factura_id": None,
+            "numar_factura": None,
+            "eroare": None,
+        }
+        raport.append(rezultat)
+        if spec["furnizor_id"] not in clienti_existenti:
+            rezultat["eroare"] = (
+                f"Furnizorul cu id-ul {spec['furnizor_id']} nu se afla in baza de date!"
+            )
+        elif spec["client_id"] not in clienti_existenti:
+            rezultat["eroare"] = (
+                f"Clientul cu id-ul {spec['client_id']} nu se afla in baza de date!"
+            )
+        else:
+            # `set - dict.keys()` ar parcurge toate produsele lotului la fiecare
+            # factura; se verifica doar produsele facturii
+            produse_lipsa = {
+                produs_id
+                for produs_id in spec["produse_ids"]
+                if produs_id not in produse_existente
+            }
+            if produse_lipsa:
+                rezultat["eroare"] = (
+                    f"Produsele cu id-ul {', '.join(map(str, produse_lipsa))} "
+                    f"nu se afla in baza de date!"
+                )
+            elif any(
+                int(cantitate) <= 0
+                for cantitate in (spec.get("cantitati") or {}).values()
+            ):
+                rezultat["eroare"] = "Cantitatile facturate trebuie sa fie pozitive!"
+            else:
+                valide.append((rezultat, spec))
+
+    # liniile tuturor facturilor valide se calculeaza deodata, in bani
+    facturi_index = []
+    linii_produse = []
+    cantitati_linii = []
+    for index, (_, spec) in enumerate(valide):
+        cantitati = spec.get("cantitati") or {}
+        for produs_id in dict.fromkeys(spec["produse_ids"]):
+            produs = produse_existente[produs_id]
+            facturi_index.append(index)
+            linii_produse.append(produs)
+            cantitati_linii.append(int(cantitati.get(produs_id, 1)))
+    preturi_bani = [in_bani(produs.pret_unitar) for produs in linii_produse]
+    cote_puncte = [
+        in_puncte(cota_tva if produs.cota_tva is None else produs.cota_tva)
+        for produs in linii_produse
+    ]
+    totaluri_linii, tva_linii = calcul_linii_lot(
+        cantitati_linii, preturi_bani, cote_puncte
+    )
+    subtotaluri, tva_facturi = calcul_facturi_lot(
+        facturi_index, totaluri_linii, tva_linii, len(valide)
+    )
+    linii_facturi = [[] for _ in valide]
+    for pozitie, index in enumerate(facturi_index):
+        produs = linii_produse[pozitie]
+        linii_facturi[index].append(
+            {
+                "produs_id": produs.id,
+                "denumire_produs": produs.denumire_produs,
+                "cantitate": cantitati_linii[pozitie],
+                "pret_unitar": din_bani(preturi_bani[pozitie]),
+                "cota_tva": din_puncte(cote_puncte[pozitie]),
+                "total_linie": din_bani(totaluri_linii[pozitie]),
+                "tva_linie": din_bani(tva_linii[pozitie]),
+            }
+        )
+    valide = [
+        (
+            rezultat,
+            spec,
+            linii,
+            {
+                "subtotal": din_bani(subtotal),
+                "tva": din_bani(tva),
+                "total": din_bani(subtotal + tva),
+            },
+        )
+        for (rezultat, spec), linii, subtotal, tva in zip(
+            valide, linii_facturi, subtotaluri, tva_facturi
+        )
+    ]
+
+    for i in range(0, len(valide), dimensiune_lot):
+        lot = valide[i : i + dimensiune_lot]
+        if not asteptare_loc_in_coada():
+            for rezultat, _, _, _ in lot:
+                rezultat["eroare"] = "Coada de joburi este plina!"
+            continue
+        try:
+            with unit_of_work(scriere=True) as session:
+                # stocul intregului lot se scade printr-un singur executemany;
+                # facturile pentru care nu ajunge stocul sunt respinse
+                lipsa = rezervare_stoc(
+                    session,
+                    [
+                        {linie["produs_id"]: linie["cantitate"] for linie in linii}
+                        for _, _, linii, _ in lot
+                    ],
+                )
+                for (rezultat, _, _, _), lipsa_factura in zip(lot, lipsa):
+                    if lipsa_factura:
+                        rezultat["eroare"] = (
+                            f"Stoc insuficient pentru produsele cu id-ul "
+                            f"{', '.join(map(str, sorted(lipsa_factura)))}!"
+                        )
+                lot = [
+                    factura
+                    for factura, lipsa_factura in zip(lot, lipsa)
+                    if not lipsa_factura
+                ]
+                if not lot:
+                    continue
+                # blocul de numere se rezerva in tranzactia lotului, deci un lot
+                # esuat nu lasa goluri in serie
+                numere = rezervare_numere_factura(len(lot))
+                for (rezultat, _, _, _), numar_factura in zip(lot, numere):
+                    rezultat["numar_factura"] = numar_factura
+                session.execute(
+                    insert(Factura),
+                    [
+                        {
+                            "numar_factura": rezultat["numar_factura"],
+                            "furnizor_id": spec["furnizor_id"],
+                            "client_id": spec["client_id"],
+                            **totaluri,
+                        }
+                        for rezultat, spec, _, totaluri in lot
+                    ],
+                )
+                # id-urile se citesc pe bucati de 900 de numere, ca loturile
+                # mari sa nu depaseasca limita de parametri a SQLite
+                ids_facturi = dict(
+                    randuri_dupa_id(
+                        session,
+                        select(Factura.numar_factura, Factura.id),
+                        Factura.numar_factura,
+                        numere,
+                    )
+                )
+                linii_lot = [
+                    {"factura_id": ids_facturi[rezultat["numar_factura"]], **linie}
+                    for rezultat, _, linii, _ in lot
+                    for linie in linii
+                ]
+                if linii_lot:
+                    session.execute(insert(LinieFactura), linii_lot)
+                iesiri_facturi(session, linii_lot)
+                actualizare_totaluri_zilnice(session, ids_facturi.values())
+                joburi_facturi(session, ids_facturi)
+        except Exception as e:
+            for rezultat, _, _, _ in lot:
+                rezultat["numar_factura"] = None
+                rezultat["eroare"] = f"Lotul nu a putut fi salvat: {e}"
+            continue
+        for rezultat, _, _, _ in lot:
+            rezultat["factura_id"] = ids_facturi[rezultat["numar_factura"]]
+
+    emise = sum(1 for rezultat in raport if rezultat["factura_id"] is not None)
+    print(f"Facturi emise: {emise}, respinse: {len(raport) - emise}")
+    return raport
+
+
+@cronometru
+def listare_facturi(dupa_id=None, limita=None):
+    # totalurile sunt salvate pe factura, listarea citeste o singura tabela
+    interogare = select(
+        Factura.id,
+        Factura.numar_factura,
+        Factura.data_emitere,
+        Factura.subtotal,
+        Factura.tva,
+        Factura.total,
+    ).order_by(Factura.id)
+    if dupa_id is not None:
+        interogare = interogare.where(Factura.id > dupa_id)
+    if limita is not None:
+        interogare = interogare.limit(limita)
+    with unit_of_work() as session:
+        return session.execute(interogare).all()
+
+
+def exista_inregistrari(model):
+    with unit_of_work() as session:
+        return session.execute(select(select(model.id).exists())).scalar()
+
+
+def numar_inregistrari(model):
+    with unit_of_work() as session:
+        return session.execute(select(func.count(model.id))).scalar()
+
+
+def _iter_pagini(model, dupa_id, dimensiune):
+    # paginare dupa cheie: fiecare pagina porneste de la ultimul id afisat,
+    # deci memoria folosita nu depinde de marimea tabelei
+    while True:
+        with unit_of_work() as session:
+            pagina = (
+                session.execute(
+                    select(model)
+                    .where(model.id > dupa_id)
+                    .order_by(model.id)
+                    .limit(dimensiune)
+                )
+                .scalars()
+                .all()
+            )
+        if not pagina:
+            return
+        yield pagina
+        dupa_id = pagina[-1].id
+
+
+def iter_clienti(dupa_id=0, dimensiune=None):
+    return _iter_pagini(Client, dupa_id, dimensiune or dimensiune_pagina)
+
+
+def iter_produse(dupa_id=0, dimensiune=None):
+    return _iter_pagini(Produs, dupa_id, dimensiune or dimensiune_pagina)
+
+
+def iter_facturi(dupa_id=0, dimensiune=None):
+    while True:
+        pagina = listare_facturi(dupa_id, dimensiune or dimensiune_pagina)
+        if not pagina:
+            return
+        yield pagina
+        dupa_id = pagina[-1].id
+
+
+def cautare_numar_factura(factura_id):
+    with unit_of_work() as session:
+        return session.execute(
+            select(Factura.numar_factura).where(Factura.id == factura_id)
+        ).scalar()
+
+
+@cronometru
+def stergere_factura(factura_id):
+    # factura este doar marcata ca stearsa: numarul ei ramane ocupat, iar
+    # totalurile zilnice scad si stocul revine ca la o stergere
+    with unit_of_work(scriere=True) as session:
+        factura = session.query(Factura).filter_by(id=factura_id).first()
+        if not factura:
+            print(f"Factura cu id-ul {factura_id}, nu se afla in baza de date!")
+            return
+        actualizare_totaluri_zilnice(session, [factura_id], semn=-1)
+        readaugare_stoc(session, [factura_id])
+        factura.sters_la = datetime.now()
+    print(f"A fost sters din baza de date factura cu id-ul {factura_id}!")
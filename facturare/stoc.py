@@ -0,0 +1,140 @@
+# stocul produselor se modifica in tranzactia care emite sau sterge facturile,
+# printr-un UPDATE conditionat pe fiecare produs: blocheaza doar randurile
+# produselor facturate (MySQL) si nu lasa niciodata stocul sub zero
+from sqlalchemy import bindparam, insert, select, update
+
+from .modele import LinieFactura, MiscareStoc, Produs
+
+_produse = Produs.__table__
+_scadere = (
+    update(_produse)
+    .where(
+        _produse.c.id == bindparam("p_id"),
+        _produse.c.cantitate >= bindparam("p_cantitate"),
+    )
+    .values(cantitate=_produse.c.cantitate - bindparam("p_cantitate"))
+)
+_adaugare = (
+    update(_produse)
+    .where(_produse.c.id == bindparam("p_id"))
+    .values(cantitate=_produse.c.cantitate + bindparam("p_cantitate"))
+)
+
+
+def _executare(sesiune, instructiune, cantitati):
+    # produsele se actualizeaza mereu in aceeasi ordine, ca doua tranzactii
+    # MySQL sa nu se blocheze reciproc
+    parametri = [
+        {"p_id": produs_id, "p_cantitate": cantitati[produs_id]}
+        for produs_id in sorted(cantitati)
+    ]
+    if sesiune.get_bind().dialect.supports_sane_multi_rowcount:
+        return sesiune.execute(instructiune, parametri).rowcount
+    return sum(sesiune.execute(instructiune, p).rowcount for p in parametri)
+
+
+def _scadere_stoc(sesiune, cantitati):
+    # totul sau nimic: daca un singur produs nu are stoc, savepoint-ul anuleaza
+    # si scaderile deja facute
+    savepoint = sesiune.begin_nested()
+    if _executare(sesiune, _scadere, cantitati) == len(cantitati):
+        savepoint.commit()
+        return True
+    savepoint.rollback()
+    return False
+
+
+def _stoc_curent(sesiune, produse_ids, dimensiune=900):
+    # randurile raman blocate pana la commit (MySQL); pe SQLite tranzactia de
+    # scriere blocheaza deja baza
+    produse_ids = list(produse_ids)
+    stoc = {}
+    for i in range(0, len(produse_ids), dimensiune):
+        stoc.update(
+            sesiune.execute(
+                select(Produs.id, Produs.cantitate)
+                .where(Produs.id.in_(produse_ids[i : i + dimensiune]))
+                .with_for_update()
+            ).all()
+        )
+    return stoc
+
+
+def rezervare_stoc(sesiune, cereri):
+    # cereri: cate un dictionar {produs_id: cantitate} pentru fiecare factura;
+    # intoarce, pe factura, produsele fara stoc suficient (lista goala inseamna
+    # ca stocul a fost scazut). Facturile respinse nu modifica stocul.
+    lipsa = [[] for _ in cereri]
+    while True:
+        total = {}
+        for cerere, lipsa_factura in zip(cereri, lipsa):
+            if not lipsa_factura:
+                for produs_id, cantitate in cerere.items():
+                    total[produs_id] = total.get(produs_id, 0) + cantitate
+        # cazul obisnuit: ajunge stocul pentru tot lotul, un singur executemany
+        if not total or _scadere_stoc(sesiune, total):
+            return lipsa
+        # altfel facturile se accepta in ordine, cat timp ajunge stocul citit
+        stoc = _stoc_curent(sesiune, total)
+        for cerere, lipsa_factura in zip(cereri, lipsa):
+            if lipsa_factura:
+                continue
+            lipsa_factura.extend(
+                produs_id
+                for produs_id, cantitate in cerere.items()
+                if stoc.get(produs_id, 0) < cantitate
+            )
+            if not lipsa_factura:
+                for produs_id, cantitate in cerere.items():
+                    stoc[produs_id] -= cantitate
+
+
+def inregistrare_miscari(sesiune, miscari, tip):
+    # miscari: (produs_id, cantitate, factura_id); cantitatea este negativa la
+    # iesirile din stoc
+    if miscari:
+        sesiune.execute(
+            insert(MiscareStoc),
+            [
+                {
+                    "produs_id": produs_id,
+                    "cantitate": cantitate,
+                    "factura_id": factura_id,
+                    "tip": tip,
+                }
+                for produs_id, cantitate, factura_id in miscari
+            ],
+        )
+
+
+def iesiri_facturi(sesiune, linii):
+    # linii: dictionare cu factura_id, produs_id si cantitate, deja emise
+    inregistrare_miscari(
+        sesiune,
+        [
+            (linie["produs_id"], -linie["cantitate"], linie["factura_id"])
+            for linie in linii
+        ],
+        "factura",
+    )
+
+
+def readaugare_stoc(sesiune, facturi_ids, dimensiune=900):
+    # la stergerea facturilor cantitatile facturate revin in stoc
+    facturi_ids = list(facturi_ids)
+    for i in range(0, len(facturi_ids), dimensiune):
+        linii = sesiune.execute(
+            select(
+                LinieFactura.produs_id,
+                LinieFactura.cantitate,
+                LinieFactura.factura_id,
+            ).where(LinieFactura.factura_id.in_(facturi_ids[i : i + dimensiune]))
+        ).all()
+        cantitati = {}
+        for linie in linii:
+            cantitati[linie.produs_id] = (
+                cantitati.get(linie.produs_id, 0) + linie.cantitate
+            )
+        if cantitati:
+            _executare(sesiune, _adaugare, cantitati)
+        inregistrare_miscari(sesiune, [tuple(linie) for linie in linii], "anulare")
@@ -0,0 +1,167 @@
+# totalurile zilnice se actualizeaza in tranzactia care emite sau sterge
+# facturile, cu diferentele calculate in SQL doar pentru facturile atinse
+from datetime import datetime, time
+
+from sqlalchemy import (
+    Date,
+    TypeDecorator,
+    and_,
+    bindparam,
+    delete,
+    func,
+    insert,
+    select,
+    type_coerce,
+    update,
+)
+from sqlalchemy.dialects.mysql import insert as insert_mysql
+from sqlalchemy.dialects.sqlite import insert as insert_sqlite
+
+from .modele import (
+    Arhivare,
+    Factura,
+    LinieFactura,
+    TotalZilnicClient,
+    TotalZilnicProdus,
+)
+
+
+def zi_emitere():
+    return func.date(Factura.data_emitere, type_=Date)
+
+
+def _tip_brut(coloana):
+    # sumele si cotele circula ca numere intregi, fara conversie prin Decimal
+    tip = coloana.type
+    return tip.impl_instance if isinstance(tip, TypeDecorator) else tip
+
+
+def _brut(expresie, coloana):
+    return type_coerce(expresie, _tip_brut(coloana))
+
+
+def _selectie_clienti():
+    zi = zi_emitere()
+    return (
+        select(
+            zi.label("zi"),
+            Factura.client_id,
+            func.count(Factura.id).label("numar_facturi"),
+            _brut(func.sum(Factura.subtotal), Factura.subtotal).label("subtotal"),
+            _brut(func.sum(Factura.tva), Factura.tva).label("tva"),
+            _brut(func.sum(Factura.total), Factura.total).label("total"),
+        )
+        .where(Factura.sters_la.is_(None))
+        .group_by(zi, Factura.client_id)
+    )
+
+
+def _selectie_produse():
+    zi = zi_emitere()
+    return (
+        select(
+            zi.label("zi"),
+            LinieFactura.produs_id,
+            _brut(LinieFactura.cota_tva, LinieFactura.cota_tva).label("cota_tva"),
+            func.count(LinieFactura.id).label("numar_linii"),
+            func.sum(LinieFactura.cantitate).label("cantitate"),
+            _brut(func.sum(LinieFactura.total_linie), LinieFactura.total_linie).label(
+                "total"
+            ),
+            _brut(func.sum(LinieFactura.tva_linie), LinieFactura.tva_linie).label(
+                "tva"
+            ),
+        )
+        .join(Factura, Factura.id == LinieFactura.factura_id)
+        .where(Factura.sters_la.is_(None))
+        .group_by(zi, LinieFactura.produs_id, LinieFactura.cota_tva)
+    )
+
+
+def _inserare_sau_adunare(sesiune, tabela, chei, valori, parametru):
+    # un singur upsert: randul nou se insereaza, iar peste unul existent
+    # (creat si de alta tranzactie intre timp) se aduna diferentele
+    inserare = {nume: parametru(nume) for nume in chei + valori}
+    if sesiune.get_bind().dialect.name == "mysql":
+        interogare = insert_mysql(tabela).values(inserare)
+        return interogare.on_duplicate_key_update(
+            {nume: tabela.c[nume] + interogare.inserted[nume] for nume in valori}
+        )
+    interogare = insert_sqlite(tabela).values(inserare)
+    return interogare.on_conflict_do_update(
+        index_elements=chei,
+        set_={nume: tabela.c[nume] + interogare.excluded[nume] for nume in valori},
+    )
+
+
+def _aplicare_diferente(sesiune, model, randuri, semn):
+    # cate o instructiune executemany pe tabela: upsert la emitere, respectiv
+    # scadere si stergerea randurilor ajunse la zero la stergere
+    tabela = model.__table__
+    chei = [coloana.name for coloana in tabela.primary_key]
+    # prima coloana de valori numara facturile/liniile; la zero randul dispare
+    valori = [coloana.name for coloana in tabela.columns if not coloana.primary_key]
+    randuri = [rand._asdict() for rand in randuri]
+    if not randuri:
+        return
+
+    def parametru(nume, prefix=""):
+        return bindparam(f"{prefix}{nume}", type_=_tip_brut(tabela.c[nume]))
+
+    if semn > 0:
+        sesiune.execute(
+            _inserare_sau_adunare(sesiune, tabela, chei, valori, parametru), randuri
+        )
+        return
+    pe_cheie = and_(*(tabela.c[cheie] == parametru(cheie, "k_") for cheie in chei))
+    sesiune.execute(
+        update(tabela)
+        .where(pe_cheie)
+        .values({nume: tabela.c[nume] - parametru(nume, "d_") for nume in valori}),
+        [
+            {
+                **{f"k_{cheie}": rand[cheie] for cheie in chei},
+                **{f"d_{nume}": rand[nume] for nume in valori},
+            }
+            for rand in randuri
+        ],
+    )
+    sesiune.execute(
+        delete(tabela).where(pe_cheie, tabela.c[valori[0]] <= 0),
+        [{f"k_{cheie}": rand[cheie] for cheie in chei} for rand in randuri],
+    )
+
+
+def actualizare_totaluri_zilnice(sesiune, facturi_ids, semn=1, dimensiune=900):
+    # semn=1 dupa inserarea facturilor, semn=-1 inainte de stergerea lor
+    facturi_ids = list(facturi_ids)
+    for i in range(0, len(facturi_ids), dimensiune):
+        lot = facturi_ids[i : i + dimensiune]
+        for model, selectie in (
+            (TotalZilnicClient, _selectie_clienti()),
+            (TotalZilnicProdus, _selectie_produse()),
+        ):
+            randuri = sesiune.execute(selectie.where(Factura.id.in_(lot))).all()
+            _aplicare_diferente(sesiune, model, randuri, semn)
+
+
+def reconstruire_totaluri_zilnice(conexiune):
+    # recalculare completa, folosita la migrare sau daca totalurile se strica;
+    # zilele arhivate nu mai au facturi in baza, deci totalurile lor raman
+    pana_la = conexiune.execute(select(func.max(Arhivare.pana_la))).scalar()
+    for model, selectie in (
+        (TotalZilnicClient, _selectie_clienti()),
+        (TotalZilnicProdus, _selectie_produse()),
+    ):
+        stergere = delete(model.__table__)
+        if pana_la is not None:
+            stergere = stergere.where(model.__table__.c.zi >= pana_la)
+            selectie = selectie.where(
+                Factura.data_emitere >= datetime.combine(pana_la, time())
+            )
+        conexiune.execute(stergere)
+        conexiune.execute(
+            insert(model.__table__).from_select(
+                [coloana.name for coloana in selectie.selected_columns], selectie
+            )
+        )